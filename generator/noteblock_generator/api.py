@@ -0,0 +1,152 @@
+"""Library interface for generating without the CLI.
+
+Takes the structure in memory, never prompts or prints,
+and reports progress to a callback instead of a progress bar.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from .cli.args import Align, Dimension, Facing, Tilt, Walkable
+from .cli.console import muted
+from .core.metrics import Report, metrics
+from .data.schema import Building, Size
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from .cli.progress_bar import ProgressCallback
+    from .core.coordinates import XYZ, Bounds
+    from .data.schema import BlockState, BlockType
+
+__all__ = [
+    "Align",
+    "Building",
+    "Dimension",
+    "Facing",
+    "GenerationResult",
+    "Size",
+    "Tilt",
+    "Walkable",
+    "building_from_array",
+    "generate",
+]
+
+
+class GenerationResult(NamedTuple):
+    bounds: Bounds
+    chunks: int
+    regions: int
+    bytes_written: int
+    report: Report
+
+
+def generate(
+    building: Building,
+    world_path: str | Path,
+    *,
+    coordinates: XYZ | None = None,
+    dimension: Dimension | None = None,
+    facing: Facing | None = None,
+    tilt: Tilt | None = None,
+    align=Align.center,
+    theme: Sequence[BlockState] = ("stone",),
+    walkable=Walkable.partial,
+    preserve_terrain=False,
+    player: str | None = None,
+    snap=0,
+    flush_interval: int | None = None,
+    streaming=False,
+    pipelined=False,
+    threads=0,
+    relight=False,
+    create_missing=False,
+    progress: ProgressCallback | None = None,
+) -> GenerationResult:
+    """Generate the building in a Java world, like `nbg` does.
+
+    Options are the same as the CLI's; omitted positioning options
+    are read from the world's player. Errors are raised, not printed,
+    and the world is left untouched if generation fails.
+
+    Calls are measured with the process-wide metrics, so concurrent calls
+    run one at a time, and a call resets what an enclosing `nbg --report`
+    run has recorded so far.
+    """
+    from .core.generator import Generator
+    from .core.session import GeneratingSession
+
+    generator = Generator(
+        session=GeneratingSession(Path(world_path).resolve(), interactive=False),
+        coordinates=coordinates,
+        dimension=dimension,
+        facing=facing,
+        tilt=tilt,
+        align=align,
+        theme=list(theme),
+        walkable=walkable,
+        preserve_terrain=preserve_terrain,
+        player=player,
+        snap=snap,
+        flush_interval=flush_interval or None,
+        streaming=streaming,
+        pipelined=pipelined,
+        threads=threads,
+        relight=relight,
+        create_missing=create_missing,
+        progress=progress or _ignore_progress,
+    )
+
+    with _recording_metrics(), muted():
+        summary = generator.generate(building)
+        report = metrics.report()
+
+    assert summary is not None
+    return GenerationResult(
+        bounds=generator.bounds,
+        chunks=summary.chunks,
+        regions=summary.regions,
+        bytes_written=summary.bytes_written,
+        report=report,
+    )
+
+
+def building_from_array(blocks: Sequence[Sequence[Sequence[BlockType]]]) -> Building:
+    """Build from blocks indexed as [x][y][z], i.e. [length][height][width]."""
+    length = len(blocks)
+    height = len(blocks[0]) if length else 0
+    width = len(blocks[0][0]) if height else 0
+    return Building(
+        blocks={
+            f"{x} {y} {z}": block
+            for x, plane in enumerate(blocks)
+            for y, row in enumerate(plane)
+            for z, block in enumerate(row)
+            if block is not None
+        },
+        size=Size(width=width, height=height, length=length),
+    )
+
+
+def _ignore_progress(description: str, done: int, total: int | None):
+    pass
+
+
+_metrics_lock = threading.Lock()
+
+
+@contextmanager
+def _recording_metrics():
+    with _metrics_lock:
+        enabled = metrics.enabled
+        metrics.enabled = True
+        metrics.reset()
+        try:
+            yield
+        finally:
+            metrics.enabled = enabled
+            metrics.reset()
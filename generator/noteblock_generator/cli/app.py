@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+from collections.abc import Callable
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 from typing import Annotated
 
 import typer
+from click import UsageError
 from typer import Context, Option, Typer
 
 from .. import __version__
 from ..core.coordinates import XYZ
-from ..data import loader, watcher
+from ..data import loader
 from ..data.schema import BlockState
-from .args import Align, Dimension, Facing, Tilt, Walkable
+from .args import Align, Dimension, Facing, ProfileMode, Tilt, Walkable
 
 
 def _show_version(ctx: Context, value: bool):
@@ -25,13 +29,17 @@ def _show_help(ctx: Context, value: bool):
         ctx.exit()
 
 
+def _ignore_progress(description: str, done: int, total: int | None):
+    pass
+
+
 app = Typer(add_completion=False)
 
 
 @app.command(no_args_is_help=True)
 def _(
     world_path: Annotated[
-        Path,
+        Path | None,
         Option(
             "--out",
             "-o",
@@ -45,7 +53,42 @@ def _(
             writable=True,
             resolve_path=True,
         ),
-    ],
+    ] = None,
+    export_path: Annotated[
+        Path | None,
+        Option(
+            "--export",
+            help="Write a structure file (.nbt, .schem, .litematic)"
+            + " or a datapack (.zip) instead of a world",
+            show_default=False,
+            metavar="file",
+            rich_help_panel="Input & output",
+            file_okay=True,
+            dir_okay=False,
+            writable=True,
+            resolve_path=True,
+        ),
+    ] = None,
+    rcon_address: Annotated[
+        str | None,
+        Option(
+            "--rcon",
+            help="Send the structure to a running server over RCON instead",
+            show_default=False,
+            metavar="host[:port]",
+            rich_help_panel="Input & output",
+        ),
+    ] = None,
+    rcon_password: Annotated[
+        str,
+        Option(
+            "--rcon-password",
+            help="RCON password",
+            show_default=False,
+            envvar="NBG_RCON_PASSWORD",
+            rich_help_panel="Input & output",
+        ),
+    ] = "",
     input_path: Annotated[
         Path | None,
         Option(
@@ -68,6 +111,31 @@ def _(
             rich_help_panel="Input & output",
         ),
     ] = False,
+    batch_path: Annotated[
+        Path | None,
+        Option(
+            "--batch",
+            help="Generate every structure listed in a manifest, in one session",
+            show_default=False,
+            metavar="file",
+            rich_help_panel="Input & output",
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            resolve_path=True,
+        ),
+    ] = None,
+    serve_path: Annotated[
+        Path | None,
+        Option(
+            "--serve",
+            help="Serve generation requests on a Unix socket instead of reading input",
+            show_default=False,
+            metavar="socket",
+            rich_help_panel="Input & output",
+            resolve_path=True,
+        ),
+    ] = None,
     theme: Annotated[
         list[BlockState],
         Option(
@@ -95,6 +163,14 @@ def _(
             rich_help_panel="Customization",
         ),
     ] = False,
+    create_missing: Annotated[
+        bool,
+        Option(
+            "--create-chunks",
+            help="Create chunks that were never generated, instead of failing",
+            rich_help_panel="Customization",
+        ),
+    ] = False,
     coordinates: Annotated[
         XYZ | None,
         Option(
@@ -143,6 +219,174 @@ def _(
             rich_help_panel="Positioning",
         ),
     ] = Align.center,
+    player: Annotated[
+        str | None,
+        Option(
+            "--player",
+            help="Player to read omitted positioning from",
+            show_default="first player found",
+            rich_help_panel="Positioning",
+            metavar="<name|uuid>",
+        ),
+    ] = None,
+    snap: Annotated[
+        int,
+        Option(
+            "--snap",
+            help="Move the structure up to N blocks to touch fewer chunks",
+            metavar="N",
+            rich_help_panel="Positioning",
+            min=0,
+        ),
+    ] = 0,
+    cache_path: Annotated[
+        Path | None,
+        Option(
+            "--cache",
+            help="Reuse placement results across runs",
+            show_default="no cache",
+            metavar="directory",
+            rich_help_panel="Performance",
+            file_okay=False,
+            dir_okay=True,
+            resolve_path=True,
+        ),
+    ] = None,
+    cache_size: Annotated[
+        int,
+        Option(
+            "--cache-size",
+            help="Maximum cache size in MB",
+            rich_help_panel="Performance",
+            min=0,
+        ),
+    ] = 1024,
+    flush_interval: Annotated[
+        int,
+        Option(
+            "--flush-interval",
+            help="Release written chunks from memory every N chunks; 0 to never",
+            metavar="N",
+            rich_help_panel="Performance",
+            min=0,
+        ),
+    ] = 0,
+    streaming: Annotated[
+        bool,
+        Option(
+            "--stream",
+            help="Write chunks as soon as they are placed",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    pipelined: Annotated[
+        bool,
+        Option(
+            "--pipeline",
+            help="Overlap decoding, placing and writing on separate threads",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    threads: Annotated[
+        int,
+        Option(
+            "--threads",
+            help="Threads to place blocks on, 0 for one per core;"
+            + " only helps on free-threaded Python",
+            metavar="N",
+            rich_help_panel="Performance",
+            min=0,
+        ),
+    ] = 0,
+    resume: Annotated[
+        bool,
+        Option(
+            "--resume",
+            help="Keep progress if interrupted, and resume where it left off",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    relight: Annotated[
+        bool,
+        Option(
+            "--light",
+            help="Precompute heightmaps and light, so the game needn't on load",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    tick_budget: Annotated[
+        int,
+        Option(
+            "--blocks-per-tick",
+            help="Blocks an exported datapack changes per tick",
+            metavar="N",
+            rich_help_panel="Performance",
+            min=1,
+            # plus one command to schedule the next tick,
+            # must fit the default maxCommandChainLength
+            max=65535,
+        ),
+    ] = 32768,
+    commands_per_tick: Annotated[
+        int,
+        Option(
+            "--commands-per-tick",
+            help="Commands sent over RCON per server tick",
+            metavar="N",
+            rich_help_panel="Performance",
+            min=1,
+        ),
+    ] = 200,
+    plan: Annotated[
+        bool,
+        Option(
+            "--plan",
+            help="Estimate time, memory and disk use, then exit without generating",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    report: Annotated[
+        bool,
+        Option(
+            "--report",
+            help="Print time spent in each phase",
+            rich_help_panel="Performance",
+        ),
+    ] = False,
+    report_path: Annotated[
+        Path | None,
+        Option(
+            "--report-file",
+            help="Append a JSON performance report per generation; implies --report",
+            show_default=False,
+            metavar="file",
+            rich_help_panel="Performance",
+            file_okay=True,
+            dir_okay=False,
+            resolve_path=True,
+        ),
+    ] = None,
+    profile_path: Annotated[
+        Path | None,
+        Option(
+            "--profile",
+            help="Profile each generation into a file; numbered per --watch iteration",
+            show_default=False,
+            metavar="file",
+            rich_help_panel="Performance",
+            file_okay=True,
+            dir_okay=False,
+            resolve_path=True,
+        ),
+    ] = None,
+    profile_mode: Annotated[
+        ProfileMode,
+        Option(
+            "--profile-mode",
+            help="cProfile stats, or sampled stacks of all threads in collapsed format",
+            rich_help_panel="Performance",
+        ),
+    ] = ProfileMode.cprofile,
     _version: Annotated[
         bool,
         Option("--version", is_eager=True, hidden=True, callback=_show_version),
@@ -153,24 +397,208 @@ def _(
     ] = False,
 ):
     from ..core.generator import Generator
-    from ..core.session import GeneratingSession
-
-    generator = Generator(
-        session=GeneratingSession(world_path),
-        coordinates=coordinates,
-        dimension=dimension,
-        facing=facing,
-        tilt=tilt,
-        align=align,
-        theme=theme,
-        walkable=walkable,
-        preserve_terrain=preserve_terrain,
+    from ..core.metrics import metrics
+    from ..core.parallel import gil_enabled
+    from ..core.plan import CostModel
+    from ..core.session import GeneratingSession, preload_world
+    from ..data.cache import PlacementCache
+    from .profiler import Profiler
+    from .progress_bar import UserCancelled
+    from .console import Console
+    from .report import show_plan, show_report, write_report
+
+    # sampled stacks are labelled with the phases they are in
+    metrics.enabled = (
+        report
+        or report_path is not None
+        or (profile_path is not None and profile_mode is ProfileMode.sample)
+    )
+    metrics.reset()
+    profiler = (
+        Profiler(profile_path, profile_mode, numbered=watch) if profile_path else None
+    )
+
+    def run(generate: Callable[[], object]):
+        with profiler.run() if profiler else nullcontext():
+            generate()
+        finish_report()
+
+    def finish_report():
+        if report or report_path:
+            result = metrics.report()
+            show_report(result)
+            if report_path:
+                write_report(result, report_path)
+            if result.chunks:
+                CostModel.load().calibrate(result).save()
+        metrics.reset()
+
+    if plan and (rcon_address or export_path or watch or batch_path or serve_path):
+        raise UsageError(
+            "--plan cannot be combined with --rcon, --export, --watch, --batch"
+            + " or --serve."
+        )
+
+    if rcon_address:
+        if world_path or export_path or batch_path or serve_path:
+            raise UsageError(
+                "--rcon cannot be combined with --out, --export, --batch or --serve."
+            )
+        from ..core.rcon import RconGenerator, RconPool, parse_address
+
+        with RconPool(
+            parse_address(rcon_address),
+            rcon_password,
+            commands_per_tick=commands_per_tick,
+        ) as pool:
+            rcon = RconGenerator(
+                pool,
+                coordinates=coordinates,
+                dimension=dimension,
+                facing=facing,
+                tilt=tilt,
+                align=align,
+                theme=theme,
+                walkable=walkable,
+                preserve_terrain=preserve_terrain,
+            )
+            try:
+                if not watch:
+                    run(partial(rcon.generate, loader.read(input_path)))
+                    return
+
+                from ..data import watcher
+
+                for data in watcher.watch(input_path):
+                    run(partial(rcon.generate, data, cached=True))
+            except UserCancelled:
+                pass
+        return
+
+    if export_path:
+        if world_path or batch_path or serve_path:
+            raise UsageError(
+                "--export cannot be combined with --out, --batch or --serve."
+            )
+        from ..core.export import Exporter
+
+        exporter = Exporter(
+            export_path,
+            facing=facing,
+            tilt=tilt,
+            align=align,
+            theme=theme,
+            walkable=walkable,
+            preserve_terrain=preserve_terrain,
+            coordinates=coordinates,
+            dimension=dimension,
+            tick_budget=tick_budget,
+        )
+        if not watch:
+            run(partial(exporter.export, loader.read(input_path)))
+            return
+
+        from ..data import watcher
+
+        for data in watcher.watch(input_path):
+            run(partial(exporter.export, data, cached=True))
+        return
+
+    if not world_path:
+        raise UsageError("Missing option '--out' / '-o'.")
+
+    if resume and (watch or batch_path or serve_path):
+        raise UsageError(
+            "--resume cannot be combined with --watch, --batch or --serve."
+        )
+    if threads > 1 and gil_enabled():
+        Console.warn("The GIL is enabled, so blocks are placed on one thread.")
+    if cache_path and (watch or serve_path):
+        # regenerations are diffed against the previous input instead
+        raise UsageError("--cache cannot be combined with --watch or --serve.")
+    session = GeneratingSession(world_path, resume=resume)
+    cache = (
+        PlacementCache(cache_path, max_size=cache_size * 1024 * 1024)
+        if cache_path
+        else None
     )
+    options = {
+        "coordinates": coordinates,
+        "dimension": dimension,
+        "facing": facing,
+        "tilt": tilt,
+        "align": align,
+        "theme": theme,
+        "walkable": walkable,
+        "preserve_terrain": preserve_terrain,
+        "player": player,
+        "snap": snap,
+    }
+
+    def make_generator(**overrides) -> Generator:
+        return Generator(
+            session=session,
+            cache=cache,
+            flush_interval=flush_interval,
+            streaming=streaming,
+            pipelined=pipelined,
+            threads=threads,
+            relight=relight,
+            create_missing=create_missing,
+            **(options | overrides),
+        )
+
+    if serve_path:
+        if watch or batch_path:
+            raise UsageError("--serve cannot be combined with --watch or --batch.")
+        import socketserver
+
+        if not hasattr(socketserver, "UnixStreamServer"):
+            raise UsageError("--serve requires Unix domain sockets.")
+        from ..core.server import Server
+        from ..core.session import ServingSession
+
+        session = ServingSession(world_path)
+        generator = make_generator(progress=_ignore_progress)
+        preload_world()
+        server = Server(serve_path, generator=generator, session=session)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if batch_path:
+        if watch:
+            raise UsageError("--batch cannot be combined with --watch.")
+        from ..core.batch import BatchGenerator
+        from ..data import manifest
+
+        entries = manifest.load(batch_path)
+        batch = BatchGenerator(
+            session=session,
+            generators=[make_generator(**entry.options) for entry in entries],
+            flush_interval=flush_interval,
+            pipelined=pipelined,
+            relight=relight,
+            create_missing=create_missing,
+        )
+        preload_world()
+        sources = [loader.read(Path(entry.input)) for entry in entries]
+        run(partial(batch.generate, sources))
+        return
+
+    generator = make_generator()
+    if plan:
+        show_plan(generator.plan(loader.read(input_path)))
+        return
+    preload_world()
 
     if not watch:
-        data = loader.load(input_path)
-        generator.generate(data)
+        run(partial(generator.generate, loader.read(input_path)))
         return
 
+    from ..data import watcher
+
     for data in watcher.watch(input_path):
-        generator.generate(data, cached=True)
+        run(partial(generator.generate, data, cached=True))
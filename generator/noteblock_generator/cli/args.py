@@ -29,3 +29,8 @@ class Align(Enum):
     left = "left"
     center = "center"
     right = "right"
+
+
+class ProfileMode(Enum):
+    cprofile = "cprofile"
+    sample = "sample"
@@ -1,4 +1,5 @@
 from collections.abc import Callable
+from contextlib import contextmanager
 from functools import partial
 from typing import TypeVar
 
@@ -6,6 +7,7 @@ import typer
 from click import Abort
 from rich.console import Console as _Console
 from rich.panel import Panel
+from rich.table import Table
 
 _console = _Console()
 _print = partial(_console.print, highlight=False)
@@ -13,6 +15,26 @@ _print = partial(_console.print, highlight=False)
 T = TypeVar("T")
 
 
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+@contextmanager
+def muted():
+    quiet = _console.quiet
+    _console.quiet = True
+    try:
+        yield
+    finally:
+        _console.quiet = quiet
+
+
 class Console:
     @staticmethod
     def newline(count=1):
@@ -74,3 +96,12 @@ class Console:
             speed=0.5,
         ):
             return callback()
+
+    @staticmethod
+    def table(title: str, columns: list[str], rows: list[list[str]]):
+        table = Table(title=title, title_style="bold", style="dim", expand=False)
+        for i, column in enumerate(columns):
+            table.add_column(column, justify="left" if i == 0 else "right")
+        for row in rows:
+            table.add_row(*row)
+        _print(table)
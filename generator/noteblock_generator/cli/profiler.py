@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import cProfile
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ..core.metrics import metrics
+from .args import ProfileMode
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+# Matches the interpreter's default thread switch interval,
+# which bounds how often a sampler thread can get the GIL anyway.
+_SAMPLE_INTERVAL = 0.005
+
+
+class Profiler:
+    """Profile each generation into its own output file.
+
+    In `cprofile` mode, writes a pstats `.prof` file of the main thread.
+    In `sample` mode, periodically samples the stacks of all threads and writes
+    them in collapsed-stack format (for flamegraph tools), each stack rooted at
+    the thread's name and the generation phases it is in, e.g.
+    `MainThread;[organize];[place];...`.
+    """
+
+    def __init__(self, path: Path, mode: ProfileMode, *, numbered: bool):
+        self.path = path
+        self.mode = mode
+        self.numbered = numbered
+        self._runs = 0
+
+    @contextmanager
+    def run(self):
+        self._runs += 1
+        path = self._output_path()
+        if self.mode is ProfileMode.cprofile:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                profile.dump_stats(path)
+        else:
+            sampler = _Sampler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                sampler.dump(path)
+
+    def _output_path(self) -> Path:
+        if not self.numbered:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}.{self._runs}{self.path.suffix}")
+
+
+class _Sampler:
+    def __init__(self):
+        self._samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path: Path):
+        with path.open("w") as f:
+            for stack, count in self._samples.items():
+                f.write(f"{stack} {count}\n")
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(_SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._samples[self._collapse(thread_id, frame, names)] += 1
+
+    @staticmethod
+    def _collapse(
+        thread_id: int, frame: FrameType | None, names: dict[int | None, str]
+    ) -> str:
+        frames: list[str] = []
+        while frame is not None:
+            code = frame.f_code
+            filename = Path(code.co_filename).name
+            frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.reverse()
+
+        stages = [f"[{stage}]" for stage in metrics.stages(thread_id)]
+        thread = names.get(thread_id, str(thread_id))
+        return ";".join([thread, *stages, *frames])
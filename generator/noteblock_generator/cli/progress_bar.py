@@ -1,5 +1,5 @@
 from collections import deque
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 from threading import Thread
 from typing import TypeVar
 
@@ -10,6 +10,10 @@ from .console import Console
 T = TypeVar("T")
 
 
+# description, jobs done, jobs count (if known)
+ProgressCallback = Callable[[str, int, "int | None"], None]
+
+
 class UserCancelled(Exception): ...
 
 
@@ -30,6 +34,9 @@ class ProgressBar:
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self._thread:
             self._thread.join()
+            if exc_type is None and not self._user_response:
+                # every job finished before the user declined
+                raise UserCancelled
 
     def _prompt_worker(self):
         self._user_response = Console.confirm("Confirm to proceed?", default=True)
@@ -90,3 +97,33 @@ class ProgressBar:
 
         self._thread.join()
         return not self._user_response
+
+
+class CallbackProgress:
+    """Non-interactive counterpart of ProgressBar that reports to a callback."""
+
+    def __init__(self, callback: ProgressCallback):
+        self._callback = callback
+
+    def __enter__(self):
+        return self._track
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def _track(
+        self,
+        jobs_iter: Generator[object, None, T],
+        *,
+        description: str,
+        jobs_count: int | None = None,
+        transient=False,
+    ) -> T:
+        done = 0
+        try:
+            while True:
+                next(jobs_iter)
+                done += 1
+                self._callback(description, done, jobs_count)
+        except StopIteration as e:
+            return e.value
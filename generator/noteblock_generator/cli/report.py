@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from msgspec import json
+
+from .console import Console, format_size
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from ..core.metrics import Report
+    from ..core.plan import Plan
+
+
+def show_report(report: Report):
+    rows = [
+        [name, str(phase.calls), f"{phase.wall_time:.3f}s", f"{phase.cpu_time:.3f}s"]
+        for name, phase in report.phases.items()
+    ]
+    rows.append(["total", "", f"{report.wall_time:.3f}s", f"{report.cpu_time:.3f}s"])
+    Console.table("Performance", ["Phase", "Calls", "Wall time", "CPU time"], rows)
+
+    throughput = [
+        f"{report.blocks} blocks"
+        + (f" ({report.blocks_per_second:,.0f}/s)" if report.blocks_per_second else ""),
+        f"{report.chunks} chunks"
+        + (f" ({report.chunks_per_second:,.1f}/s)" if report.chunks_per_second else ""),
+        f"{format_size(report.bytes_written)} written",
+    ]
+    if report.peak_rss is not None:
+        throughput.append(f"{format_size(report.peak_rss)} peak memory")
+    elif report.process_peak_rss is not None:
+        peak = format_size(report.process_peak_rss)
+        throughput.append(f"{peak} process peak memory")
+    Console.info(", ".join(throughput) + ".")
+
+
+def show_plan(plan: Plan):
+    rows = [
+        ["Blocks", f"{plan.blocks:,}"],
+        ["Chunks", f"{plan.chunks:,}"],
+        ["Region files", f"{plan.regions:,}"],
+        ["Chunks never generated", f"{plan.missing_chunks:,}"],
+        ["Chunk data to rewrite", format_size(plan.rewrite_bytes)],
+        ["Shadow copy", format_size(plan.copy_bytes)],
+        ["Wall time", f"~{plan.wall_time:.1f}s"],
+        ["Peak memory", f"~{format_size(plan.peak_memory)}"],
+    ]
+    Console.table("Plan", ["", "Estimate"], rows)
+    if plan.missing_chunks:
+        Console.info(
+            "{chunks} were never generated; generate with --create-chunks,"
+            + " or load them in-game first.",
+            chunks=f"{plan.missing_chunks} chunks",
+        )
+    if not plan.calibrated:
+        Console.info("Estimates are rough until calibrated by a run with --report.")
+
+
+def write_report(report: Report, path: Path):
+    """Append the report as a line of JSON."""
+    with path.open("ab") as f:
+        f.write(json.encode(report) + b"\n")
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ..cli.progress_bar import ProgressBar
+from ..data.loader import Source
+from .generator import report_write
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from ..cli.args import Dimension
+    from ..data.schema import Building
+    from .chunks import ChunkEdits, ChunksData
+    from .coordinates import XZ
+    from .generator import Generator
+    from .session import GeneratingSession
+
+
+class BatchGenerator:
+    """Generate several structures into one world, in a single session.
+
+    Chunks touched by more than one structure are merged, later structures
+    taking precedence, and written once.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: GeneratingSession,
+        generators: list[Generator],
+        flush_interval: int | None = None,
+        pipelined: bool = False,
+        relight: bool = False,
+        create_missing: bool = False,
+    ):
+        self.session = session
+        self.generators = generators
+        self.flush_interval = flush_interval
+        self.pipelined = pipelined
+        self.relight = relight
+        self.create_missing = create_missing
+
+    def generate(self, data: list[Building | Source]):
+        for generator, source in zip(self.generators, data):
+            if isinstance(source, Source) and generator.cache is None:
+                source.decode_in_background()
+
+        with self.session as world:
+            prepared = [
+                generator.prepare(world, source)
+                for generator, source in zip(self.generators, data)
+            ]
+
+            merged: dict[Dimension, ChunksData] = {}
+            with ProgressBar(cancellable=True) as track:
+                for generator, structure in zip(self.generators, prepared):
+                    assert generator.dimension is not None
+                    chunks = generator.place(structure, track)
+                    _merge(merged.setdefault(generator.dimension, {}), chunks)
+                    if structure.cached_chunks is not None:
+                        # merged chunks are copies, so the cache file can go
+                        structure.cached_chunks.close()
+
+                for dimension, chunks in merged.items():
+                    summary = track(
+                        world.write(
+                            chunks,
+                            dimension,
+                            flush_interval=self.flush_interval,
+                            pipelined=self.pipelined,
+                            relight=self.relight,
+                            create_missing=self.create_missing,
+                        ),
+                        description="Generating",
+                        jobs_count=len(chunks),
+                    )
+                    report_write(summary)
+
+
+def _merge(target: ChunksData, chunks: Mapping[XZ, ChunkEdits]):
+    for chunk_coords, edits in chunks.items():
+        if (existing := target.get(chunk_coords)) is None:
+            target[chunk_coords] = edits
+            continue
+        for coords, block in edits.items():
+            # where a later structure preserves terrain, keep the earlier one's blocks
+            if block is not None or coords not in existing:
+                existing[coords] = block
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import math
 import re
-from functools import cache
+from copy import copy
 from itertools import chain, product
 from typing import TYPE_CHECKING
 
@@ -15,6 +15,7 @@ if TYPE_CHECKING:
 
     from ..data.schema import BlockMap, BlockState, BlockType, Size, ThemeBlock
     from .coordinates import XYZ
+    from .placement import PlacementConfig
 
 
 DIRECTION_PATTERN = re.compile("|".join(Direction.__members__))
@@ -22,11 +23,32 @@ THEME_BLOCK: ThemeBlock = 0
 
 
 class BlockMapper(Placement):
+    __slots__ = ("_rotations", "_theme_should_round_up")
+
+    def __init__(self, config: PlacementConfig):
+        super().__init__(config)
+        # shared by forks; a race at worst rotates the same state twice
+        self._rotations: dict[BlockState, BlockState] = {}
+
     def update_size(self, size: Size):
         super().update_size(size)
         # to alternate rounding in boundary cases
         self._theme_should_round_up = True
 
+    def fork(self, *, skipped_boundaries: int) -> BlockMapper:
+        """A copy for another thread, resolving theme blocks as if this one
+        had gone on to resolve that many of them at theme boundaries.
+        """
+        mapper = copy(self)
+        if skipped_boundaries % 2:
+            mapper._theme_should_round_up = not self._theme_should_round_up
+        return mapper
+
+    @property
+    def theme_boundaries(self) -> list[int]:
+        """Values of z where theme blocks alternate rounding."""
+        return [z for z in range(self.width) if self._theme_index(z)[1]]
+
     def calculate_expansion(self, prev_size: Size) -> BlockMap:
         if prev_size == self.size:
             return {}
@@ -99,22 +121,21 @@ class BlockMapper(Placement):
         else:
             return z in (self.width // 2 - 1, self.width // 2)
 
-    @cache
-    def _apply_rotation(self, state: BlockState):
-        def rotate(match: Match) -> str:
-            raw_dir = Direction[match.group(0)]
-            rotated_dir = Direction(self.direction.rotate(raw_dir))
-            return rotated_dir.name
+    def _apply_rotation(self, state: BlockState) -> BlockState:
+        if (rotated := self._rotations.get(state)) is None:
+            rotated = self._rotations[state] = DIRECTION_PATTERN.sub(
+                self._rotate, state
+            )
+        return rotated
 
-        return DIRECTION_PATTERN.sub(rotate, state)
+    def _rotate(self, match: Match) -> str:
+        raw_dir = Direction[match.group(0)]
+        rotated_dir = Direction(self.direction.rotate(raw_dir))
+        return rotated_dir.name
 
     def _get_theme(self, z: int) -> BlockState:
-        theme_float_index = ((z + 0.5) * len(self.theme)) / self.width
-        theme_index = int(theme_float_index)
-
-        # Boundary cases are when z is exactly between two themes
-        # => theme_float_index is an int
-        if theme_index == theme_float_index:
+        theme_index, is_boundary = self._theme_index(z)
+        if is_boundary:
             if self._theme_should_round_up:
                 self._theme_should_round_up = False
             else:
@@ -122,3 +143,11 @@ class BlockMapper(Placement):
                 theme_index -= 1
 
         return self.theme[theme_index]
+
+    def _theme_index(self, z: int) -> tuple[int, bool]:
+        theme_float_index = ((z + 0.5) * len(self.theme)) / self.width
+        theme_index = int(theme_float_index)
+
+        # Boundary cases are when z is exactly between two themes
+        # => theme_float_index is an int
+        return theme_index, theme_index == theme_float_index
@@ -0,0 +1,133 @@
+"""Progress of a generation, so that an interrupted one can be resumed.
+
+The working copy of an interrupted generation is kept, along with which of
+its region files were completely written. Resuming restores every other
+region file from the original world, as the interruption may have left
+them half-written, and skips the ones already done.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from collections import Counter
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+from click import UsageError
+from msgspec import DecodeError, Struct, field, json
+
+from ..data.file_utils import same_file
+from .chunks import region_of
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Iterable
+
+    from .coordinates import XZ
+
+
+# the pass relighting chunk borders, after every region file is written
+LIGHTING_STEP = "lighting"
+
+
+class _State(Struct):
+    world_hash: int
+    # of the input and the options changing what is written
+    key: str | None = None
+    # region files completely written, relative to the world, and steps done
+    done: list[str] = field(default_factory=list)
+
+
+class Checkpoint:
+    def __init__(self, path: Path, world_hash: int | None):
+        self.path = path
+        self._state = _State(world_hash) if world_hash is not None else None
+        self._remaining: Counter[XZ] = Counter()
+
+    @classmethod
+    def load(cls, path: Path, world_hash: int | None) -> Checkpoint | None:
+        """The saved checkpoint, if it was made from this version of the world."""
+        if world_hash is None:
+            return None
+        try:
+            state = json.decode(path.read_bytes(), type=_State)
+        except (OSError, DecodeError):
+            return None
+        if state.world_hash != world_hash:
+            return None
+        checkpoint = cls(path, world_hash)
+        checkpoint._state = state
+        return checkpoint
+
+    @property
+    def done(self) -> frozenset[str]:
+        return frozenset(self._state.done) if self._state else frozenset()
+
+    def start(self, key: str, chunks: Iterable[XZ]):
+        """Begin checkpointing a generation writing these chunks."""
+        if self._state is None:
+            # the world was too large to hash in time,
+            # so there'd be no telling if it changed before resuming
+            return
+        if self._state.done and self._state.key != key:
+            raise UsageError(
+                "The interrupted generation had a different input or options;"
+                + " run without --resume to start over."
+            )
+        self._state.key = key
+        self._remaining = Counter(region_of(chunk) for chunk in chunks)
+        self._save()
+
+    def is_done(self, name: str) -> bool:
+        return self._state is not None and name in self._state.done
+
+    def visited(self, region: XZ, name: str, count: int):
+        """Count chunks of a region as written, saving when it is complete."""
+        if self._state is None or region not in self._remaining:
+            return
+        self._remaining[region] -= count
+        if self._remaining[region] <= 0 and name not in self._state.done:
+            self._state.done.append(name)
+            self._save()
+
+    def reopen(self, name: str):
+        """Count a region file as unfinished again, before writing to it."""
+        if self._state is not None and name in self._state.done:
+            self._state.done.remove(name)
+            self._save()
+
+    def finish(self, step: str, regions: Iterable[str] = ()):
+        """Record a step as done, along with the region files it reopened."""
+        if self._state is None:
+            return
+        done = self._state.done
+        done += [name for name in dict.fromkeys(regions) if name not in done]
+        done.append(step)
+        self._save()
+
+    def delete(self):
+        self.path.unlink(missing_ok=True)
+
+    def _save(self):
+        temp = self.path.with_name(self.path.name + ".tmp")
+        temp.write_bytes(json.encode(self._state))
+        os.replace(temp, self.path)
+
+
+def restore_unfinished(original: Path, working: Path, done: Collection[str]):
+    """Put back the original of every region file not completely written."""
+    names = {
+        path.relative_to(root).as_posix()
+        for root in (original, working)
+        for path in root.glob("**/*.mca")
+    }
+    for name in names:
+        # entities and poi files go with their region file
+        path = PurePosixPath(name)
+        if (path.parent.parent / "region" / path.name).as_posix() in done:
+            continue
+        source, target = original / name, working / name
+        if not source.exists():
+            target.unlink(missing_ok=True)
+        elif not same_file(source, target):
+            shutil.copy2(source, target)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import struct
 from typing import TYPE_CHECKING
 
+from ..cli.args import Dimension
+
 if TYPE_CHECKING:
     from collections.abc import Iterable
+    from pathlib import Path
 
     from ..data.schema import BlockState
     from .coordinates import XYZ, XZ
@@ -11,6 +15,22 @@ if TYPE_CHECKING:
     ChunkEdits = dict[XYZ, BlockState | None]
     ChunksData = dict[XZ, ChunkEdits]
 
+REGION_DIRS = {
+    Dimension.overworld: "region",
+    Dimension.nether: "DIM-1/region",
+    Dimension.the_end: "DIM1/region",
+}
+
+_SECTOR_SIZE = 4096
+_LOCATIONS = struct.Struct(">1024I")
+
+
+class ChunkLoadError(Exception):
+    def __init__(self, chunk_coords: XZ):
+        super().__init__("")
+        cx, cz = chunk_coords
+        self.coordinates = (cx << 4, cz << 4)
+
 
 def organize_chunks(blocks: Iterable[tuple[XYZ, BlockState | None]]):
     chunks: ChunksData = {}
@@ -24,3 +44,69 @@ def organize_chunks(blocks: Iterable[tuple[XYZ, BlockState | None]]):
         yield
 
     return chunks
+
+
+def stream_chunks(blocks: Iterable[tuple[XYZ, BlockState | None]], *, axis: int):
+    """Like organize_chunks, but yields chunks as soon as they are complete.
+
+    Blocks must arrive in order along the given axis (0 for X, 2 for Z),
+    so once a block lands in the next row of chunks along that axis,
+    the previous row will receive no more edits.
+    """
+
+    chunks: ChunksData = {}
+    current_row: int | None = None
+
+    for (x, y, z), block in blocks:
+        cx, offset_x = divmod(x, 16)
+        cz, offset_z = divmod(z, 16)
+        row = cx if axis == 0 else cz
+        if row != current_row:
+            if chunks:
+                yield chunks
+                chunks = {}
+            current_row = row
+        if (cx, cz) not in chunks:
+            chunks[cx, cz] = {}
+        chunks[cx, cz][offset_x, y, offset_z] = block
+
+    if chunks:
+        yield chunks
+
+
+def merge_chunks(batches: Iterable[ChunksData]):
+    """Like organize_chunks, for blocks already organized into disjoint batches."""
+    chunks: ChunksData = {}
+
+    for batch in batches:
+        chunks |= batch
+        yield
+
+    return chunks
+
+
+def region_of(chunk_coords: XZ) -> XZ:
+    cx, cz = chunk_coords
+    return cx >> 5, cz >> 5
+
+
+def read_locations(region_file: Path) -> tuple[int, ...]:
+    """The region file's header: where each of its chunks is stored."""
+    try:
+        with region_file.open("rb") as f:
+            return _LOCATIONS.unpack(f.read(_LOCATIONS.size))
+    except (OSError, struct.error):
+        return (0,) * 1024
+
+
+def location(locations: tuple[int, ...], chunk_coords: XZ) -> int:
+    cx, cz = chunk_coords
+    return locations[(cx & 31) + (cz & 31) * 32]
+
+
+def sector_offset(locations: tuple[int, ...], chunk_coords: XZ) -> int:
+    return location(locations, chunk_coords) >> 8
+
+
+def sectors_size(locations: tuple[int, ...], chunk_coords: XZ) -> int:
+    return (location(locations, chunk_coords) & 0xFF) * _SECTOR_SIZE
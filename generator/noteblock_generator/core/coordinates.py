@@ -17,8 +17,49 @@ class Bounds(NamedTuple):
     min_z: int
     max_z: int
 
+    @property
+    def chunks_count(self) -> int:
+        length_x = (self.max_x >> 4) - (self.min_x >> 4) + 1
+        length_z = (self.max_z >> 4) - (self.min_z >> 4) + 1
+        return length_x * length_z
+
+    @property
+    def regions_count(self) -> int:
+        length_x = (self.max_x >> 9) - (self.min_x >> 9) + 1
+        length_z = (self.max_z >> 9) - (self.min_z >> 9) + 1
+        return length_x * length_z
+
+    def snap_offset(self, tolerance: int) -> XZ:
+        """The horizontal shift, within tolerance, touching the fewest chunks.
+
+        Ties go to the fewest regions, then the smallest shift. Chunk and
+        region counts are products of the X and Z spans, so each axis is
+        searched on its own.
+        """
+
+        def best(low: int, high: int) -> int:
+            def cost(shift: int):
+                start, end = low + shift, high + shift
+                chunks = (end >> 4) - (start >> 4)
+                regions = (end >> 9) - (start >> 9)
+                return chunks, regions, abs(shift)
+
+            return min(range(-tolerance, tolerance + 1), key=cost)
+
+        return best(self.min_x, self.max_x), best(self.min_z, self.max_z)
+
+    @property
+    def chunks(self) -> list[XZ]:
+        return [
+            (cx, cz)
+            for cx in range(self.min_x >> 4, (self.max_x >> 4) + 1)
+            for cz in range(self.min_z >> 4, (self.max_z >> 4) + 1)
+        ]
+
 
 class CoordinateTranslator(Placement):
+    __slots__ = ()
+
     def get(self, coords: XYZ) -> XYZ:
         raw_x, raw_y, raw_z = coords
 
@@ -41,6 +82,11 @@ class CoordinateTranslator(Placement):
 
         return translated_x, translated_y, translated_z
 
+    @property
+    def length_axis(self) -> int:
+        """World axis the structure's length runs along: 0 for X, 2 for Z."""
+        return 0 if self.direction[0] else 2
+
     def calculate_bounds(self):
         start_x, start_y, start_z = self.get((0, 0, 0))
         end_x, end_y, end_z = self.get((
@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from array import array
+from functools import partial
+from itertools import product
+from typing import TYPE_CHECKING, NamedTuple
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from click import UsageError
+
+from .. import APP_NAME
+from ..cli.args import Dimension, Facing, Tilt
+from ..cli.console import Console, format_size
+from ..cli.progress_bar import CallbackProgress, ProgressBar
+from ..data import nbt
+from ..data.compact import CompactBlockMap, block_lookup, diff_blocks
+from ..data.loader import Source
+from ..data.schema import Building
+from .blocks import BlockMapper
+from .coordinates import CoordinateTranslator
+from .direction import Direction
+from .fill import MAX_FILL_VOLUME, merge_boxes
+from .metrics import metrics
+from .placement import PlacementConfig
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
+
+    from ..cli.args import Align, Walkable
+    from ..cli.progress_bar import ProgressCallback
+    from ..data.schema import BlockState
+    from .coordinates import XYZ, Bounds
+    from .fill import Box
+
+
+# Minecraft 1.21.1
+DATA_VERSION = 3955
+PACK_FORMAT = 48
+
+# blocks changed per tick by datapacks
+DEFAULT_TICK_BUDGET = MAX_FILL_VOLUME
+_NAMESPACE = "nbg"
+
+# where terrain is preserved, as the structure block saves it
+_VOID = "structure_void"
+
+# as commands name them
+_DIMENSION_IDS = {
+    Dimension.overworld: "minecraft:overworld",
+    Dimension.nether: "minecraft:the_nether",
+    Dimension.the_end: "minecraft:the_end",
+}
+
+
+class ExportSummary(NamedTuple):
+    blocks: int
+    palette: int
+    bytes_written: int
+
+
+class StructureResolver:
+    """Resolve structures into grids of blocks, without a world.
+
+    Positioning comes from the options alone, with facing +X by default.
+    """
+
+    def __init__(
+        self,
+        *,
+        coordinates: XYZ | None,
+        facing: Facing | None,
+        tilt: Tilt | None,
+        align: Align,
+        theme: list[BlockState],
+        walkable: Walkable,
+        preserve_terrain: bool,
+        progress: ProgressCallback | None = None,
+    ):
+        self.progress = progress
+        if facing is None:
+            facing = Facing.east
+            Console.info(
+                "Facing {direction} is used by default.",
+                direction=Direction[facing.name],
+            )
+        self._config = PlacementConfig(
+            origin=coordinates or (0, 0, 0),
+            direction=Direction[facing.name],
+            tilt=tilt or Tilt.down,
+            align=align,
+            theme=theme,
+            walkable=walkable,
+            preserve_terrain=preserve_terrain,
+        )
+        self._cached_blocks: CompactBlockMap | None = None
+
+    def resolve(self, building: Building) -> BlockGrid:
+        block_mapper = BlockMapper(self._config)
+        block_mapper.update_size(building.size)
+        translator = CoordinateTranslator(self._config)
+        translator.update_size(building.size)
+        grid = BlockGrid(translator.calculate_bounds())
+
+        def fill():
+            size = building.size
+            block_at = block_lookup(building.blocks)
+            for x, y, z in product(
+                range(size.length), range(size.height), range(size.width)
+            ):
+                block = block_at(x, y, z)
+                grid.set(
+                    translator.get((x, y, z)),
+                    block_mapper.resolve(block, (x, y, z)),
+                )
+                yield
+
+        with self._progress_bar() as track:
+            track(
+                metrics.timed("place", fill()),
+                description="Resolving",
+                jobs_count=grid.volume,
+                transient=True,
+            )
+        return grid
+
+    def _merge(self, building: Building) -> Building:
+        """The building with the blocks it leaves out kept from the previous
+        ones, as watched input may only hold the blocks that changed.
+        """
+        blocks = building.blocks
+        if not isinstance(blocks, CompactBlockMap):
+            blocks = CompactBlockMap.pack(dict(blocks), building.size)
+        if self._cached_blocks:
+            _, blocks = diff_blocks(self._cached_blocks, blocks)
+        self._cached_blocks = blocks
+        return Building(blocks=blocks, size=building.size)
+
+    def _progress_bar(self):
+        if self.progress is not None:
+            return CallbackProgress(self.progress)
+        # nothing to confirm, no world is touched
+        return ProgressBar(cancellable=False)
+
+
+class Exporter(StructureResolver):
+    """Write structures to a structure file instead of a world.
+
+    The format is chosen by the file's extension: .nbt for structure blocks,
+    .schem for WorldEdit, .litematic for Litematica. The file only records
+    the structure's rotation, as its position is decided when pasting.
+
+    A .zip is a datapack of /fill commands instead, which needs absolute
+    coordinates. Running `/function nbg:<name>` builds the structure over
+    several ticks, changing at most `tick_budget` blocks per tick; the area
+    must be loaded meanwhile.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        facing: Facing | None,
+        tilt: Tilt | None,
+        align: Align,
+        theme: list[BlockState],
+        walkable: Walkable,
+        preserve_terrain: bool,
+        coordinates: XYZ | None = None,
+        dimension: Dimension | None = None,
+        tick_budget=DEFAULT_TICK_BUDGET,
+        progress: ProgressCallback | None = None,
+    ):
+        if path.suffix == ".zip":
+            if coordinates is None:
+                raise UsageError("Exporting a datapack requires --at coordinates.")
+            write = partial(
+                _write_datapack,
+                dimension=dimension or Dimension.overworld,
+                tick_budget=tick_budget,
+            )
+        elif (write := _WRITERS.get(path.suffix)) is None:
+            raise UsageError(
+                f"Unsupported export format {path.suffix!r};"
+                + f" expected one of {', '.join([*_WRITERS, '.zip'])}."
+            )
+        self.path = path
+        self._write = write
+        super().__init__(
+            coordinates=coordinates,
+            facing=facing,
+            tilt=tilt,
+            align=align,
+            theme=theme,
+            walkable=walkable,
+            preserve_terrain=preserve_terrain,
+            progress=progress,
+        )
+
+    def export(self, data: Building | Source, *, cached=False) -> ExportSummary:
+        building = data.building if isinstance(data, Source) else data
+        grid = self.resolve(self._merge(building) if cached else building)
+
+        # replace the file only once fully written
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with metrics.phase("save"):
+            self._write(grid, temp_path)
+            os.replace(temp_path, self.path)
+
+        summary = ExportSummary(
+            blocks=grid.blocks_count,
+            palette=len(grid.palette),
+            bytes_written=self.path.stat().st_size,
+        )
+        metrics.count("bytes_written", summary.bytes_written)
+        Console.info(
+            "Exported {blocks} to {path} ({size}).",
+            blocks=f"{summary.blocks} blocks",
+            path=self.path.name,
+            size=format_size(summary.bytes_written),
+        )
+        return summary
+
+
+class BlockGrid:
+    """The structure's bounding box as palette indices, in Y-Z-X order."""
+
+    def __init__(self, bounds: Bounds):
+        self.bounds = bounds
+        self.min_x, self.min_y, self.min_z = bounds.min_x, bounds.min_y, bounds.min_z
+        self.size_x = bounds.max_x - bounds.min_x + 1
+        self.size_y = bounds.max_y - bounds.min_y + 1
+        self.size_z = bounds.max_z - bounds.min_z + 1
+        self.volume = self.size_x * self.size_y * self.size_z
+        self.palette: dict[BlockState, int] = {"air": 0}
+        self.indices = array("I", [0]) * self.volume
+
+    def set(self, coords: XYZ, block: BlockState | None):
+        state = _VOID if block is None else block
+        if (index := self.palette.get(state)) is None:
+            index = self.palette[state] = len(self.palette)
+        x, y, z = coords
+        self.indices[
+            ((y - self.min_y) * self.size_z + (z - self.min_z)) * self.size_x
+            + (x - self.min_x)
+        ] = index
+
+    @property
+    def void(self) -> int | None:
+        """Index of where terrain is preserved, if anywhere."""
+        return self.palette.get(_VOID)
+
+    @property
+    def blocks_count(self) -> int:
+        """Blocks other than air and voids."""
+        empty = self.indices.count(0)
+        if self.void is not None:
+            empty += self.indices.count(self.void)
+        return self.volume - empty
+
+    def positions(self):
+        for y, z, x in product(
+            range(self.size_y), range(self.size_z), range(self.size_x)
+        ):
+            yield x, y, z
+
+    def palette_entries(self) -> list[dict]:
+        return [_palette_entry(state) for state in self.palette]
+
+
+def _palette_entry(state: BlockState) -> dict:
+    name, _, properties = state.partition("[")
+    entry: dict = {"Name": f"minecraft:{name}"}
+    if properties := properties.rstrip("]"):
+        entry["Properties"] = dict(
+            prop.split("=", 1) for prop in properties.split(",")
+        )
+    return entry
+
+
+def _write_structure(grid: BlockGrid, path: Path):
+    """Vanilla structure file, as saved by structure blocks."""
+    void = grid.void
+    nbt.write(
+        path,
+        {
+            "DataVersion": DATA_VERSION,
+            "size": [grid.size_x, grid.size_y, grid.size_z],
+            "palette": grid.palette_entries(),
+            "blocks": [
+                {"pos": list(position), "state": index}
+                for position, index in zip(grid.positions(), grid.indices)
+                if index != void
+            ],
+            "entities": [],
+        },
+    )
+
+
+def _write_schematic(grid: BlockGrid, path: Path):
+    """Sponge schematic, version 2, as read by WorldEdit."""
+    nbt.write(
+        path,
+        {
+            "Version": 2,
+            "DataVersion": DATA_VERSION,
+            "Width": _unsigned_short(grid.size_x),
+            "Height": _unsigned_short(grid.size_y),
+            "Length": _unsigned_short(grid.size_z),
+            "Offset": nbt.IntArray([0, 0, 0]),
+            "PaletteMax": len(grid.palette),
+            "Palette": {f"minecraft:{state}": i for state, i in grid.palette.items()},
+            "BlockData": nbt.pack_varints(grid.indices),
+            "BlockEntities": [],
+        },
+        name="Schematic",
+    )
+
+
+def _write_litematic(grid: BlockGrid, path: Path):
+    """Litematica schematic with a single region."""
+    size = {"x": grid.size_x, "y": grid.size_y, "z": grid.size_z}
+    bits = max(2, (len(grid.palette) - 1).bit_length())
+    now = nbt.Long(time.time() * 1000)
+    nbt.write(
+        path,
+        {
+            "MinecraftDataVersion": DATA_VERSION,
+            "Version": 6,
+            "SubVersion": 1,
+            "Metadata": {
+                "Name": path.name.split(".")[0],
+                "Author": APP_NAME,
+                "Description": "",
+                "RegionCount": 1,
+                "TotalBlocks": grid.blocks_count,
+                "TotalVolume": grid.volume,
+                "EnclosingSize": size,
+                "TimeCreated": now,
+                "TimeModified": now,
+            },
+            "Regions": {
+                "main": {
+                    "Position": {"x": 0, "y": 0, "z": 0},
+                    "Size": size,
+                    "BlockStatePalette": grid.palette_entries(),
+                    "BlockStates": nbt.pack_longs(grid.indices, bits),
+                    "TileEntities": [],
+                    "Entities": [],
+                    "PendingBlockTicks": [],
+                    "PendingFluidTicks": [],
+                }
+            },
+        },
+    )
+
+
+def _write_datapack(
+    grid: BlockGrid, path: Path, *, dimension: Dimension, tick_budget: int
+):
+    """Datapack whose functions /fill the structure, part by part."""
+    name = re.sub(r"[^a-z0-9_.-]", "_", path.name.split(".")[0].lower())
+
+    parts: list[list[str]] = [[]]
+    budget = tick_budget
+    for box, command in fill_commands(
+        grid, dimension=dimension, max_volume=min(MAX_FILL_VOLUME, tick_budget)
+    ):
+        if box.volume > budget:
+            parts.append([])
+            budget = tick_budget
+        budget -= box.volume
+        parts[-1].append(command)
+
+    function_dir = f"data/{_NAMESPACE}/function"
+    with ZipFile(path, "w", ZIP_DEFLATED) as datapack:
+        datapack.writestr(
+            "pack.mcmeta",
+            json.dumps({
+                "pack": {
+                    "pack_format": PACK_FORMAT,
+                    "description": f"Built by {APP_NAME}",
+                }
+            }),
+        )
+        datapack.writestr(
+            f"{function_dir}/{name}.mcfunction",
+            f"function {_NAMESPACE}:{name}/0\n",
+        )
+        for i, commands in enumerate(parts):
+            if i + 1 < len(parts):
+                commands.append(f"schedule function {_NAMESPACE}:{name}/{i + 1} 1t")
+            datapack.writestr(
+                f"{function_dir}/{name}/{i}.mcfunction", "\n".join(commands) + "\n"
+            )
+
+
+def fill_commands(
+    grid: BlockGrid,
+    *,
+    dimension: Dimension,
+    max_volume=MAX_FILL_VOLUME,
+    cells: array[int] | None = None,
+    skip: int | None = None,
+) -> Iterator[tuple[Box, str]]:
+    """/fill commands for the grid's blocks, merged into boxes, bottom first.
+
+    By default all of the grid's cells are filled except voids;
+    pass other `cells` and `skip` to fill only some of them.
+    """
+    if cells is None:
+        cells, skip = grid.indices, grid.void
+    states = [f"minecraft:{state}" for state in grid.palette]
+    prefix = (
+        ""
+        if dimension is Dimension.overworld
+        else f"execute in {_DIMENSION_IDS[dimension]} run "
+    )
+    with metrics.phase("merge"):
+        boxes = list(
+            merge_boxes(
+                cells,
+                (grid.size_x, grid.size_y, grid.size_z),
+                skip=skip,
+                max_volume=max_volume,
+            )
+        )
+    for box in boxes:
+        x, y, z = grid.min_x + box.x, grid.min_y + box.y, grid.min_z + box.z
+        yield (
+            box,
+            f"{prefix}fill {x} {y} {z}"
+            f" {x + box.size_x - 1} {y + box.size_y - 1} {z + box.size_z - 1}"
+            f" {states[box.value]}",
+        )
+
+
+def _unsigned_short(value: int) -> nbt.Short:
+    if value > 0xFFFF:
+        raise UsageError("Structure is too large for a schematic file.")
+    return nbt.Short(value - 0x10000 if value > 0x7FFF else value)
+
+
+_WRITERS: dict[str, Callable[[BlockGrid, Path], None]] = {
+    ".nbt": _write_structure,
+    ".schem": _write_schematic,
+    ".litematic": _write_litematic,
+}
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# /fill's limit
+MAX_FILL_VOLUME = 32768
+
+
+class Box(NamedTuple):
+    x: int
+    y: int
+    z: int
+    size_x: int
+    size_y: int
+    size_z: int
+    value: int
+
+    @property
+    def volume(self) -> int:
+        return self.size_x * self.size_y * self.size_z
+
+
+def merge_boxes(
+    cells: array[int],
+    size: tuple[int, int, int],
+    *,
+    skip: int | None = None,
+    max_volume=MAX_FILL_VOLUME,
+) -> Iterator[Box]:
+    """Cover a grid with boxes of identical cells, greedily, except `skip` cells.
+
+    Cells are in Y-Z-X order, i.e. cell (x, y, z) is at index
+    (y * size_z + z) * size_x + x. Starting from the first uncovered cell,
+    each box grows as far as it can along X, then Z, then Y, so boxes come
+    out bottom layer first. Rows are compared as slices, but cells that fail
+    to extend a box are compared again by later ones, so the worst case is
+    superlinear.
+    """
+    size_x, size_y, size_z = size
+    layer = size_x * size_z
+    covered = bytearray(len(cells))
+    if skip is not None:
+        for i, value in enumerate(cells):
+            if value == skip:
+                covered[i] = 1
+
+    i = covered.find(0)
+    while i != -1:
+        value = cells[i]
+        y, rest = divmod(i, layer)
+        z, x = divmod(rest, size_x)
+
+        width = 1
+        max_width = min(size_x - x, max_volume)
+        while (
+            width < max_width
+            and not covered[i + width]
+            and cells[i + width] == value
+        ):
+            width += 1
+        row = array(cells.typecode, [value]) * width
+        free = bytes(width)
+
+        def is_free(start: int) -> bool:
+            end = start + width
+            return covered[start:end] == free and cells[start:end] == row
+
+        depth = 1
+        while (
+            z + depth < size_z
+            and width * (depth + 1) <= max_volume
+            and is_free(i + depth * size_x)
+        ):
+            depth += 1
+
+        height = 1
+        while (
+            y + height < size_y
+            and width * depth * (height + 1) <= max_volume
+            and all(
+                is_free(i + height * layer + dz * size_x) for dz in range(depth)
+            )
+        ):
+            height += 1
+
+        filled = b"\x01" * width
+        for dy in range(height):
+            for dz in range(depth):
+                start = i + dy * layer + dz * size_x
+                covered[start : start + width] = filled
+
+        yield Box(x, y, z, width, height, depth, value)
+        i = covered.find(0, i + width)
+
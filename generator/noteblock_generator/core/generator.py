@@ -2,22 +2,54 @@ from __future__ import annotations
 
 from functools import cached_property
 from itertools import product
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple
 
-from ..cli.console import Console
-from ..cli.progress_bar import ProgressBar
+from ..cli.console import Console, format_size
+from ..cli.progress_bar import CallbackProgress, ProgressBar
+from ..data.cache import PlacementCache
+from ..data.compact import CompactBlockMap, block_lookup, diff_blocks
+from ..data.loader import Source
+from ..data.schema import Building
 from .blocks import BlockMapper
-from .chunks import organize_chunks
+from .chunks import merge_chunks, organize_chunks, stream_chunks
 from .coordinates import CoordinateTranslator
 from .direction import Direction
+from .metrics import metrics
+from .parallel import place_rows, thread_count
+from .pipeline import background
 from .placement import PlacementConfig
+from .plan import CostModel, make_plan
 from .session import GeneratingSession
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
     from ..cli.args import Align, Dimension, Facing, Tilt, Walkable
-    from ..data.schema import BlockMap, BlockState, Building, Size
-    from .coordinates import XYZ
-    from .world import World
+    from ..cli.progress_bar import ProgressCallback
+    from ..data.cache import CachedChunks
+    from ..data.schema import Blocks, BlockState, Size
+    from .checkpoint import Checkpoint
+    from .chunks import ChunkEdits, ChunksData
+    from .coordinates import XYZ, XZ, Bounds
+    from .plan import Plan
+    from .world import PlayerFiles, World, WriteSummary
+
+    Placements = Iterator[tuple[XYZ, BlockState | None]]
+
+
+# chunk rows placed ahead of the writer
+_PLACEMENT_QUEUE_SIZE = 4
+
+
+class GeneratorState(NamedTuple):
+    prev_size: Size | None
+    cached_blocks: CompactBlockMap | None
+
+
+class Prepared(NamedTuple):
+    building: Building | None
+    cached_chunks: CachedChunks | None
+    cache_key: str | None
 
 
 class Generator:
@@ -33,6 +65,16 @@ class Generator:
         theme: list[BlockState],
         walkable: Walkable,
         preserve_terrain: bool,
+        player: str | None = None,
+        snap: int = 0,
+        cache: PlacementCache | None = None,
+        flush_interval: int | None = None,
+        streaming: bool = False,
+        pipelined: bool = False,
+        threads: int = 1,
+        relight: bool = False,
+        create_missing: bool = False,
+        progress: ProgressCallback | None = None,
     ):
         self.session = session
         self.coordinates = coordinates
@@ -43,31 +85,69 @@ class Generator:
         self.theme = theme
         self.walkable = walkable
         self.preserve_terrain = preserve_terrain
+        self.player = player
+        self.snap = snap
+        self.cache = cache
+        self.flush_interval = flush_interval
+        self.streaming = streaming
+        self.pipelined = pipelined
+        self.threads = threads
+        self.relight = relight
+        self.create_missing = create_missing
+        self.progress = progress
 
         self._prev_size: Size | None = None
-        self._cached_blocks: BlockMap = {}
+        self._cached_blocks: CompactBlockMap | None = None
+        # before snapping
+        self._requested_coordinates: XYZ | None = None
+
+    def generate(
+        self, data: Building | Source, *, cached=False
+    ) -> WriteSummary | None:
+        if isinstance(data, Source):
+            if self.cache is None:
+                # decode while amulet is imported and the world is copied and loaded
+                data.decode_in_background()
+            return self._generate(data)
 
-    def generate(self, data: Building, *, cached=False):
-        blocks: BlockMap = data.blocks
+        blocks: Blocks = data.blocks
         size = data.size
 
-        if cached and self._cached_blocks:
-            blocks = {
-                k: v for k, v in blocks.items() if self._cached_blocks.get(k) != v
-            }
-            if not blocks:
-                Console.info("No changes from last generation.")
-                return
-            Console.info(
-                "{blocks} changed from last generation.", blocks=f"{len(blocks)} blocks"
-            )
+        if cached:
+            if not isinstance(blocks, CompactBlockMap):
+                blocks = CompactBlockMap.pack(dict(blocks), size)
+            merged = blocks
+            if self._cached_blocks:
+                blocks, merged = diff_blocks(self._cached_blocks, blocks)
+                if not blocks:
+                    Console.info("No changes from last generation.")
+                    return
+                Console.info(
+                    "{blocks} changed from last generation.",
+                    blocks=f"{len(blocks)} blocks",
+                )
 
-        self._generate(size, blocks)
+        summary = self._generate(Building(blocks=blocks, size=size))
 
         if cached:
-            self._cached_blocks |= blocks
+            self._cached_blocks = merged
             self._prev_size = size
 
+        return summary
+
+    @property
+    def state(self) -> GeneratorState:
+        """What cached regenerations are diffed against."""
+        return GeneratorState(self._prev_size, self._cached_blocks)
+
+    @state.setter
+    def state(self, state: GeneratorState):
+        self._prev_size, self._cached_blocks = state
+
+    def reset(self):
+        """Forget previous generations; the next one will be a full generation."""
+        self.state = GeneratorState(None, None)
+
     @cached_property
     def _config(self):
         assert self.coordinates is not None
@@ -84,6 +164,11 @@ class Generator:
             preserve_terrain=self.preserve_terrain,
         )
 
+    @property
+    def bounds(self) -> Bounds:
+        """Where the last generated structure is in the world."""
+        return self._coordinate_translator.calculate_bounds()
+
     @cached_property
     def _block_mapper(self) -> BlockMapper:
         return BlockMapper(self._config)
@@ -92,42 +177,260 @@ class Generator:
     def _coordinate_translator(self) -> CoordinateTranslator:
         return CoordinateTranslator(self._config)
 
-    def _generate(self, size: Size, blocks: BlockMap):
-        is_first_run = self._prev_size is None
+    def prepare(self, world: World, data: Building | Source) -> Prepared:
+        """Resolve positioning and validate bounds, before confirmation."""
+        if self._prev_size is None:
+            self._initialize_world_params(world)
+
+        cache_key: str | None = None
+        if self.cache is not None and isinstance(data, Source):
+            digest = data.digest
+            if self.snap and self._prev_size is None:
+                # the origin is yet to be snapped, which depends on the size
+                digest += f"|snap={self.snap}"
+            cache_key = self.cache.key(digest, self._config)
+            if (cached_chunks := self.cache.get(cache_key)) is not None:
+                Console.info("Using cached placement.")
+                self._prepare(world, cached_chunks.size)
+                return Prepared(None, cached_chunks, cache_key)
+
+        building = data.building if isinstance(data, Source) else data
+        self._prepare(world, building.size)
+        return Prepared(building, None, cache_key)
+
+    def place(self, prepared: Prepared, track) -> Mapping[XZ, ChunkEdits]:
+        """Place the structure into chunks, without writing them."""
+        if prepared.cached_chunks is not None:
+            return prepared.cached_chunks
+
+        building = prepared.building
+        assert building is not None
+        if (threads := self._threads) > 1:
+            organized = merge_chunks(self._rows(building, threads))
+        else:
+            organized = metrics.timed(
+                "organize", organize_chunks(self._placements(building))
+            )
+        chunks = track(
+            organized,
+            description=self._description,
+            transient=True,
+        )
+        if prepared.cache_key is not None:
+            self._store(prepared.cache_key, building.size, chunks)
+        return chunks
+
+    def plan(self, data: Building | Source) -> Plan:
+        """Estimate what generating would cost, without copying or writing."""
+        if None in (self.coordinates, self.dimension, self.facing, self.tilt):
+            from .world import PlayerFiles
+
+            # loading the world would lock it, possibly from the running game
+            self._initialize_world_params(PlayerFiles(self.session.path))
+        assert self.dimension is not None
 
+        building = data.building if isinstance(data, Source) else data
+        size = building.size
+        if self.snap:
+            self._snap_to_grid(size)
+        self._block_mapper.update_size(size)
+        self._coordinate_translator.update_size(size)
+
+        blocks = size.length * size.height * size.width
+        if self._should_stream:
+            # a chunk's worth of the length, for each row queued and the one written
+            held_blocks = size.height * size.width * 16 * (_PLACEMENT_QUEUE_SIZE + 1)
+        else:
+            held_blocks = blocks
+        return make_plan(
+            self.session.path,
+            self.dimension,
+            self.bounds,
+            self._get_block_placements(size, building.blocks),
+            blocks=blocks,
+            held_blocks=min(held_blocks, blocks),
+            overlapped=self.pipelined,
+            model=CostModel.load(),
+        )
+
+    def _generate(self, data: Building | Source) -> WriteSummary | None:
         with self.session as world:
-            if is_first_run:
-                self._initialize_world_params(world)
-            assert self.dimension is not None
-
-            self._block_mapper.update_size(size)
-            self._coordinate_translator.update_size(size)
-
-            if size != self._prev_size:
-                bounds = self._coordinate_translator.calculate_bounds()
-                world.validate_bounds(bounds, self.dimension)
-
-            with ProgressBar(cancellable=is_first_run) as track:
-                description = "Generating" if is_first_run else "Regenerating"
-                block_placements = self._get_block_placements(size, blocks)
-                chunks = track(
-                    organize_chunks(block_placements),
-                    description=description,
-                    transient=True,
-                )
-                track(
-                    world.write(chunks, self.dimension),
-                    description=description,
-                    jobs_count=len(chunks),
-                    transient=not is_first_run,
-                )
+            prepared = self.prepare(world, data)
+            checkpoint = self._start_checkpoint(data)
+            with self._progress_bar() as track:
+                building = prepared.building
+                if self._should_stream and prepared.cache_key is None:
+                    assert building is not None
+                    return self._write_stream(world, building, track, checkpoint)
+                chunks = self.place(prepared, track)
+                try:
+                    return self._write(world, chunks, track, checkpoint)
+                finally:
+                    if prepared.cached_chunks is not None:
+                        prepared.cached_chunks.close()
+
+    def _start_checkpoint(self, data: Building | Source) -> Checkpoint | None:
+        checkpoint = self.session.checkpoint
+        if checkpoint is None or not isinstance(data, Source):
+            return None
+        assert self.dimension is not None
+        key = PlacementCache.key(data.digest, self._config)
+        checkpoint.start(
+            f"{key}|{self.dimension.name}"
+            + f"|relight={self.relight}|create_missing={self.create_missing}",
+            self.bounds.chunks,
+        )
+        return checkpoint
 
-    def _get_block_placements(self, size: Size, blocks: BlockMap):
+    def _placements(self, building: Building) -> Placements:
+        return metrics.timed(
+            "place", self._get_block_placements(building.size, building.blocks)
+        )
+
+    def _rows(self, building: Building, threads: int) -> Iterator[ChunksData]:
+        # the translator and mapper were made by prepare(), on this thread
+        rows = place_rows(
+            self._coordinate_translator,
+            self._block_mapper,
+            building.size,
+            building.blocks,
+            threads=threads,
+        )
+        return metrics.timed("place", rows, size=_count_blocks)
+
+    @property
+    def _threads(self) -> int:
+        # Regenerations only place scattered blocks; there are no rows to split.
+        return thread_count(self.threads) if self._prev_size is None else 1
+
+    def _progress_bar(self):
+        if self.progress is not None:
+            return CallbackProgress(self.progress)
+        return ProgressBar(cancellable=self._prev_size is None)
+
+    @property
+    def _should_stream(self):
+        # Regenerations only touch scattered blocks; there is nothing to sweep.
+        return (self.streaming or self.pipelined) and self._prev_size is None
+
+    def _store(self, key: str, size: Size, chunks: ChunksData):
+        assert self.cache is not None
+        try:
+            self.cache.put(key, size, chunks)
+        except OSError as e:
+            Console.warn("Unable to write placement cache: {error}", error=e)
+
+    @property
+    def _description(self):
+        return "Generating" if self._prev_size is None else "Regenerating"
+
+    def _prepare(self, world: World, size: Size):
+        assert self.dimension is not None
+
+        if self.snap and self._prev_size is None:
+            self._snap_to_grid(size)
+        self._block_mapper.update_size(size)
+        self._coordinate_translator.update_size(size)
+
+        if size != self._prev_size:
+            bounds = self._coordinate_translator.calculate_bounds()
+            world.validate_bounds(bounds, self.dimension)
+
+    def _snap_to_grid(self, size: Size):
+        """Move the origin within `snap` blocks to touch the fewest chunks."""
+        if self._requested_coordinates is None:
+            self._requested_coordinates = self.coordinates
+        x, y, z = self._requested_coordinates
+        self._move_to((x, y, z))
+        self._coordinate_translator.update_size(size)
+        before = self._coordinate_translator.calculate_bounds()
+
+        dx, dz = before.snap_offset(self.snap)
+        if (dx, dz) == (0, 0):
+            return
+        self._move_to((x + dx, y, z + dz))
+        self._coordinate_translator.update_size(size)
+        after = self._coordinate_translator.calculate_bounds()
+        Console.info(
+            "Snapped by {offset} to touch {after} instead of {before}.",
+            offset=(dx, 0, dz),
+            after=f"{after.chunks_count} chunks in {after.regions_count} regions",
+            before=f"{before.chunks_count} chunks in {before.regions_count} regions",
+        )
+
+    def _move_to(self, coordinates: XYZ):
+        self.coordinates = coordinates
+        for name in ("_config", "_block_mapper", "_coordinate_translator"):
+            self.__dict__.pop(name, None)
+
+    def _write(
+        self,
+        world: World,
+        chunks: Mapping[XZ, ChunkEdits],
+        track,
+        checkpoint: Checkpoint | None = None,
+    ) -> WriteSummary | None:
+        assert self.dimension is not None
+        summary = track(
+            world.write(
+                chunks,
+                self.dimension,
+                flush_interval=self.flush_interval,
+                pipelined=self.pipelined,
+                relight=self.relight,
+                create_missing=self.create_missing,
+                checkpoint=checkpoint,
+            ),
+            description=self._description,
+            jobs_count=len(chunks),
+            transient=self._prev_size is not None,
+        )
+        report_write(summary)
+        return summary
+
+    def _write_stream(
+        self,
+        world: World,
+        building: Building,
+        track,
+        checkpoint: Checkpoint | None = None,
+    ) -> WriteSummary | None:
+        assert self.dimension is not None
+        translator = self._coordinate_translator
+        if (threads := self._threads) > 1:
+            batches = self._rows(building, threads)
+        else:
+            batches = metrics.timed(
+                "organize",
+                stream_chunks(
+                    self._placements(building), axis=translator.length_axis
+                ),
+            )
+        if self.pipelined:
+            batches = background(batches, maxsize=_PLACEMENT_QUEUE_SIZE)
+        summary = track(
+            world.write_stream(
+                batches,
+                self.dimension,
+                flush_interval=self.flush_interval,
+                pipelined=self.pipelined,
+                relight=self.relight,
+                create_missing=self.create_missing,
+                checkpoint=checkpoint,
+            ),
+            description=self._description,
+            jobs_count=translator.calculate_bounds().chunks_count,
+        )
+        report_write(summary)
+        return summary
+
+    def _get_block_placements(self, size: Size, blocks: Blocks) -> Placements:
         if self._prev_size is None:
+            block_at = block_lookup(blocks)
             for x, y, z in product(
                 range(size.length), range(size.height), range(size.width)
             ):
-                block = blocks.get(f"{x} {y} {z}")
+                block = block_at(x, y, z)
                 yield (
                     self._coordinate_translator.get((x, y, z)),
                     self._block_mapper.resolve(block, (x, y, z)),
@@ -144,7 +447,10 @@ class Generator:
                 self._block_mapper.resolve(block, (x, y, z)),
             )
 
-    def _initialize_world_params(self, world: World):
+    def _initialize_world_params(self, world: World | PlayerFiles):
+        if self.player is not None:
+            world.use_player(self.player, original_path=self.session.path)
+
         if not self.dimension:
             self.dimension = world.player_dimension
 
@@ -156,3 +462,27 @@ class Generator:
 
         if not self.tilt:
             self.tilt = world.player_tilt
+
+
+def _count_blocks(chunks: ChunksData) -> int:
+    return sum(map(len, chunks.values()))
+
+
+def report_write(summary: WriteSummary | None):
+    if summary:
+        Console.info(
+            "Wrote {chunks} in {regions} ({size}).",
+            chunks=f"{summary.chunks} chunks",
+            regions=f"{summary.regions} region files",
+            size=format_size(summary.bytes_written),
+        )
+        if summary.unchanged:
+            Console.info(
+                "Skipped {chunks} already up to date.",
+                chunks=f"{summary.unchanged} chunks",
+            )
+        if summary.created:
+            Console.info(
+                "Created {chunks} that had never been generated.",
+                chunks=f"{summary.created} chunks",
+            )
@@ -0,0 +1,355 @@
+"""Heightmaps and light for edited chunks, so the game needn't recompute them.
+
+The result is an approximation of vanilla's: blocks are classified by name
+only, and every non-opaque block lets light through at the usual cost of
+one level per step. Light spreads across the borders between edited
+chunks, but not into or out of chunks left untouched. That is close enough
+for the game to trust on load, and it relights blocks properly as soon as
+they change.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from amulet.api import Block
+    from amulet.api.chunk import Chunk
+    from amulet.api.registry import BlockManager
+
+    from .coordinates import XZ
+
+_MAX_LIGHT = 15
+
+# (dx, dz, side facing the neighbour, the neighbour's side facing back),
+# with sides numbered west, east, north, south
+_NEIGHBORS = ((-1, 0, 0, 1), (1, 0, 1, 0), (0, -1, 2, 3), (0, 1, 3, 2))
+
+# block flags
+_NON_AIR = 1
+_BLOCKS_MOTION = 2
+_LEAVES = 4
+_FLUID = 8
+_OPAQUE = 16
+
+_AIR = {"air", "cave_air", "void_air"}
+_FLUIDS = {"water", "lava", "bubble_column"}
+# let light through, and can be walked through
+_PASSABLE = {
+    "redstone_wire",
+    "torch",
+    "wall_torch",
+    "redstone_torch",
+    "redstone_wall_torch",
+    "soul_torch",
+    "soul_wall_torch",
+    "rail",
+    "powered_rail",
+    "detector_rail",
+    "activator_rail",
+    "lever",
+    "tripwire",
+    "tripwire_hook",
+    "ladder",
+    "vine",
+    "short_grass",
+    "tall_grass",
+    "grass",
+    "fern",
+    "snow",
+}
+_PASSABLE_SUFFIXES = ("_button", "_pressure_plate", "_sign", "_banner", "_carpet")
+# let light through, but can be stood on
+_TRANSPARENT = {
+    "glass",
+    "stained_glass",
+    "tinted_glass",
+    "ice",
+    "repeater",
+    "comparator",
+    "daylight_detector",
+    "slab",
+    "stairs",
+    "fence",
+    "fence_gate",
+    "wall",
+    "iron_bars",
+    "chain",
+    "lantern",
+    "soul_lantern",
+    "scaffolding",
+    "hopper",
+    "cauldron",
+    "beacon",
+    "sea_pickle",
+}
+_TRANSPARENT_SUFFIXES = (
+    "_slab",
+    "_stairs",
+    "_fence",
+    "_fence_gate",
+    "_wall",
+    "_pane",
+    "_glass",
+    "_door",
+    "_trapdoor",
+)
+_EMISSION = {
+    "beacon": 15,
+    "glowstone": 15,
+    "jack_o_lantern": 15,
+    "lantern": 15,
+    "lava": 15,
+    "sea_lantern": 15,
+    "shroomlight": 15,
+    "ochre_froglight": 15,
+    "verdant_froglight": 15,
+    "pearlescent_froglight": 15,
+    "end_rod": 14,
+    "torch": 14,
+    "wall_torch": 14,
+    "soul_lantern": 10,
+    "soul_torch": 10,
+    "soul_wall_torch": 10,
+    "crying_obsidian": 10,
+    "magma_block": 3,
+}
+# only when lit
+_LIT_EMISSION = {
+    "redstone_lamp": 15,
+    "furnace": 13,
+    "redstone_torch": 7,
+    "redstone_wall_torch": 7,
+    "redstone_ore": 9,
+}
+
+
+def _classify(block: Block) -> tuple[int, int]:
+    """A block's flags and light emission."""
+    name = block.base_name
+    if name in _AIR:
+        return 0, 0
+    emission = _EMISSION.get(name, 0)
+    if name in _LIT_EMISSION and str(block.properties.get("lit")) == "true":
+        emission = _LIT_EMISSION[name]
+    flags = _NON_AIR
+    if name in _FLUIDS:
+        flags |= _FLUID
+    elif name in _PASSABLE or name.endswith(_PASSABLE_SUFFIXES):
+        pass
+    elif name == "leaves" or name.endswith("_leaves"):
+        flags |= _BLOCKS_MOTION | _LEAVES
+    elif name in _TRANSPARENT or name.endswith(_TRANSPARENT_SUFFIXES):
+        flags |= _BLOCKS_MOTION
+    else:
+        flags |= _BLOCKS_MOTION | _OPAQUE
+    return flags, emission
+
+
+class _Sides(NamedTuple):
+    """Light on the sides of a lit chunk, for its neighbours."""
+
+    sky: np.ndarray | None
+    block: np.ndarray
+    transparent: np.ndarray
+
+
+class Lighting:
+    """Recompute heightmaps and light for chunks of one world.
+
+    Each chunk is lit with what the neighbours lit before it give off;
+    `unsettled` then carries light back the other way.
+    """
+
+    def __init__(
+        self, palette: BlockManager, floor_cy: int, height_cy: int, *, has_sky: bool
+    ):
+        self.palette = palette
+        self.floor_cy = floor_cy
+        self.height_cy = height_cy
+        self.has_sky = has_sky
+        # by palette id, extended as the palette grows
+        self._flags = np.zeros(0, np.uint8)
+        self._emission = np.zeros(0, np.uint8)
+        self._lit: dict[XZ, _Sides] = {}
+
+    def update(self, chunk: Chunk):
+        """Replace the chunk's heightmaps and light with recomputed ones."""
+        ids = self._column(chunk)
+        self._extend(int(ids.max()) + 1)
+        flags = self._flags[ids]
+
+        heightmaps = {
+            "WORLD_SURFACE": self._heightmap(flags & _NON_AIR),
+            "MOTION_BLOCKING": self._heightmap(flags & (_BLOCKS_MOTION | _FLUID)),
+            "MOTION_BLOCKING_NO_LEAVES": self._heightmap(
+                (flags & (_BLOCKS_MOTION | _FLUID)) * ((flags & _LEAVES) == 0)
+            ),
+            "OCEAN_FLOOR": self._heightmap(flags & _BLOCKS_MOTION),
+            "LIGHT_BLOCKING": self._heightmap(flags & (_OPAQUE | _FLUID)),
+        }
+        chunk.misc["height_mapC"] = heightmaps
+        if "height_map256IA" in chunk.misc:
+            chunk.misc["height_map256IA"] = heightmaps["LIGHT_BLOCKING"]
+
+        transparent = (flags & _OPAQUE) == 0
+        sky_seeds, block_seeds = self._seeds((chunk.cx, chunk.cz))
+        sky = None
+        if self.has_sky:
+            # columns are lit from the top down to their first opaque block
+            shaded = np.logical_or.accumulate(~transparent[:, ::-1], axis=1)
+            sky = np.where(shaded[:, ::-1], 0, _MAX_LIGHT).astype(np.uint8)
+            _seed(sky, transparent, sky_seeds)
+            sky = _spread(sky, transparent)
+            chunk.misc["sky_light"] = self._sections(sky)
+        else:
+            chunk.misc.pop("sky_light", None)
+        block = self._emission[ids]
+        _seed(block, transparent, block_seeds)
+        block = _spread(block, transparent)
+        chunk.misc["block_light"] = self._sections(block)
+        chunk.misc["isLightOn"] = 1
+        self._lit[chunk.cx, chunk.cz] = _Sides(
+            None if sky is None else _sides(sky), _sides(block), _sides(transparent)
+        )
+
+    def unsettled(self) -> Iterator[XZ]:
+        """Lit chunks that neighbours lit after them would light further.
+
+        Update each chunk before taking the next; chunks are yielded
+        until the light across their borders settles.
+        """
+        pending = deque(self._lit)
+        queued = set(pending)
+        while pending:
+            coords = pending.popleft()
+            queued.remove(coords)
+            if not self._darker_than_neighbors(coords):
+                continue
+            yield coords
+            cx, cz = coords
+            for dx, dz, _, _ in _NEIGHBORS:
+                neighbor = (cx + dx, cz + dz)
+                if neighbor in self._lit and neighbor not in queued:
+                    pending.append(neighbor)
+                    queued.add(neighbor)
+
+    def _seeds(self, coords: XZ) -> tuple[np.ndarray, np.ndarray]:
+        """The light lit neighbours give off onto each side of the chunk."""
+        sections = self.height_cy - self.floor_cy
+        sky = np.zeros((4, sections * 16, 16), np.uint8)
+        block = np.zeros_like(sky)
+        cx, cz = coords
+        for dx, dz, side, facing in _NEIGHBORS:
+            if (neighbor := self._lit.get((cx + dx, cz + dz))) is None:
+                continue
+            if neighbor.sky is not None:
+                sky[side] = _dimmed(neighbor.sky[facing])
+            block[side] = _dimmed(neighbor.block[facing])
+        return sky, block
+
+    def _darker_than_neighbors(self, coords: XZ) -> bool:
+        sides = self._lit[coords]
+        sky_seeds, block_seeds = self._seeds(coords)
+        darker = block_seeds > sides.block
+        if sides.sky is not None:
+            darker |= sky_seeds > sides.sky
+        return bool((darker & sides.transparent).any())
+
+    def _column(self, chunk: Chunk) -> np.ndarray:
+        """The chunk's block ids, indexed [x, y, z] from the world's floor."""
+        sections = self.height_cy - self.floor_cy
+        ids = np.zeros((16, sections * 16, 16), np.uint32)
+        for cy in chunk.blocks.sub_chunks:
+            if self.floor_cy <= cy < self.height_cy:
+                y = (cy - self.floor_cy) * 16
+                ids[:, y : y + 16, :] = chunk.blocks.get_sub_chunk(cy)
+        return ids
+
+    def _extend(self, size: int):
+        known = len(self._flags)
+        if size <= known:
+            return
+        classified = [self._classify_id(i) for i in range(known, size)]
+        self._flags = np.concatenate(
+            [self._flags, np.array([f for f, _ in classified], np.uint8)]
+        )
+        self._emission = np.concatenate(
+            [self._emission, np.array([e for _, e in classified], np.uint8)]
+        )
+
+    def _classify_id(self, palette_id: int) -> tuple[int, int]:
+        flags, emission = _classify(self.palette[palette_id])
+        for extra in self.palette[palette_id].extra_blocks:
+            # e.g. waterlogged
+            extra_flags, extra_emission = _classify(extra)
+            flags |= extra_flags
+            emission = max(emission, extra_emission)
+        return flags, emission
+
+    def _heightmap(self, mask: np.ndarray) -> np.ndarray:
+        """One above the highest matching block of each column, indexed [z, x]."""
+        mask = mask != 0
+        has_any = mask.any(axis=1)
+        top = mask.shape[1] - np.argmax(mask[:, ::-1, :], axis=1)
+        heights = np.where(has_any, top, 0) + self.floor_cy * 16
+        return heights.T.astype(np.int64)
+
+    def _sections(self, light: np.ndarray) -> dict[int, np.ndarray]:
+        # amulet keeps light in the file's [y, z, x] order
+        return {
+            self.floor_cy + i: np.ascontiguousarray(
+                light[:, i * 16 : i * 16 + 16, :].transpose(1, 2, 0)
+            )
+            for i in range(self.height_cy - self.floor_cy)
+        }
+
+
+def _sides(values: np.ndarray) -> np.ndarray:
+    """A chunk's west, east, north and south sides, each indexed [y, along]."""
+    return np.stack([values[0], values[15], values[:, :, 0].T, values[:, :, 15].T])
+
+
+def _seed(light: np.ndarray, transparent: np.ndarray, seeds: np.ndarray):
+    """Raise the transparent blocks on the chunk's sides to at least `seeds`."""
+    sides = (light[0], light[15], light[:, :, 0].T, light[:, :, 15].T)
+    clear = _sides(transparent)
+    for side, seed, mask in zip(sides, seeds, clear):
+        np.maximum(side, np.where(mask, seed, 0), out=side)
+
+
+def _dimmed(light: np.ndarray) -> np.ndarray:
+    return np.maximum(light, 1) - 1
+
+
+def _spread(light: np.ndarray, transparent: np.ndarray) -> np.ndarray:
+    """Flood light through transparent blocks, one level less per step."""
+    light = light.copy()
+    for _ in range(_MAX_LIGHT - 1):
+        dimmed = _dimmed(light)
+        neighbors = np.zeros_like(light)
+        for axis in range(3):
+            n = light.shape[axis]
+            _max_into(neighbors, dimmed, axis, slice(1, n), slice(0, n - 1))
+            _max_into(neighbors, dimmed, axis, slice(0, n - 1), slice(1, n))
+        spread = np.where(transparent, np.maximum(light, neighbors), light)
+        if np.array_equal(spread, light):
+            break
+        light = spread
+    return light
+
+
+def _max_into(target: np.ndarray, source: np.ndarray, axis: int, dst, src):
+    index_dst = [slice(None)] * 3
+    index_src = [slice(None)] * 3
+    index_dst[axis], index_src[axis] = dst, src
+    np.maximum(
+        target[tuple(index_dst)],
+        source[tuple(index_src)],
+        out=target[tuple(index_dst)],
+    )
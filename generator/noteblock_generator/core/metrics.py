@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, TypeVar
+
+from msgspec import Struct
+
+from .. import __version__
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class PhaseReport(Struct):
+    calls: int
+    items: int
+    wall_time: float
+    cpu_time: float
+
+
+class Report(Struct):
+    version: str
+    timestamp: float
+    wall_time: float
+    cpu_time: float
+    # peak memory during this generation, where the platform can tell
+    peak_rss: int | None
+    blocks: int
+    chunks: int
+    bytes_written: int
+    blocks_per_second: float | None
+    chunks_per_second: float | None
+    phases: dict[str, PhaseReport]
+    # size of the world's shadow copy
+    backup_bytes: int = 0
+    # peak memory since the process started, e.g. an earlier generation's
+    process_peak_rss: int | None = None
+
+
+class _Frame:
+    __slots__ = ("name", "started", "wall_start", "cpu_start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.resume()
+        self.started = self.wall_start
+
+    def resume(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+
+
+class Metrics:
+    """Collects time spent in each phase of a generation.
+
+    Phases may nest, including across generators that drive each other;
+    each phase is only charged for its own time, not its children's.
+    The total is measured from the first phase after a reset,
+    so that idle time (e.g. waiting for input changes) is not counted.
+    Disabled by default, in which case recording is a no-op.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stacks: dict[int, list[_Frame]] = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._phases: dict[str, PhaseReport] = {}
+            self._counters: dict[str, int] = {}
+            # first start and last end of each phase
+            self._spans: dict[str, tuple[float, float]] = {}
+            self._wall_start: float | None = None
+            self._cpu_start = 0.0
+            self._peak_reset = self.enabled and _reset_peak_rss()
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        if self._wall_start is None:
+            self._wall_start = time.perf_counter()
+            self._cpu_start = time.process_time()
+
+        thread_id = threading.get_ident()
+        stack = self._stacks.setdefault(thread_id, [])
+        if stack:
+            self._charge(stack[-1], calls=0)
+        stack.append(_Frame(name))
+        try:
+            yield
+        finally:
+            self._charge(stack.pop(), calls=1)
+            if stack:
+                stack[-1].resume()
+            else:
+                del self._stacks[thread_id]
+
+    def stages(self, thread_id: int) -> list[str]:
+        """Names of the phases a thread is currently in, outermost first."""
+        return [frame.name for frame in self._stacks.get(thread_id, ())]
+
+    def timed(
+        self,
+        name: str,
+        generator: Generator[T, None, R],
+        *,
+        size: Callable[[T], int] | None = None,
+    ) -> Generator[T, None, R]:
+        """Charge the time spent producing each item to the given phase.
+
+        With `size`, each item counts as that many, e.g. a batch of blocks.
+        """
+        if not self.enabled:
+            return generator
+        return self._timed(name, generator, size)
+
+    def count(self, name: str, value: int):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def report(self) -> Report:
+        now = time.perf_counter()
+        wall_time = now - (self._wall_start or now)
+        cpu_time = time.process_time() - self._cpu_start if self._wall_start else 0.0
+        with self._lock:
+            phases = dict(self._phases)
+            counters = dict(self._counters)
+            spans = [
+                self._spans[name] for name in ("edit", "commit") if name in self._spans
+            ]
+
+        blocks = phases["place"].items if "place" in phases else 0
+        chunks = counters.get("chunks", 0)
+        # elapsed, not summed across threads, which commit alongside editing
+        write_time = (
+            max(end for _, end in spans) - min(start for start, _ in spans)
+            if spans
+            else 0.0
+        )
+        process_peak_rss = _process_peak_rss()
+
+        return Report(
+            version=__version__,
+            timestamp=time.time(),
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            peak_rss=_peak_rss() if self._peak_reset else None,
+            blocks=blocks,
+            chunks=chunks,
+            bytes_written=counters.get("bytes_written", 0),
+            blocks_per_second=(
+                blocks / phases["place"].wall_time
+                if blocks and phases["place"].wall_time
+                else None
+            ),
+            chunks_per_second=chunks / write_time if chunks and write_time else None,
+            phases=phases,
+            backup_bytes=counters.get("backup_bytes", 0),
+            process_peak_rss=process_peak_rss,
+        )
+
+    def _timed(
+        self,
+        name: str,
+        generator: Generator[T, None, R],
+        size: Callable[[T], int] | None,
+    ):
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(generator)
+                except StopIteration as e:
+                    return e.value
+                self._count_items(name, size(item) if size else 1)
+            yield item
+
+    def _count_items(self, name: str, count: int):
+        with self._lock:
+            self._get_phase(name).items += count
+
+    def _charge(self, frame: _Frame, *, calls: int):
+        now = time.perf_counter()
+        wall_time = now - frame.wall_start
+        cpu_time = time.thread_time() - frame.cpu_start
+        with self._lock:
+            phase = self._get_phase(frame.name)
+            phase.calls += calls
+            phase.wall_time += wall_time
+            phase.cpu_time += cpu_time
+            if calls:
+                start, _ = self._spans.get(frame.name, (frame.started, now))
+                self._spans[frame.name] = (min(start, frame.started), now)
+
+    def _get_phase(self, name: str) -> PhaseReport:
+        if (phase := self._phases.get(name)) is None:
+            phase = self._phases[name] = PhaseReport(0, 0, 0.0, 0.0)
+        return phase
+
+
+def _reset_peak_rss() -> bool:
+    """Restart the kernel's peak memory count, on Linux only."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _peak_rss() -> int | None:
+    """Peak memory since the last reset."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _process_peak_rss() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+metrics = Metrics()
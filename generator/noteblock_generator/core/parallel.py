@@ -0,0 +1,114 @@
+"""Place a structure on a pool of threads, one row of chunks at a time.
+
+Rows are cut along the structure's length where it crosses into the next
+row of chunks, so no two rows share a chunk. Each row is placed by its own
+fork of the block mapper, whose theme rounding picks up from the boundary
+theme blocks of the rows before it, so the result is the same as placing
+on one thread.
+
+Placement is pure Python, so this only pays off on a free-threaded
+interpreter; under the GIL, `thread_count` falls back to one thread.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate, product
+from typing import TYPE_CHECKING
+
+from ..data.compact import block_lookup
+from .blocks import THEME_BLOCK
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from ..data.schema import Blocks, Size
+    from .blocks import BlockMapper
+    from .chunks import ChunksData
+    from .coordinates import CoordinateTranslator
+
+# rows placed ahead of the consumer, per thread
+_ROWS_AHEAD = 2
+
+
+def gil_enabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
+def thread_count(requested: int) -> int:
+    """Threads to place with, 0 for one per core; always 1 under the GIL."""
+    if gil_enabled():
+        return 1
+    if requested:
+        return requested
+    cpu_count = getattr(os, "process_cpu_count", os.cpu_count)
+    return cpu_count() or 1
+
+
+def chunk_rows(translator: CoordinateTranslator, length: int) -> list[range]:
+    """Split the length where the structure crosses into another row of chunks."""
+    axis = translator.length_axis
+
+    def row(x: int) -> int:
+        # the length axis depends on x alone
+        return translator.get((x, 0, 0))[axis] >> 4
+
+    starts = [0] + [x for x in range(1, length) if row(x) != row(x - 1)]
+    return [range(a, b) for a, b in zip(starts, starts[1:] + [length])]
+
+
+def place_rows(
+    translator: CoordinateTranslator,
+    mapper: BlockMapper,
+    size: Size,
+    blocks: Blocks,
+    *,
+    threads: int,
+) -> Iterator[ChunksData]:
+    """Place the structure, yielding each row of chunks in order.
+
+    The translator and mapper must be ready for the size; the threads only
+    read them, apart from the mapper's rotation cache, which is safe to share.
+    """
+    rows = chunk_rows(translator, size.length)
+    boundaries = mapper.theme_boundaries
+    block_at = block_lookup(blocks)
+
+    def count_boundaries(xs: range) -> int:
+        return sum(
+            block_at(x, y, z) == THEME_BLOCK
+            for x, y, z in product(xs, range(size.height), boundaries)
+        )
+
+    def place(xs: range, skipped_boundaries: int) -> ChunksData:
+        row_mapper = mapper.fork(skipped_boundaries=skipped_boundaries)
+        chunks: ChunksData = {}
+        for x, y, z in product(xs, range(size.height), range(size.width)):
+            block = row_mapper.resolve(block_at(x, y, z), (x, y, z))
+            world_x, world_y, world_z = translator.get((x, y, z))
+            cx, offset_x = divmod(world_x, 16)
+            cz, offset_z = divmod(world_z, 16)
+            if (cx, cz) not in chunks:
+                chunks[cx, cz] = {}
+            chunks[cx, cz][offset_x, world_y, offset_z] = block
+        return chunks
+
+    executor = ThreadPoolExecutor(threads, thread_name_prefix="place")
+    try:
+        if boundaries:
+            skipped = list(accumulate(executor.map(count_boundaries, rows), initial=0))
+        else:
+            skipped = [0] * len(rows)
+        pending: deque[Future[ChunksData]] = deque()
+        for xs, skipped_boundaries in zip(rows, skipped):
+            pending.append(executor.submit(place, xs, skipped_boundaries))
+            if len(pending) > threads * _ROWS_AHEAD:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
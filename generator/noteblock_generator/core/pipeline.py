@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+T = TypeVar("T")
+
+_POLL_INTERVAL = 0.1
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def background(iterable: Iterable[T], *, maxsize: int) -> Iterator[T]:
+    """Iterate on a separate thread, running at most `maxsize` items ahead."""
+
+    queue: Queue[object] = Queue(maxsize)
+    stopped = Event()
+
+    def put(item: object):
+        while not stopped.is_set():
+            try:
+                return queue.put(item, timeout=_POLL_INTERVAL)
+            except Full:
+                continue
+
+    def produce():
+        try:
+            for item in iterable:
+                if stopped.is_set():
+                    return
+                put(item)
+        except BaseException as e:
+            put(_Failure(e))
+        else:
+            put(_DONE)
+
+    Thread(target=produce, daemon=True).start()
+    try:
+        while (item := queue.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item  # pyright: ignore[reportReturnType]
+    finally:
+        stopped.set()
+
+
+class Worker(Generic[T]):
+    """Process items on a separate thread, accepting at most `maxsize` pending items.
+
+    Errors raised by the worker are re-raised on the next call to `submit` or `join`.
+    """
+
+    def __init__(self, func: Callable[[T], object], *, maxsize: int):
+        self._func = func
+        self._queue: Queue[object] = Queue(maxsize)
+        self._error: BaseException | None = None
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._queue.put(_DONE)
+        self._thread.join()
+        if exc_type is None:
+            self._raise_error()
+
+    def submit(self, item: T):
+        self._raise_error()
+        self._queue.put(item)
+
+    def join(self):
+        """Wait until all submitted items are processed."""
+        self._queue.join()
+        self._raise_error()
+
+    def _run(self):
+        while (item := self._queue.get()) is not _DONE:
+            try:
+                if self._error is None:  # skip the rest after a failure
+                    self._func(item)  # pyright: ignore[reportArgumentType]
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
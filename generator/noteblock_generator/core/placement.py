@@ -23,6 +23,19 @@ class PlacementConfig:
 
 
 class Placement(ABC):
+    __slots__ = (
+        "origin_x",
+        "origin_y",
+        "origin_z",
+        "direction",
+        "tilt",
+        "align",
+        "theme",
+        "walkable",
+        "empty_block",
+        "size",
+    )
+
     def __init__(self, config: PlacementConfig):
         self.origin_x, self.origin_y, self.origin_z = config.origin
         self.direction = config.direction
@@ -0,0 +1,161 @@
+"""Estimate what a generation will cost, before running it.
+
+Sizes are exact, read from the structure and the world's region headers.
+Times and memory come from a cost model, calibrated by the reports of
+past generations on this machine (see `--report`), and by timing
+placement of a sample of the structure itself.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from msgspec import DecodeError, Struct, json, structs
+
+from .. import APP_NAME
+from ..data.file_utils import directory_size
+from .chunks import REGION_DIRS, location, read_locations, region_of, sectors_size
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from ..cli.args import Dimension
+    from .coordinates import Bounds
+    from .metrics import Report
+
+# blocks placed to time placement on this machine
+_SAMPLE_SIZE = 20_000
+_MODEL_FILE = "cost_model.json"
+
+
+class CostModel(Struct):
+    # defaults are conservative, for machines without past reports
+    seconds_per_block: float = 2e-5
+    seconds_per_chunk: float = 0.05
+    copy_bytes_per_second: float = 200e6
+    startup_seconds: float = 1.0
+    base_memory: int = 150 * 1024 * 1024
+    memory_per_block: float = 300.0
+    calibrated: bool = False
+
+    @staticmethod
+    def path() -> Path:
+        return Path(tempfile.gettempdir()) / APP_NAME / _MODEL_FILE
+
+    @classmethod
+    def load(cls) -> CostModel:
+        try:
+            return json.decode(cls.path().read_bytes(), type=cls)
+        except (OSError, DecodeError):
+            return cls()
+
+    def save(self):
+        path = self.path()
+        path.parent.mkdir(exist_ok=True)
+        temp = path.with_name(path.name + ".tmp")
+        temp.write_bytes(json.encode(self))
+        os.replace(temp, path)
+
+    def calibrate(self, report: Report) -> CostModel:
+        """This model, updated with what a generation's report measured."""
+        phases = report.phases
+
+        def wall_time(*names: str) -> float:
+            return sum(phases[name].wall_time for name in names if name in phases)
+
+        changes: dict[str, object] = {"calibrated": True}
+        if report.blocks:
+            placing = wall_time("place", "organize")
+            changes["seconds_per_block"] = placing / report.blocks
+            if report.peak_rss is not None:
+                if (held := report.peak_rss - self.base_memory) > 0:
+                    changes["memory_per_block"] = held / report.blocks
+                else:
+                    # too small a generation to tell blocks from the baseline
+                    changes["base_memory"] = report.peak_rss
+        if "edit" in phases and phases["edit"].calls:
+            writing = wall_time("edit", "commit", "light")
+            changes["seconds_per_chunk"] = writing / phases["edit"].calls
+        if report.backup_bytes and (copying := wall_time("hash", "backup")):
+            changes["copy_bytes_per_second"] = report.backup_bytes / copying
+        if "load_world" in phases:
+            changes["startup_seconds"] = wall_time("load_world")
+        return structs.replace(self, **changes)
+
+
+class Plan(NamedTuple):
+    blocks: int
+    chunks: int
+    regions: int
+    # chunks never generated
+    missing_chunks: int
+    rewrite_bytes: int
+    copy_bytes: int
+    wall_time: float
+    peak_memory: int
+    calibrated: bool
+
+
+def make_plan(
+    world_path: Path,
+    dimension: Dimension,
+    bounds: Bounds,
+    placements: Iterator[object],
+    *,
+    blocks: int,
+    held_blocks: int,
+    overlapped: bool,
+    model: CostModel,
+) -> Plan:
+    """Estimate generating `blocks` blocks within `bounds` into the world.
+
+    `placements` are timed on a sample; `held_blocks` is how many of them
+    are in memory at once, and with `overlapped`, placing and writing run
+    concurrently.
+    """
+    region_dir = world_path / REGION_DIRS[dimension]
+    rewrite_bytes = 0
+    missing_chunks = 0
+    headers: dict[tuple[int, int], tuple[int, ...]] = {}
+    for chunk in bounds.chunks:
+        rx, rz = region_of(chunk)
+        if (locations := headers.get((rx, rz))) is None:
+            locations = headers[rx, rz] = read_locations(
+                region_dir / f"r.{rx}.{rz}.mca"
+            )
+        if location(locations, chunk):
+            rewrite_bytes += sectors_size(locations, chunk)
+        else:
+            missing_chunks += 1
+
+    start = time.perf_counter()
+    sampled = sum(1 for _ in islice(placements, _SAMPLE_SIZE))
+    if sampled:
+        seconds_per_block = (time.perf_counter() - start) / sampled
+    else:
+        seconds_per_block = model.seconds_per_block
+
+    copy_bytes = directory_size(world_path)
+    placing = blocks * seconds_per_block
+    writing = bounds.chunks_count * model.seconds_per_chunk
+    wall_time = (
+        model.startup_seconds
+        + copy_bytes / model.copy_bytes_per_second
+        + (max(placing, writing) if overlapped else placing + writing)
+    )
+    return Plan(
+        blocks=blocks,
+        chunks=bounds.chunks_count,
+        regions=bounds.regions_count,
+        missing_chunks=missing_chunks,
+        rewrite_bytes=rewrite_bytes,
+        copy_bytes=copy_bytes,
+        wall_time=wall_time,
+        peak_memory=int(model.base_memory + held_blocks * model.memory_per_block),
+        calibrated=model.calibrated,
+    )
@@ -0,0 +1,352 @@
+"""Generate into a running server by sending it commands over RCON."""
+
+from __future__ import annotations
+
+import socket
+import struct
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from threading import Lock, local
+from typing import TYPE_CHECKING, NamedTuple
+
+from click import UsageError
+
+from ..cli.args import Dimension
+from ..cli.console import Console
+from ..cli.progress_bar import CallbackProgress, ProgressBar
+from ..data.loader import Source
+from .export import StructureResolver, fill_commands
+from .fill import MAX_FILL_VOLUME
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from ..cli.args import Align, Facing, Tilt, Walkable
+    from ..cli.progress_bar import ProgressCallback
+    from ..data.schema import BlockState, Building
+    from .coordinates import XYZ
+    from .export import BlockGrid
+
+_AUTH = 3
+_COMMAND = 2
+_HEADER = struct.Struct("<iii")
+
+_DEFAULT_PORT = 25575
+_TICK = 0.05  # seconds
+_POOL_SIZE = 4
+_RETRIES = 3
+
+# replies to commands that changed nothing, but didn't fail either
+_UNCHANGED = ("No blocks were filled", "Could not set the block")
+
+
+class RconError(Exception): ...
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Parse "host[:port]"."""
+    host, colon, port = address.rpartition(":")
+    if not colon:
+        return address, _DEFAULT_PORT
+    if not port.isdigit():
+        raise UsageError(f"Invalid RCON port: {port!r}.")
+    return host, int(port)
+
+
+class RconConnection:
+    """One authenticated RCON connection.
+
+    The vanilla server expects each read from the socket to hold exactly
+    one request, so a connection only has one command in flight;
+    concurrency comes from using several connections.
+    """
+
+    def __init__(self, address: tuple[str, int], password: str, *, timeout=10.0):
+        self._socket = socket.create_connection(address, timeout=timeout)
+        self._file = self._socket.makefile("rb")
+        self._next_id = 0
+        try:
+            request_id, _ = self._request(_AUTH, password)
+        except BaseException:
+            self.close()
+            raise
+        if request_id == -1:
+            self.close()
+            raise UsageError("RCON authentication failed.")
+
+    def command(self, command: str) -> str:
+        request_id, reply = self._request(_COMMAND, command)
+        if request_id != self._next_id:
+            raise RconError(f"Unexpected reply id {request_id}.")
+        return reply
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def _request(self, packet_type: int, body: str) -> tuple[int, str]:
+        self._next_id += 1
+        self._socket.sendall(_packet(self._next_id, packet_type, body))
+        return self._receive()
+
+    def _receive(self) -> tuple[int, str]:
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise RconError("Connection closed by server.")
+        length, request_id, _ = _HEADER.unpack(header)
+        payload = self._file.read(length - 8)
+        if len(payload) < length - 8:
+            raise RconError("Connection closed by server.")
+        return request_id, payload[:-2].decode("utf-8", "replace")
+
+
+def _packet(request_id: int, packet_type: int, body: str) -> bytes:
+    payload = body.encode() + b"\0\0"
+    return _HEADER.pack(len(payload) + 8, request_id, packet_type) + payload
+
+
+class _Throttle:
+    """Let through at most `per_tick` commands every server tick."""
+
+    def __init__(self, per_tick: int):
+        self.per_tick = per_tick
+        self._lock = Lock()
+        self._tick_start = 0.0
+        self._sent = 0
+
+    def acquire(self, count: int):
+        with self._lock:
+            now = time.perf_counter()
+            if now - self._tick_start >= _TICK:
+                self._tick_start, self._sent = now, 0
+            elif self._sent + count > self.per_tick:
+                time.sleep(self._tick_start + _TICK - now)
+                self._tick_start, self._sent = time.perf_counter(), 0
+            self._sent += count
+
+
+class RconPool:
+    """A few connections sending batches of commands concurrently.
+
+    When a connection fails, the rest of its batch is retried on a fresh
+    one. The command in flight may run twice, which is harmless for
+    /fill and /setblock.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        password: str,
+        *,
+        commands_per_tick: int,
+        size=_POOL_SIZE,
+        retries=_RETRIES,
+    ):
+        self.address = address
+        self.password = password
+        self.retries = retries
+        # enough to keep every connection busy for a tick
+        self.batch_size = max(1, commands_per_tick // size)
+        self._throttle = _Throttle(commands_per_tick)
+        self._executor = ThreadPoolExecutor(size, thread_name_prefix="rcon")
+        self._local = local()
+        self._connections: list[RconConnection] = []
+        self._lock = Lock()
+
+    def run(self, batches: Iterable[list[str]]):
+        """Send batches, yielding after each; return the replies in order."""
+        futures = [self._executor.submit(self._run, batch) for batch in batches]
+        replies: list[str] = []
+        for future in futures:
+            replies += future.result()
+            yield
+        return replies
+
+    def close(self):
+        self._executor.shutdown()
+        for connection in self._connections:
+            connection.close()
+        self._connections.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _run(self, batch: list[str]) -> list[str]:
+        replies: list[str] = []
+        failures = 0
+        while len(replies) < len(batch):
+            # resume after the last command the server answered
+            remaining = batch[len(replies) :]
+            self._throttle.acquire(len(remaining))
+            done = len(replies)
+            try:
+                connection = self._connection()
+                for command in remaining:
+                    replies.append(connection.command(command))
+            except (OSError, RconError):
+                self._discard_connection()
+                failures = 0 if len(replies) > done else failures + 1
+                if failures > self.retries:
+                    raise
+                time.sleep(_TICK * 2**failures)
+        return replies
+
+    def _connection(self) -> RconConnection:
+        if (connection := getattr(self._local, "connection", None)) is None:
+            connection = RconConnection(self.address, self.password)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _discard_connection(self):
+        if (connection := getattr(self._local, "connection", None)) is not None:
+            self._local.connection = None
+            with self._lock:
+                self._connections.remove(connection)
+            connection.close()
+
+
+class SendSummary(NamedTuple):
+    commands: int
+    blocks: int
+    failed: int
+
+
+class RconGenerator(StructureResolver):
+    """Send structures to a running server as merged /fill commands.
+
+    Regenerations only send the blocks that changed since the last
+    generation. Commands go out bottom layer first, and a layer is only
+    started once the one below is done, so that blocks needing support
+    never arrive before it.
+    """
+
+    def __init__(
+        self,
+        pool: RconPool,
+        *,
+        coordinates: XYZ | None,
+        dimension: Dimension | None,
+        facing: Facing | None,
+        tilt: Tilt | None,
+        align: Align,
+        theme: list[BlockState],
+        walkable: Walkable,
+        preserve_terrain: bool,
+        progress: ProgressCallback | None = None,
+    ):
+        if coordinates is None:
+            raise UsageError("Generating over RCON requires --at coordinates.")
+        super().__init__(
+            coordinates=coordinates,
+            facing=facing,
+            tilt=tilt,
+            align=align,
+            theme=theme,
+            walkable=walkable,
+            preserve_terrain=preserve_terrain,
+            progress=progress,
+        )
+        self.pool = pool
+        self.dimension = dimension or Dimension.overworld
+        self._previous: BlockGrid | None = None
+        self._confirmed = False
+
+    def generate(self, data: Building | Source, *, cached=False) -> SendSummary:
+        building = data.building if isinstance(data, Source) else data
+        grid = self.resolve(self._merge(building) if cached else building)
+
+        cells, skip = grid.indices, grid.void
+        if self._previous is not None and grid.bounds == self._previous.bounds:
+            cells, skip = _changes(grid, self._previous)
+
+        commands = fill_commands(
+            grid,
+            dimension=self.dimension,
+            max_volume=MAX_FILL_VOLUME,
+            cells=cells,
+            skip=skip,
+        )
+        # each layer is split into batches
+        layers: list[list[list[str]]] = []
+        blocks = 0
+        for _, layer in groupby(commands, key=lambda item: item[0].y):
+            batches: list[list[str]] = [[]]
+            for box, command in layer:
+                if len(batches[-1]) == self.pool.batch_size:
+                    batches.append([])
+                batches[-1].append(command)
+                blocks += box.volume
+            layers.append(batches)
+
+        replies = self._send(layers)
+        failures = [
+            reply
+            for reply in replies
+            if not reply.startswith(("Successfully", *_UNCHANGED))
+        ]
+        if failures:
+            Console.warn(
+                "{count} failed; the first reply was: {reply}",
+                count=f"{len(failures)} commands",
+                reply=failures[0],
+            )
+
+        summary = SendSummary(
+            commands=len(replies), blocks=blocks, failed=len(failures)
+        )
+        metrics.count("commands", summary.commands)
+        Console.info(
+            "Sent {commands} changing {blocks}.",
+            commands=f"{summary.commands} commands",
+            blocks=f"{summary.blocks} blocks",
+        )
+        # failed cells are resent by the next generation
+        self._previous = None if failures else grid
+        return summary
+
+    def _progress_bar(self):
+        if self.progress is not None:
+            return CallbackProgress(self.progress)
+        # the server is live, so the first generation is confirmed
+        confirm = not self._confirmed
+        self._confirmed = True
+        return ProgressBar(cancellable=confirm)
+
+    def _send(self, layers: list[list[list[str]]]) -> list[str]:
+        def send():
+            replies: list[str] = []
+            for batches in layers:
+                replies += yield from self.pool.run(batches)
+            return replies
+
+        # confirmed while resolving, before anything is sent
+        with super()._progress_bar() as track, metrics.phase("send"):
+            try:
+                return track(
+                    send(),
+                    description="Sending",
+                    jobs_count=sum(len(batches) for batches in layers),
+                )
+            except (OSError, RconError) as e:
+                raise UsageError(f"Lost connection to the server: {e}")
+
+
+def _changes(grid: BlockGrid, previous: BlockGrid) -> tuple[array[int], int]:
+    """The grid's cells, with those unchanged since `previous` to be skipped."""
+    skip = len(grid.palette)
+    # new palette index -> the same state's index in the previous grid
+    translation = [previous.palette.get(state, -1) for state in grid.palette]
+    void = grid.void
+    cells = array(grid.indices.typecode, grid.indices)
+    for i, (new, old) in enumerate(zip(grid.indices, previous.indices)):
+        if new == void or translation[new] == old:
+            cells[i] = skip
+    return cells, skip
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import shutil
+import socket
+import socketserver
+import stat
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Condition, Lock, Thread
+from typing import TYPE_CHECKING, Literal
+
+from click import UsageError
+from msgspec import DecodeError, Struct, field, json, structs
+
+from ..cli.console import Console, muted
+from ..data import loader
+from ..data.schema import Building
+from .chunks import ChunkLoadError
+from .metrics import Report, metrics
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .generator import Generator, GeneratorState
+    from .session import ServingSession
+
+Operation = Literal["generate", "regenerate", "undo"]
+
+# worlds kept on disk for undo
+_UNDO_LIMIT = 3
+
+
+class Request(Struct, forbid_unknown_fields=True):
+    op: Operation
+    id: int | str | None = None
+    building: Building | None = None
+    input: str | None = field(default=None, name="in")
+
+
+class Response(Struct, omit_defaults=True):
+    ok: bool
+    id: int | str | None = None
+    error: str | None = None
+    coalesced: bool = False
+    chunks: int = 0
+    regions: int = 0
+    bytes_written: int = 0
+    report: Report | None = None
+
+
+class _Job:
+    def __init__(self, request: Request, reply: Future[Response]):
+        self.request = request
+        self.reply = reply
+
+
+class Server:
+    """Serve generation requests for one world over a Unix domain socket.
+
+    Requests are JSON lines, each answered by a JSON line with its id.
+    They are executed one at a time; a run of queued generate/regenerate
+    requests is coalesced into one generation of the last structure.
+    Each generation is diffed against the previous one, as in watch mode,
+    written into the session's loaded world, and can be undone, up to a limit.
+    """
+
+    def __init__(
+        self, socket_path: Path, *, generator: Generator, session: ServingSession
+    ):
+        self.socket_path = socket_path
+        self.generator = generator
+        self.session = session
+
+        self._queue: list[_Job] = []
+        self._condition = Condition()
+        self._stopped = False
+        self._history: list[tuple[Path, GeneratorState]] = []
+        _remove_stale_socket(socket_path)
+        self._server = _UnixServer(str(socket_path), _Handler)
+        self._server.submit = self.submit
+
+    def serve_forever(self):
+        worker = Thread(target=self._work, daemon=True)
+        worker.start()
+        Console.info("Listening on {socket}", socket=self.socket_path)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            with self._condition:
+                self._stopped = True
+                self._condition.notify()
+            worker.join()
+            self.socket_path.unlink(missing_ok=True)
+            self.session.close()
+            for previous, _ in self._history:
+                shutil.rmtree(previous, ignore_errors=True)
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def submit(self, request: Request) -> Future[Response]:
+        reply: Future[Response] = Future()
+        with self._condition:
+            self._queue.append(_Job(request, reply))
+            self._condition.notify()
+        return reply
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    for job in self._queue:
+                        job.reply.set_result(Response(ok=False, error="Shutting down."))
+                    return
+                jobs, self._queue = self._queue, []
+
+            for group in _coalesce(jobs):
+                self._run(group)
+
+    def _run(self, jobs: list[_Job]):
+        last = jobs[-1].request
+        op = last.op
+        if any(job.request.op == "generate" for job in jobs):
+            op = "generate"
+
+        start = time.perf_counter()
+        try:
+            response = self._execute(op, last)
+        except Exception as e:
+            response = Response(ok=False, error=_error_message(e))
+
+        Console.info(
+            "{op}: {status} in {time}",
+            op=op,
+            status="done" if response.ok else response.error,
+            time=f"{time.perf_counter() - start:.2f}s",
+        )
+        for job in jobs:
+            job.reply.set_result(
+                structs.replace(
+                    response, id=job.request.id, coalesced=job.request is not last
+                )
+            )
+
+    def _execute(self, op: Operation, request: Request) -> Response:
+        if op == "undo":
+            return self._undo()
+
+        building = _building(request)
+        state = self.generator.state
+        if op == "generate":
+            self.generator.reset()
+
+        self.session.previous = None
+        enabled = metrics.enabled
+        metrics.enabled = True
+        metrics.reset()
+        try:
+            with muted():
+                summary = self.generator.generate(building, cached=True)
+        except BaseException:
+            self.generator.state = state
+            raise
+        finally:
+            report = metrics.report()
+            metrics.enabled = enabled
+
+        if self.session.previous is not None:
+            self._history.append((self.session.previous, state))
+            if len(self._history) > _UNDO_LIMIT:
+                oldest, _ = self._history.pop(0)
+                shutil.rmtree(oldest, ignore_errors=True)
+
+        if summary is None:  # no changes
+            return Response(ok=True, report=report)
+        return Response(
+            ok=True,
+            chunks=summary.chunks,
+            regions=summary.regions,
+            bytes_written=summary.bytes_written,
+            report=report,
+        )
+
+    def _undo(self) -> Response:
+        if not self._history:
+            raise UsageError("Nothing to undo.")
+        previous, state = self._history.pop()
+        self.session.restore(previous)
+        self.generator.state = state
+        return Response(ok=True)
+
+
+def _coalesce(jobs: list[_Job]) -> list[list[_Job]]:
+    """Group consecutive generations; each undo runs on its own."""
+    groups: list[list[_Job]] = []
+    for job in jobs:
+        if groups and job.request.op != "undo" and groups[-1][-1].request.op != "undo":
+            groups[-1].append(job)
+        else:
+            groups.append([job])
+    return groups
+
+
+def _building(request: Request) -> Building:
+    if request.building is not None:
+        return request.building
+    if request.input is not None:
+        return loader.load(Path(request.input))
+    raise UsageError(f"{request.op} requires either 'building' or 'in'.")
+
+
+def _remove_stale_socket(path: Path):
+    """Remove the socket left behind by a server that is no longer running."""
+    try:
+        if not stat.S_ISSOCK(path.stat().st_mode):
+            return
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(path))
+        except ConnectionRefusedError:
+            path.unlink(missing_ok=True)
+            return
+    raise UsageError(f"Another server is already listening on '{path}'.")
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, UsageError):
+        return error.format_message()
+    if isinstance(error, ChunkLoadError):
+        x, z = error.coordinates
+        return f"Failed to load chunk at ({x=}, {z=})."
+    return f"{type(error).__name__}: {error}"
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    submit: Callable[[Request], Future[Response]]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _UnixServer
+
+    def handle(self):
+        write_lock = Lock()
+        decoder = json.Decoder(Request)
+        # replies are sent from the worker thread as they complete,
+        # the connection must stay open until the last one is sent
+        pending = Condition()
+        pending_count = 0
+
+        def send(response: Response):
+            with write_lock:
+                self.wfile.write(json.encode(response) + b"\n")
+                self.wfile.flush()
+
+        def on_reply(reply: Future[Response]):
+            nonlocal pending_count
+            try:
+                send(reply.result())
+            finally:
+                with pending:
+                    pending_count -= 1
+                    pending.notify()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = decoder.decode(line)
+            except DecodeError as e:
+                send(Response(ok=False, error=f"Invalid request: {e}"))
+                continue
+            with pending:
+                pending_count += 1
+            self.server.submit(request).add_done_callback(on_reply)
+
+        with pending:
+            pending.wait_for(lambda: pending_count == 0)
@@ -3,14 +3,31 @@ from __future__ import annotations
 import os
 import shutil
 import signal
+from contextlib import nullcontext
+from importlib import import_module
 from pathlib import Path
+from threading import Thread
+from typing import TYPE_CHECKING
 
 from click import UsageError
+from msgspec import json
 
 from ..cli.console import Console
 from ..cli.progress_bar import UserCancelled
-from ..data.file_utils import backup_files, hash_files
-from .world import ChunkLoadError, World
+from ..data.file_utils import (
+    backup_files,
+    directory_size,
+    hash_files,
+    make_temp_path,
+    resume_path,
+    same_file,
+)
+from .checkpoint import Checkpoint, restore_unfinished
+from .chunks import ChunkLoadError
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .world import World
 
 _HANDLED_SIGNALS = set(signal.Signals) - {
     # uncatchable signals
@@ -19,6 +36,11 @@ _HANDLED_SIGNALS = set(signal.Signals) - {
 }
 
 
+def preload_world():
+    """Start importing amulet in the background; opening a world waits for it."""
+    Thread(target=import_module, args=(f"{__package__}.world",), daemon=True).start()
+
+
 class IgnoreInterrupt:
     def __init__(self):
         self._original_handlers = {}
@@ -35,16 +57,37 @@ class IgnoreInterrupt:
 
 
 class GeneratingSession:
-    def __init__(self, path: Path):
+    """Generate in a shadow copy of the world, then replace the original with it.
+
+    A non-interactive session never prompts, installs signal handlers,
+    or exits the process; errors are raised to the caller instead.
+    With `resume`, the shadow copy outlives a failed or interrupted session,
+    along with a `checkpoint` of its progress, and the next session with
+    `resume` picks up where it left off.
+    """
+
+    def __init__(self, path: Path, *, interactive=True, resume=False):
+        self.interactive = interactive
+        self.resume = resume
+        self.checkpoint: Checkpoint | None = None
         self._original_path = path
         self._working_path: str | None = None
         self._world: World | None = None
         self._world_hash: int | None = None
 
+    @property
+    def path(self) -> Path:
+        """The world's path, as given."""
+        return self._original_path
+
     def __enter__(self):
         self._world_hash = self._compute_hash()
-        self._working_path = self._create_shadow_copy()
-        self._setup_signal_handlers()
+        if self.resume:
+            self._working_path = self._resume_shadow_copy()
+        else:
+            self._working_path = self._create_shadow_copy()
+        if self.interactive:
+            self._setup_signal_handlers()
         try:
             return self._load_world()
         except Exception as e:
@@ -52,8 +95,15 @@ class GeneratingSession:
             raise
 
     def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is not None and not self.interactive and self._world:
+            # the process lives on, so release the world's files
+            self._world.close()
+
         self._cleanup(commit=exc_type is None)
 
+        if not self.interactive:
+            return
+
         if exc_type is UserCancelled:
             os._exit(0)
 
@@ -70,6 +120,10 @@ class GeneratingSession:
     def _load_world(self):
         if not self._working_path:
             # clone unsuccessful, must generate in-place
+            if not self.interactive:
+                raise UsageError(
+                    "Unable to copy the world; refusing to generate in-place."
+                )
             Console.warn(
                 "If you are inside the world, {highlighted}.",
                 highlighted="exit now before proceeding",
@@ -79,7 +133,10 @@ class GeneratingSession:
                 raise UserCancelled
 
         world_path = self._working_path or self._original_path
-        self._world = World.load(world_path)
+        with metrics.phase("load_world"):
+            from .world import World
+
+            self._world = World.load(world_path)
         return self._world
 
     def _setup_signal_handlers(self):
@@ -93,27 +150,64 @@ class GeneratingSession:
 
     def _compute_hash(self) -> int | None:
         try:
-            return hash_files(self._original_path)
+            with metrics.phase("hash"):
+                return hash_files(self._original_path)
         except FileNotFoundError:
             raise UsageError(f"World path '{self._original_path}' does not exist.")
 
-    def _create_shadow_copy(self):
+    def _create_shadow_copy(self, dst: Path | None = None):
         try:
-            return backup_files(self._original_path)
+            with metrics.phase("backup"):
+                working_path = backup_files(self._original_path, dst=dst)
         except PermissionError:
             raise UsageError(
                 "Permission denied to read save files. "
                 + "If the game is running, close it and try again.",
             )
+        if working_path and metrics.enabled:
+            metrics.count("backup_bytes", directory_size(Path(working_path)))
+        return working_path
+
+    def _resume_shadow_copy(self):
+        working_path = resume_path(self._original_path)
+        checkpoint_path = working_path.with_name(working_path.name + ".json")
+        if self._world_hash is None:
+            # there'd be no telling if the world changed before resuming
+            Console.warn(
+                "The world is too large to check for changes; --resume is unavailable."
+            )
+            shutil.rmtree(working_path, ignore_errors=True)
+            checkpoint_path.unlink(missing_ok=True)
+            return self._create_shadow_copy()
+        checkpoint = Checkpoint.load(checkpoint_path, self._world_hash)
+        if checkpoint is None or not working_path.is_dir():
+            shutil.rmtree(working_path, ignore_errors=True)
+            self.checkpoint = Checkpoint(checkpoint_path, self._world_hash)
+            return self._create_shadow_copy(working_path)
+
+        Console.info(
+            "Resuming an interrupted generation; {regions} already done.",
+            regions=f"{len(checkpoint.done)} region files",
+        )
+        with metrics.phase("backup"):
+            restore_unfinished(self._original_path, working_path, checkpoint.done)
+        self.checkpoint = checkpoint
+        return str(working_path)
 
     def _cleanup(self, *, commit: bool):
         if not self._working_path:
             return
+        if not commit and self.checkpoint is not None:
+            # keep the shadow copy to resume from
+            Console.info("Progress is saved; run again with --resume to continue.")
+            return
         try:
             if commit:
                 self._commit()
         finally:
             shutil.rmtree(self._working_path, ignore_errors=True)
+            if self.checkpoint is not None:
+                self.checkpoint.delete()
 
     def _externally_modified(self) -> bool:
         try:
@@ -133,9 +227,111 @@ class GeneratingSession:
             )
 
         self._world.close()
-        with IgnoreInterrupt():
+        # signals can only be handled on the main thread
+        ignore_interrupt = IgnoreInterrupt() if self.interactive else nullcontext()
+        with ignore_interrupt, metrics.phase("move"):
             # This section is critical but should be very fast (< 0.1s)
             # No need to handle signals, just ignore them
             if self._working_path:
                 shutil.rmtree(self._original_path, ignore_errors=True)
                 shutil.move(self._working_path, self._original_path)
+
+
+class ServingSession(GeneratingSession):
+    """Keep one shadow copy of the world loaded across generations.
+
+    Each generation writes into the loaded copy. Committing copies the region
+    files it changed over the original's, one file at a time, and keeps the
+    replaced ones (in `previous`) so that they can be restored. A failed
+    generation puts the copy's changed files back from the original instead,
+    so the original is untouched.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path, interactive=False)
+        self.previous: Path | None = None
+
+    def __enter__(self):
+        self.previous = None
+        if not self._working_path:
+            self._working_path = self._create_shadow_copy()
+        if self._world is None:
+            self._load_world()
+        return self._world
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            assert self._world is not None
+            # keep memory bounded across generations
+            self._world.purge()
+            self.previous = self._commit()
+        else:
+            self._discard()
+
+    def restore(self, previous: Path):
+        """Put back the files a commit replaced, kept in `previous`."""
+        with metrics.phase("move"):
+            created = json.decode((previous / _CREATED).read_bytes(), type=list[str])
+            for name in created:
+                (self._original_path / name).unlink(missing_ok=True)
+            kept = previous / _KEPT
+            for path in kept.glob("**/*.mca"):
+                _replace(path, self._original_path / path.relative_to(kept))
+        shutil.rmtree(previous, ignore_errors=True)
+        self._discard()
+
+    def close(self):
+        if self._world is not None:
+            self._world.close()
+            self._world = None
+        if self._working_path:
+            shutil.rmtree(self._working_path, ignore_errors=True)
+            self._working_path = None
+
+    def _commit(self) -> Path | None:
+        assert self._working_path
+        original, working = self._original_path, Path(self._working_path)
+        changed = [
+            path.relative_to(working)
+            for path in working.glob("**/*.mca")
+            if not same_file(path, original / path.relative_to(working))
+        ]
+        if not changed:
+            return None
+
+        previous = make_temp_path(original.name)
+        created: list[str] = []
+        with metrics.phase("move"):
+            for name in changed:
+                target = original / name
+                if target.exists():
+                    kept = previous / _KEPT / name
+                    kept.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(target, kept)
+                else:
+                    created.append(name.as_posix())
+                _replace(working / name, target)
+        (previous / _CREATED).write_bytes(json.encode(created))
+        return previous
+
+    def _discard(self):
+        """Reload the copy, with its changes reverted to the original."""
+        if self._world is not None:
+            self._world.close()
+            self._world = None
+        if self._working_path:
+            with metrics.phase("backup"):
+                restore_unfinished(self._original_path, Path(self._working_path), ())
+
+
+# where a commit keeps the files it replaced, and lists those it created
+_KEPT = "kept"
+_CREATED = "created.json"
+
+
+def _replace(source: Path, target: Path):
+    """Copy over `target` so that it is never seen half-written."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp = target.with_name(target.name + ".tmp")
+    shutil.copy2(source, temp)
+    os.replace(temp, target)
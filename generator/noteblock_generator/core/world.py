@@ -1,85 +1,129 @@
 from __future__ import annotations
 
 import math
+import uuid
+from contextlib import nullcontext
 from functools import cached_property
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, NamedTuple
 
+import amulet_nbt
+import numpy as np
 from amulet import load_format
 from amulet.api import Block
-from amulet.api.errors import LoaderNoneMatched
+from amulet.api.errors import LoaderNoneMatched, PlayerDoesNotExist
 from amulet.api.level import World as BaseWorld
+from amulet.api.player import Player
 from amulet.level.formats.anvil_world.format import AnvilFormat
+from amulet_nbt import CompoundTag, IntTag, ListTag, StringTag
 from click import UsageError
+from msgspec import DecodeError, Struct, json
 
 from ..cli.args import Dimension, Facing, Tilt
 from ..cli.console import Console
+from .checkpoint import LIGHTING_STEP
+from .chunks import (
+    REGION_DIRS,
+    ChunkLoadError,
+    location,
+    read_locations,
+    region_of,
+    sector_offset,
+    sectors_size,
+)
 from .direction import Direction, get_nearest_direction
+from .lighting import Lighting
+from .metrics import metrics
+from .pipeline import Worker
 from .preserve_terrain import resolve_empty_block
 
 if TYPE_CHECKING:
-    from .chunks import ChunkEdits, ChunksData
+    from collections.abc import Iterable, Mapping
+
+    from amulet.api.chunk import Chunk
+
+    from ..data.schema import BlockState
+    from .checkpoint import Checkpoint
+    from .chunks import ChunkEdits
     from .coordinates import XYZ, XZ, Bounds
 
 
-class ChunkLoadError(Exception):
-    def __init__(self, chunk_coords: XZ):
-        super().__init__("")
-        cx, cz = chunk_coords
-        self.coordinates = (cx << 4, cz << 4)
+class WriteSummary(NamedTuple):
+    chunks: int
+    regions: int
+    bytes_written: int
+    # chunks that already held the structure
+    unchanged: int = 0
+    # chunks that had never been generated
+    created: int = 0
 
 
-class World(BaseWorld):
-    @classmethod
-    def load(cls, world_path: str | Path) -> World:
-        world_path = str(world_path)
-        try:
-            format_wrapper = load_format(world_path)
-        except LoaderNoneMatched:
-            raise UsageError(
-                "Unrecognized world format. Are you sure that's a valid Minecraft save?"
-            )
-        if not isinstance(format_wrapper, AnvilFormat):
-            raise UsageError("Unsupported world format; expected Java Edition.")
+# biomes of created chunks
+_BIOMES = {
+    Dimension.overworld: "plains",
+    Dimension.nether: "nether_wastes",
+    Dimension.the_end: "the_end",
+}
 
-        return cls(world_path, format_wrapper)
+# names of players who joined a server, next to its world
+_USER_CACHE = "usercache.json"
+# where player files are kept, newest versions first
+_PLAYER_DIRS = ("players/data", "playerdata")
+_LOCAL_PLAYER = "~local_player"
+_OVERWORLD = "minecraft:overworld"
+_LEGACY_DIMENSIONS = {-1: "minecraft:the_nether", 0: _OVERWORLD, 1: "minecraft:the_end"}
 
-    def __init__(self, directory: str, format_wrapper: AnvilFormat):
-        super().__init__(directory, format_wrapper)
-        self.path = directory
-        players = tuple(self.get_player(_id) for _id in self.all_player_ids())
-        self.player = players[0] if players else None
-        self._wrapper = format_wrapper
 
-    def validate_bounds(self, bounds: Bounds, dimension: Dimension):
-        start = (bounds.min_x, bounds.min_y, bounds.min_z)
-        end = (bounds.max_x, bounds.max_y, bounds.max_z)
-        Console.info(
-            "Structure will occupy the space\n{start} to {end} in {dimension}.",
-            start=start,
-            end=end,
-            dimension=dimension.name,
-            important=True,
-        )
+class _CachedUser(Struct):
+    name: str
+    uuid: str
 
-        world_bounds = self.bounds(f"minecraft:{dimension.name}")
-        for coord, limit, axis in [
-            (bounds.min_x, world_bounds.min_x, "min X"),
-            (bounds.max_x, world_bounds.max_x, "max X"),
-            (bounds.min_y, world_bounds.min_y, "min Y"),
-            (bounds.max_y, world_bounds.max_y, "max Y"),
-            (bounds.min_z, world_bounds.min_z, "min Z"),
-            (bounds.max_z, world_bounds.max_z, "max Z"),
-        ]:
-            if ("max" in axis and coord > limit) or ("min" in axis and coord < limit):
-                raise UsageError(
-                    f"Structure exceeds world boundary at {axis}: {coord} vs {limit=}."
-                )
 
-    def write(self, chunks: ChunksData, dimension: Dimension):
-        for chunk_coords, data in chunks.items():
-            yield self._edit_chunk(chunk_coords, data, f"minecraft:{dimension.name}")
-        self._wrapper.save()
+class _Packed(NamedTuple):
+    """A chunk translated to the save format, ready to encode."""
+
+    cx: int
+    cz: int
+    interface: Any
+    chunk: Chunk
+    palette: Any
+
+
+_WRITE_QUEUE_SIZE = 16
+
+
+class _Positioning:
+    """Positioning options read from a world's player."""
+
+    path: str
+    _player_id: str | None
+    player: Player | None
+
+    def use_player(self, player: str, *, original_path: Path | None = None):
+        """Read positioning from this player, given by name or UUID.
+
+        Names are looked up beside `original_path`, the world this one
+        is a copy of, if any. Must be called before the player is first used.
+        """
+        self._player_id = self._resolve_player(player, original_path or Path(self.path))
+
+    def _resolve_player(self, player: str, world_path: Path) -> str:
+        try:
+            return str(uuid.UUID(player))
+        except ValueError:
+            pass
+        # the cache is in the server's directory, which holds the world
+        for directory in (world_path.parent, world_path):
+            try:
+                users = json.decode(
+                    (directory / _USER_CACHE).read_bytes(), type=list[_CachedUser]
+                )
+            except (OSError, DecodeError):
+                continue
+            for user in users:
+                if user.name.lower() == player.lower():
+                    return user.uuid
+        raise UsageError(f"Unknown player {player!r}; try their UUID instead.")
 
     # These cached_property aren't for performance,
     # but to ensure each Console.info is only printed once.
@@ -145,24 +189,418 @@ class World(BaseWorld):
         )
         return Tilt(default)
 
-    def _edit_chunk(self, chunk_coords: XZ, edits: ChunkEdits, dimension: str):
+
+class PlayerFiles(_Positioning):
+    """A world's players, read straight from its files.
+
+    Unlike loading the world, this neither locks nor writes anything,
+    so it is safe to use while the game has the world open.
+    """
+
+    def __init__(self, path: Path):
+        self.path = str(path)
+        self._player_id: str | None = None
+
+    @cached_property
+    def player(self) -> Player | None:
+        """The chosen player, else the first found; only read when needed."""
+        if self._player_id is not None:
+            for directory in _PLAYER_DIRS:
+                file = Path(self.path, directory, f"{self._player_id}.dat")
+                if (tag := _read_nbt(file)) is not None:
+                    return _player(self._player_id, tag)
+            raise UsageError(f"Player {self._player_id} is not in this world.")
+
+        for directory in _PLAYER_DIRS:
+            for file in Path(self.path, directory).glob("*.dat"):
+                if (tag := _read_nbt(file)) is not None:
+                    return _player(file.stem, tag)
+        # the player of a single-player world, in older versions
+        level = _read_nbt(Path(self.path, "level.dat"))
+        data = level.get("Data") if level is not None else None
+        if isinstance(data, CompoundTag) and isinstance(
+            player := data.get("Player"), CompoundTag
+        ):
+            return _player(_LOCAL_PLAYER, player)
+        return None
+
+
+def _read_nbt(path: Path) -> CompoundTag | None:
+    try:
+        return amulet_nbt.load(str(path)).compound
+    except (OSError, amulet_nbt.NBTError):
+        return None
+
+
+def _player(player_id: str, tag: CompoundTag) -> Player:
+    """As amulet reads players, with defaults for missing or invalid data."""
+    dimension = tag.get("Dimension")
+    if isinstance(dimension, StringTag):
+        dimension_id = dimension.py_str
+    elif isinstance(dimension, IntTag):
+        dimension_id = _LEGACY_DIMENSIONS.get(dimension.py_int, _OVERWORLD)
+    else:
+        dimension_id = _OVERWORLD
+
+    def floats(name: str, count: int) -> tuple[float, ...]:
+        values = tag.get(name)
+        if not isinstance(values, ListTag) or len(values) != count:
+            return (0.0,) * count
+        return tuple(float(value) for value in values)
+
+    return Player(player_id, dimension_id, floats("Pos", 3), floats("Rotation", 2))
+
+
+class World(_Positioning, BaseWorld):
+    @classmethod
+    def load(cls, world_path: str | Path) -> World:
+        world_path = str(world_path)
+        try:
+            format_wrapper = load_format(world_path)
+        except LoaderNoneMatched:
+            raise UsageError(
+                "Unrecognized world format. Are you sure that's a valid Minecraft save?"
+            )
+        if not isinstance(format_wrapper, AnvilFormat):
+            raise UsageError("Unsupported world format; expected Java Edition.")
+
+        return cls(world_path, format_wrapper)
+
+    def __init__(self, directory: str, format_wrapper: AnvilFormat):
+        super().__init__(directory, format_wrapper)
+        self.path = directory
+        self._player_id: str | None = None
+        self._wrapper = format_wrapper
+        self._block_ids_cache: dict[BlockState, tuple[int, int]] = {}
+
+    @cached_property
+    def player(self) -> Player | None:
+        """The chosen player, else the first found; only read when needed."""
+        if self._player_id is not None:
+            try:
+                return self.get_player(self._player_id)
+            except PlayerDoesNotExist:
+                raise UsageError(f"Player {self._player_id} is not in this world.")
+        player_id = next(iter(self.all_player_ids()), None)
+        return self.get_player(player_id) if player_id is not None else None
+
+    def validate_bounds(self, bounds: Bounds, dimension: Dimension):
+        start = (bounds.min_x, bounds.min_y, bounds.min_z)
+        end = (bounds.max_x, bounds.max_y, bounds.max_z)
+        Console.info(
+            "Structure will occupy the space\n{start} to {end} in {dimension}.",
+            start=start,
+            end=end,
+            dimension=dimension.name,
+            important=True,
+        )
+
+        world_bounds = self.bounds(f"minecraft:{dimension.name}")
+        for coord, limit, axis in [
+            (bounds.min_x, world_bounds.min_x, "min X"),
+            (bounds.max_x, world_bounds.max_x, "max X"),
+            (bounds.min_y, world_bounds.min_y, "min Y"),
+            (bounds.max_y, world_bounds.max_y, "max Y"),
+            (bounds.min_z, world_bounds.min_z, "min Z"),
+            (bounds.max_z, world_bounds.max_z, "max Z"),
+        ]:
+            if ("max" in axis and coord > limit) or ("min" in axis and coord < limit):
+                raise UsageError(
+                    f"Structure exceeds world boundary at {axis}: {coord} vs {limit=}."
+                )
+
+    def write(
+        self,
+        chunks: Mapping[XZ, ChunkEdits],
+        dimension: Dimension,
+        *,
+        flush_interval: int | None = None,
+        pipelined=False,
+        relight=False,
+        create_missing=False,
+        checkpoint: Checkpoint | None = None,
+    ):
+        return (
+            yield from self.write_stream(
+                [chunks],
+                dimension,
+                flush_interval=flush_interval,
+                pipelined=pipelined,
+                relight=relight,
+                create_missing=create_missing,
+                checkpoint=checkpoint,
+            )
+        )
+
+    def write_stream(
+        self,
+        batches: Iterable[Mapping[XZ, ChunkEdits]],
+        dimension: Dimension,
+        *,
+        flush_interval: int | None = None,
+        pipelined=False,
+        relight=False,
+        create_missing=False,
+        checkpoint: Checkpoint | None = None,
+    ):
+        dimension_id = f"minecraft:{dimension.name}"
+        region_dir = Path(self.path) / REGION_DIRS[dimension]
+        lighting = self._lighting(dimension) if relight else None
+        if checkpoint and checkpoint.is_done(LIGHTING_STEP):
+            lighting = None
+
+        def commit(chunk: Chunk):
+            with metrics.phase("commit"):
+                self._wrapper._commit_chunk(chunk, dimension_id)
+
+        def encode(item: _Packed):
+            with metrics.phase("commit"):
+                raw = self._wrapper._encode(
+                    item.interface, item.chunk, dimension_id, item.palette
+                )
+                self._wrapper._put_raw_chunk_data(item.cx, item.cz, raw, dimension_id)
+
+        # Translating a chunk to the save format reads the level's shared block
+        # palette and translation caches, which editing the next chunk extends,
+        # so it stays on this thread. Encoding, compressing and writing only
+        # touch the translated chunk and the region file, which amulet locks.
+        writer = Worker(encode, maxsize=_WRITE_QUEUE_SIZE) if pipelined else None
+
+        def put(chunk: Chunk):
+            if writer:
+                writer.submit(self._pack(chunk))
+            else:
+                commit(chunk)
+
+        def sync():
+            if writer:
+                writer.join()
+
+        visited_count = 0
+        edited_count = 0
+        created_count = 0
+        bytes_written = 0
+        touched_regions: set[XZ] = set()
+
+        with writer or nullcontext():
+            for chunks in batches:
+                regions: dict[XZ, list[XZ]] = {}
+                for chunk_coords in chunks:
+                    region = region_of(chunk_coords)
+                    regions.setdefault(region, []).append(chunk_coords)
+
+                for (rx, rz), region_chunks in sorted(regions.items()):
+                    region_file = region_dir / f"r.{rx}.{rz}.mca"
+                    region_name = f"{REGION_DIRS[dimension]}/{region_file.name}"
+                    if checkpoint and checkpoint.is_done(region_name):
+                        # written before the generation being resumed was interrupted
+                        for chunk_coords in region_chunks:
+                            if lighting:
+                                # only for the light it gives off to its neighbours
+                                with metrics.phase("light"):
+                                    lighting.update(
+                                        self.get_chunk(*chunk_coords, dimension_id)
+                                    )
+                            yield
+                        continue
+
+                    # Visit chunks in the order they are stored on disk,
+                    # so that each region file is read sequentially.
+                    locations = read_locations(region_file)
+                    region_chunks.sort(key=lambda c: sector_offset(locations, c))
+
+                    edited_chunks: list[XZ] = []
+                    for chunk_coords in region_chunks:
+                        data = chunks[chunk_coords]
+                        # never generated, as told by the region file's header
+                        missing = create_missing and not location(
+                            locations, chunk_coords
+                        )
+                        with metrics.phase("edit"):
+                            if missing:
+                                self._create_chunk(chunk_coords, dimension)
+                                created_count += 1
+                            chunk = self._edit_chunk(
+                                chunk_coords, data, dimension_id, created=missing
+                            )
+                        # chunks already up to date are not rewritten
+                        if chunk is not None:
+                            if lighting:
+                                with metrics.phase("light"):
+                                    lighting.update(chunk)
+                            put(chunk)
+                            edited_chunks.append(chunk_coords)
+                        visited_count += 1
+                        yield
+                        if flush_interval and visited_count % flush_interval == 0:
+                            sync()
+                            self._flush()
+
+                    if edited_chunks:
+                        sync()
+                        locations = read_locations(region_file)
+                        bytes_written += sum(
+                            sectors_size(locations, c) for c in edited_chunks
+                        )
+                        edited_count += len(edited_chunks)
+                        touched_regions.add((rx, rz))
+                    if checkpoint:
+                        checkpoint.visited((rx, rz), region_name, len(region_chunks))
+
+            if lighting:
+                # carry light back into chunks lit before their neighbours
+                sync()
+                relit: list[str] = []
+                for cx, cz in lighting.unsettled():
+                    if checkpoint:
+                        rx, rz = region_of((cx, cz))
+                        relit.append(f"{REGION_DIRS[dimension]}/r.{rx}.{rz}.mca")
+                        # an interruption may leave it half-written
+                        checkpoint.reopen(relit[-1])
+                    with metrics.phase("light"):
+                        chunk = self.get_chunk(cx, cz, dimension_id)
+                        lighting.update(chunk)
+                    put(chunk)
+                if checkpoint:
+                    sync()
+                    checkpoint.finish(LIGHTING_STEP, relit)
+
+        with metrics.phase("save"):
+            self._wrapper.save()
+        metrics.count("chunks", edited_count)
+        metrics.count("bytes_written", bytes_written)
+        return WriteSummary(
+            chunks=edited_count,
+            regions=len(touched_regions),
+            bytes_written=bytes_written,
+            unchanged=visited_count - edited_count,
+            created=created_count,
+        )
+
+    def _pack(self, chunk: Chunk) -> _Packed:
+        """The first half of committing a chunk, to hand the rest to a worker."""
+        with metrics.phase("commit"):
+            wrapper = self._wrapper
+            interface, translator, version = wrapper._get_interface_and_translator()
+            cx, cz = chunk.cx, chunk.cz
+            chunk = wrapper._convert_to_save(chunk, version, translator)
+            chunk, palette = wrapper._pack(chunk, translator, version)
+        return _Packed(cx, cz, interface, chunk, palette)
+
+    def _create_chunk(self, chunk_coords: XZ, dimension: Dimension):
+        """Create an empty chunk, with air sections and the dimension's biome."""
+        dimension_id = f"minecraft:{dimension.name}"
+        chunk = self.create_chunk(*chunk_coords, dimension_id)
+        bounds = self.bounds(dimension_id)
+        air = self.block_palette.get_add_block(Block("universal_minecraft", "air"))
+        biome = self.biome_palette.get_add_biome(
+            f"universal_minecraft:{_BIOMES[dimension]}"
+        )
+        chunk.biomes.convert_to_3d()
+        for cy in range(bounds.min_y >> 4, -(-bounds.max_y >> 4)):
+            chunk.blocks.add_sub_chunk(cy, np.full((16, 16, 16), air, np.uint32))
+            # biomes are stored per 4x4x4 cell
+            chunk.biomes.add_section(cy, np.full((4, 4, 4), biome, np.uint32))
+
+    def _lighting(self, dimension: Dimension) -> Lighting:
+        bounds = self.bounds(f"minecraft:{dimension.name}")
+        return Lighting(
+            self.block_palette,
+            bounds.min_y >> 4,
+            -(-bounds.max_y >> 4),
+            has_sky=dimension is Dimension.overworld,
+        )
+
+    def _flush(self):
+        # Edited chunks are already committed to their region files,
+        # so drop amulet's chunk cache, undo history and region handles
+        # to keep memory bounded regardless of structure size.
+        self.purge()
+
+    def _edit_chunk(
+        self, chunk_coords: XZ, edits: ChunkEdits, dimension: str, *, created=False
+    ) -> Chunk | None:
+        """Apply the edits; None if the chunk already holds all of them.
+
+        Chunks just created are always returned, since they must be written
+        even if they are to remain empty.
+        """
         try:
             chunk = self.get_chunk(*chunk_coords, dimension)
         except Exception:
             raise ChunkLoadError(chunk_coords)
 
-        chunk.block_entities = {}
-        for coords, block in edits.items():
+        count = len(edits)
+        xs = np.empty(count, np.int64)
+        ys = np.empty(count, np.int64)
+        zs = np.empty(count, np.int64)
+        write_ids = np.empty(count, np.uint32)
+        compare_ids = np.empty(count, np.uint32)
+        i = 0
+        for (x, y, z), block in edits.items():
             if block is None:
-                if (block := resolve_empty_block(chunk, coords)) is None:
+                if (block := resolve_empty_block(chunk, (x, y, z))) is None:
                     continue
-            if isinstance(block, str):
-                block = Block.from_string_blockstate(f"minecraft:{block}")
-            chunk.set_block(*coords, block)
+            xs[i], ys[i], zs[i] = x, y, z
+            write_ids[i], compare_ids[i] = self._block_ids(block)
+            i += 1
+        xs, ys, zs = xs[:i], ys[:i], zs[:i]
+        write_ids, compare_ids = write_ids[:i], compare_ids[:i]
 
+        # Compare with what the chunk holds, one section at a time,
+        # and only write the blocks that differ.
+        changed = False
+        sections = ys >> 4
+        for cy in np.unique(sections).tolist():
+            in_section = np.flatnonzero(sections == cy)
+            sx, sy, sz = xs[in_section], ys[in_section] & 15, zs[in_section]
+            if chunk.blocks.has_sub_chunk(cy):
+                current = chunk.blocks.get_sub_chunk(cy)[sx, sy, sz]
+            else:
+                current = 0  # missing sections are air
+            differs = np.flatnonzero(
+                (current != compare_ids[in_section])
+                & (current != write_ids[in_section])
+            )
+            if not differs.size:
+                continue
+            section = chunk.blocks.get_sub_chunk(cy)
+            section[sx[differs], sy[differs], sz[differs]] = write_ids[
+                in_section[differs]
+            ]
+            changed = True
+
+        if not changed and not created:
+            return None
+
+        chunk.block_entities = {}
         chunk.misc.pop("height_mapC", None)
         chunk.misc.pop("height_map256IA", None)
         chunk.misc.pop("block_light", None)
         chunk.misc.pop("sky_light", None)
         chunk.misc.pop("isLightOn", None)
-        self._wrapper._commit_chunk(chunk, dimension)
+        return chunk
+
+    def _block_ids(self, block: BlockState | Block) -> tuple[int, int]:
+        """Palette ids to write the block as, and to compare chunks against.
+
+        Blocks are written as Java block states, but chunks are loaded
+        as universal blocks, so comparisons need the universal form;
+        chunks written since they were loaded hold the Java form instead.
+        """
+        if isinstance(block, Block):  # already universal, from the chunk
+            block_id = self.block_palette.get_add_block(block)
+            return block_id, block_id
+        if (ids := self._block_ids_cache.get(block)) is None:
+            java_block = Block.from_string_blockstate(f"minecraft:{block}")
+            universal_block, _, _ = self._block_translator.to_universal(java_block)
+            ids = self._block_ids_cache[block] = (
+                self.block_palette.get_add_block(java_block),
+                self.block_palette.get_add_block(universal_block),
+            )
+        return ids
+
+    @cached_property
+    def _block_translator(self):
+        platform, version = self._wrapper.max_world_version
+        return self.translation_manager.get_version(platform, version).block
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import secrets
+import shutil
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from msgspec import DecodeError, Struct, json
+
+from .schema import BlockState, Size
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from ..core.chunks import ChunkEdits, ChunksData
+    from ..core.coordinates import XZ
+    from ..core.placement import PlacementConfig
+
+_VERSION = 1
+_MAGIC = b"NBGC"
+_HEADER = struct.Struct("=4sII")  # magic, chunks count, blocks count
+_CHUNK = struct.Struct("=iiII")  # cx, cz, start, count
+
+_META_FILE = "meta.json"
+_DATA_FILE = "chunks.bin"
+
+
+class _Meta(Struct):
+    version: int
+    byteorder: str
+    size: Size
+    palette: list[BlockState | None]
+
+
+class CachedChunks(Mapping["XZ", "ChunkEdits"]):
+    """Read-only view of cached chunks, decoded on access from a memory map."""
+
+    def __init__(self, path: Path, meta: _Meta):
+        self.size = meta.size
+        self._palette = meta.palette
+
+        with path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, chunks_count, blocks_count = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError("Invalid cache file.")
+
+        self._index: dict[XZ, tuple[int, int]] = {}
+        offset = _HEADER.size
+        for _ in range(chunks_count):
+            cx, cz, start, count = _CHUNK.unpack_from(self._mmap, offset)
+            self._index[cx, cz] = (start, count)
+            offset += _CHUNK.size
+
+        self._view = memoryview(self._mmap)
+        positions_end = offset + blocks_count * 4
+        self._positions = self._view[offset:positions_end].cast("i")
+        self._states = self._view[
+            positions_end : positions_end + blocks_count * 4
+        ].cast("I")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """Unmap the cache file; chunks already read remain valid."""
+        if self._mmap.closed:
+            return
+        # the map can't close while views of it are alive
+        self._positions.release()
+        self._states.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __getitem__(self, key: XZ) -> ChunkEdits:
+        start, count = self._index[key]
+        palette = self._palette
+        return {
+            ((pos >> 4) & 15, pos >> 8, pos & 15): palette[state]
+            for pos, state in zip(
+                self._positions[start : start + count],
+                self._states[start : start + count],
+            )
+        }
+
+    def __iter__(self) -> Iterator[XZ]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class PlacementCache:
+    """Content-addressed store of placement results, evicted least-recently-used."""
+
+    def __init__(self, path: Path, *, max_size: int):
+        self.path = path
+        self.max_size = max_size
+
+    @staticmethod
+    def key(digest: str, config: PlacementConfig) -> str:
+        config_repr = "|".join([
+            " ".join(map(str, config.origin)),
+            config.direction.name,
+            config.tilt.value,
+            config.align.value,
+            ",".join(config.theme),
+            config.walkable.value,
+            str(config.preserve_terrain),
+        ])
+        return hashlib.blake2b(
+            f"{_VERSION}|{digest}|{config_repr}".encode(), digest_size=16
+        ).hexdigest()
+
+    def get(self, key: str) -> CachedChunks | None:
+        entry = self.path / key
+        try:
+            meta = json.decode((entry / _META_FILE).read_bytes(), type=_Meta)
+            if meta.version != _VERSION or meta.byteorder != sys.byteorder:
+                return None
+            chunks = CachedChunks(entry / _DATA_FILE, meta)
+        except (OSError, ValueError, DecodeError):
+            return None
+
+        os.utime(entry / _META_FILE)  # mark as recently used
+        return chunks
+
+    def put(self, key: str, size: Size, chunks: ChunksData):
+        palette: dict[BlockState | None, int] = {}
+        table = bytearray()
+        positions = array("i")
+        states = array("I")
+
+        for (cx, cz), edits in chunks.items():
+            table += _CHUNK.pack(cx, cz, len(positions), len(edits))
+            for (x, y, z), block in edits.items():
+                positions.append((y << 8) | (x << 4) | z)
+                states.append(palette.setdefault(block, len(palette)))
+
+        meta = _Meta(
+            version=_VERSION,
+            byteorder=sys.byteorder,
+            size=size,
+            palette=list(palette),
+        )
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        temp_entry = self.path / f".{key}_{secrets.token_hex(3)}"
+        temp_entry.mkdir()
+        try:
+            with (temp_entry / _DATA_FILE).open("wb") as f:
+                f.write(_HEADER.pack(_MAGIC, len(chunks), len(positions)))
+                f.write(table)
+                positions.tofile(f)
+                states.tofile(f)
+            (temp_entry / _META_FILE).write_bytes(json.encode(meta))
+            os.replace(temp_entry, self.path / key)
+        except OSError:
+            # another process has stored the same entry
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            if not (self.path / key).exists():
+                raise
+
+        self._evict()
+
+    def _evict(self):
+        entries: list[tuple[float, int, Path]] = []
+        for entry in self.path.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                last_used = (entry / _META_FILE).stat().st_mtime
+                size = sum(f.stat().st_size for f in entry.iterdir())
+            except OSError:
+                continue
+            entries.append((last_used, size, entry))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
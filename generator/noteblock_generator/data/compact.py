@@ -0,0 +1,199 @@
+"""A compact stand-in for a decoded building's block map.
+
+Decoded input holds a string key per position and a string per block,
+which for the largest songs takes gigabytes. CompactBlockMap keeps a
+palette index per position in a typed array instead, with each distinct
+block state stored once, and holds nothing the garbage collector tracks.
+"""
+
+from __future__ import annotations
+
+import warnings
+from array import array
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
+
+from .schema import BlockType, StrCoord
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from .schema import BlockMap, Blocks, Size
+
+# palette index of positions without an entry
+_MISSING = 0
+_DTYPES = {"B": "uint8", "H": "uint16", "I": "uint32"}
+
+
+class CompactBlockMap(Mapping[StrCoord, BlockType]):
+    """Blocks as palette indices, in the order placement reads them:
+    by x, then y, then z.
+    """
+
+    __slots__ = ("size", "_palette", "_indices", "_count")
+
+    def __init__(self, size: Size):
+        self.size = size
+        self._palette: list[BlockType] = [None]
+        self._indices = array("B", bytes(size.length * size.height * size.width))
+        self._count = 0
+
+    @classmethod
+    def pack(cls, blocks: BlockMap, size: Size) -> CompactBlockMap:
+        """Move the blocks into a compact map, emptying `blocks`.
+
+        Entries outside the size, or not at a position at all, are dropped,
+        as placement never reads them.
+        """
+        import numpy as np
+
+        palette_indices: dict[BlockType, int] = {}
+        indices = np.array(
+            [
+                palette_indices.setdefault(block, len(palette_indices) + 1)
+                for block in blocks.values()
+            ],
+            np.uint32,
+        )
+        coords = _parse_positions(blocks)
+        blocks.clear()
+
+        bounds = (size.length, size.height, size.width)
+        inside = ((coords >= 0) & (coords < bounds)).all(axis=1)
+        x, y, z = coords[inside].T
+        positions = (x * size.height + y) * size.width + z
+        grid = np.zeros(size.length * size.height * size.width, np.uint32)
+        grid[positions] = indices[inside]
+        return cls._from_grid(size, [None, *palette_indices], grid)
+
+    @classmethod
+    def _from_grid(cls, size: Size, palette: list[BlockType], grid) -> CompactBlockMap:
+        import numpy as np
+
+        packed = cls.__new__(cls)
+        packed.size = size
+        packed._palette = palette
+        typecode = _typecode(len(palette))
+        packed._indices = array(typecode, grid.astype(_DTYPES[typecode]).tobytes())
+        packed._count = int(np.count_nonzero(grid))
+        return packed
+
+    def _grid(self):
+        import numpy as np
+
+        return np.frombuffer(self._indices, _DTYPES[self._indices.typecode])
+
+    def at(self, x: int, y: int, z: int) -> BlockType:
+        size = self.size
+        return self._palette[self._indices[(x * size.height + y) * size.width + z]]
+
+    def __getitem__(self, key: StrCoord) -> BlockType:
+        position = self._position(key)
+        if position is None or self._indices[position] == _MISSING:
+            raise KeyError(key)
+        return self._palette[self._indices[position]]
+
+    def __iter__(self) -> Iterator[StrCoord]:
+        height, width = self.size.height, self.size.width
+        for position, index in enumerate(self._indices):
+            if index != _MISSING:
+                x, rest = divmod(position, height * width)
+                y, z = divmod(rest, width)
+                yield f"{x} {y} {z}"
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _position(self, key: StrCoord) -> int | None:
+        try:
+            x, y, z = map(int, key.split(" "))
+        except ValueError:
+            return None
+        size = self.size
+        if 0 <= x < size.length and 0 <= y < size.height and 0 <= z < size.width:
+            return (x * size.height + y) * size.width + z
+
+
+def diff_blocks(
+    previous: CompactBlockMap, current: CompactBlockMap
+) -> tuple[CompactBlockMap, CompactBlockMap]:
+    """The blocks of `current` that differ from `previous`, and `previous`
+    updated with them, both in the size of `current`.
+
+    Positions `current` leaves out keep their previous block. What `previous`
+    holds outside the size is dropped, and counts as changed if it grows back.
+    """
+    import numpy as np
+
+    # one palette for both, so equal blocks have equal indices
+    palette = list(previous._palette)
+    palette_indices = {block: i for i, block in enumerate(palette) if i != _MISSING}
+    translate = [_MISSING]
+    for block in current._palette[1:]:
+        if block not in palette_indices:
+            palette_indices[block] = len(palette)
+            palette.append(block)
+        translate.append(palette_indices[block])
+    grid = np.array(translate, np.uint32)[current._grid()]
+
+    size = current.size
+    if previous.size == size:
+        before = previous._grid()
+    else:
+        shape = (size.length, size.height, size.width)
+        old = previous._grid().reshape(
+            previous.size.length, previous.size.height, previous.size.width
+        )
+        overlap = tuple(slice(min(a, b)) for a, b in zip(shape, old.shape))
+        resized = np.zeros(shape, old.dtype)
+        resized[overlap] = old[overlap]
+        before = resized.ravel()
+
+    present = grid != _MISSING
+    if (none := palette_indices.get(None)) is not None:
+        # a missing position reads as None, like one set to None
+        compared = np.where(before == _MISSING, none, before)
+    else:
+        compared = before
+    changed = present & (grid != compared)
+    return (
+        CompactBlockMap._from_grid(size, palette, np.where(changed, grid, _MISSING)),
+        CompactBlockMap._from_grid(size, palette, np.where(present, grid, before)),
+    )
+
+
+def _parse_positions(keys: Iterable[StrCoord]):
+    """Keys as rows of x, y and z; rows of -1 for keys that aren't positions."""
+    import numpy as np
+
+    keys = list(keys)
+    with warnings.catch_warnings():
+        # on keys that aren't positions, parsing stops short with a warning
+        warnings.simplefilter("ignore", DeprecationWarning)
+        numbers = np.fromstring(" ".join(keys), np.int64, sep=" ")
+    if len(numbers) == 3 * len(keys) and all(key.count(" ") == 2 for key in keys):
+        return numbers.reshape(-1, 3)
+
+    def parse(key: StrCoord) -> tuple[int, int, int]:
+        try:
+            x, y, z = map(int, key.split(" "))
+        except ValueError:
+            return -1, -1, -1
+        return x, y, z
+
+    return np.array([parse(key) for key in keys], np.int64).reshape(-1, 3)
+
+
+def _typecode(palette_size: int) -> str:
+    if palette_size <= 0x100:
+        return "B"
+    if palette_size <= 0x10000:
+        return "H"
+    return "I"
+
+
+def block_lookup(blocks: Blocks) -> Callable[[int, int, int], BlockType]:
+    """Read blocks by position, fastest for compact maps."""
+    if isinstance(blocks, CompactBlockMap):
+        return blocks.at
+    return lambda x, y, z: blocks.get(f"{x} {y} {z}")
@@ -11,7 +11,7 @@ from pathlib import Path
 from .. import APP_NAME
 
 
-def backup_files(src: Path, patience: int = 3):
+def backup_files(src: Path, patience: int = 3, *, dst: Path | None = None):
     class PermissionDenied(Exception): ...
 
     def copyfile(src: str, dst: str):
@@ -32,6 +32,13 @@ def backup_files(src: Path, patience: int = 3):
         elif src_path.is_file():
             copyfile(src, dst)
 
+    if dst is not None:
+        try:
+            copy(str(src), str(dst))
+        except PermissionDenied as e:
+            raise PermissionError(e)
+        return str(dst)
+
     temp_dir = Path(tempfile.gettempdir()) / APP_NAME
     temp_dir.mkdir(exist_ok=True)
 
@@ -47,6 +54,34 @@ def backup_files(src: Path, patience: int = 3):
             return str(dst)
 
 
+def make_temp_path(name: str) -> Path:
+    """A fresh path in the app's temporary directory."""
+    temp_dir = Path(tempfile.gettempdir()) / APP_NAME
+    temp_dir.mkdir(exist_ok=True)
+    return temp_dir / f"{name}_{secrets.token_hex(3)}"
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def same_file(a: Path, b: Path) -> bool:
+    """Whether `b` is still a copy of `a`; copies keep the modification time."""
+    try:
+        stat_a, stat_b = a.stat(), b.stat()
+    except FileNotFoundError:
+        return False
+    return (stat_a.st_size, stat_a.st_mtime_ns) == (stat_b.st_size, stat_b.st_mtime_ns)
+
+
+def resume_path(src: Path) -> Path:
+    """Where the working copy of an interrupted generation into `src` is kept."""
+    temp_dir = Path(tempfile.gettempdir()) / APP_NAME
+    temp_dir.mkdir(exist_ok=True)
+    path_hash = zlib.crc32(str(src.resolve()).encode())
+    return temp_dir / f"{src.name}_{path_hash:08x}_resume"
+
+
 def hash_files(src: Path, *, patience=2) -> int | None:
     deadline = time.monotonic() + patience
 
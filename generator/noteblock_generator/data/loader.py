@@ -1,28 +1,97 @@
 from __future__ import annotations
 
+import gc
+import hashlib
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import cached_property
 from io import BytesIO
 from pathlib import Path
 from sys import stdin
+from threading import Thread
+from typing import TYPE_CHECKING, cast
 from zipfile import ZipFile, is_zipfile
 
 from click import UsageError
 from msgspec import DecodeError, json
 
+from ..core.metrics import metrics
+from .compact import CompactBlockMap
 from .schema import Building
 
+if TYPE_CHECKING:
+    from .schema import BlockMap
+
 # prevent infinite loop on infinite input (like `yes | nbg`)
 MAX_PIPE_SIZE = 100 * 1024 * 1024  # 100 MB
 
 
+class Source:
+    """Raw input data; only decoded when needed."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._decoding: Future[Building] | None = None
+
+    @cached_property
+    def digest(self) -> str:
+        return hashlib.blake2b(self.data, digest_size=16).hexdigest()
+
+    @cached_property
+    def building(self) -> Building:
+        if self._decoding:
+            return self._decoding.result()
+        return decode(self.data)
+
+    def decode_in_background(self):
+        if self._decoding or "building" in self.__dict__:
+            return
+
+        future: Future[Building] = Future()
+
+        def run():
+            try:
+                future.set_result(decode(self.data))
+            except BaseException as e:
+                future.set_exception(e)
+
+        Thread(target=run, daemon=True).start()
+        self._decoding = future
+
+
 def load(path: Path | None):
+    return read(path).building
+
+
+def read(path: Path | None):
     src = _load_source(path)
-    data = _read_source(src)
+    return Source(_read_source(src))
+
+
+def decode(data: bytes) -> Building:
     try:
-        return json.decode(data, type=Building)
+        with metrics.phase("decode"), gc_paused():
+            building = json.decode(data, type=Building)
+            # msgspec decodes mappings as dicts
+            blocks = cast("BlockMap", building.blocks)
+            building.blocks = CompactBlockMap.pack(blocks, building.size)
+            return building
     except DecodeError:
         raise UsageError("Input data does not match expected format.")
 
 
+@contextmanager
+def gc_paused():
+    """Pause the cyclic GC while allocating millions of objects without cycles."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 def _load_source(path: Path | None) -> Path | BytesIO:
     if path:
         return path
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from click import UsageError
+from msgspec import DecodeError, Struct, field, json
+
+from ..cli.args import Align, Dimension, Facing, Tilt, Walkable
+from .schema import BlockState
+
+
+class BatchEntry(Struct, forbid_unknown_fields=True):
+    """One structure of a batch; options left out fall back to the command line's."""
+
+    input: str = field(name="in")
+    coordinates: tuple[int, int, int] | None = field(default=None, name="at")
+    dimension: Dimension | None = field(default=None, name="dim")
+    facing: Facing | None = field(default=None, name="face")
+    tilt: Tilt | None = None
+    align: Align | None = None
+    theme: list[BlockState] | None = None
+    walkable: Walkable | None = None
+    preserve_terrain: bool | None = field(default=None, name="preserve-terrain")
+
+    @property
+    def options(self) -> dict[str, object]:
+        """Generator options given by this entry."""
+        return {
+            name: value
+            for name in self.__struct_fields__
+            if name != "input" and (value := getattr(self, name)) is not None
+        }
+
+
+def load(path: Path) -> list[BatchEntry]:
+    try:
+        entries = json.decode(path.read_bytes(), type=list[BatchEntry])
+    except DecodeError as e:
+        raise UsageError(f"Invalid batch manifest: {e}")
+
+    for entry in entries:
+        input_path = (path.parent / entry.input).resolve()
+        if not input_path.is_file():
+            raise UsageError(f"Batch input '{input_path}' does not exist.")
+        entry.input = str(input_path)
+    return entries
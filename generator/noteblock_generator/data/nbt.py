@@ -0,0 +1,166 @@
+"""Minimal NBT writer for structure files.
+
+Compounds are dicts, lists are lists, strings are str, ints are Int and
+floats are Double; other tag types are marked with the wrappers below.
+"""
+
+from __future__ import annotations
+
+import gzip
+import struct
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+
+class _Tag(IntEnum):
+    END = 0
+    BYTE = 1
+    SHORT = 2
+    INT = 3
+    LONG = 4
+    FLOAT = 5
+    DOUBLE = 6
+    BYTE_ARRAY = 7
+    STRING = 8
+    LIST = 9
+    COMPOUND = 10
+    INT_ARRAY = 11
+    LONG_ARRAY = 12
+
+
+_64_BITS = (1 << 64) - 1
+
+
+class Byte(int): ...
+
+
+class Short(int): ...
+
+
+class Long(int): ...
+
+
+class ByteArray(bytes): ...
+
+
+class IntArray(list[int]): ...
+
+
+class LongArray(bytes):
+    """Longs already packed big-endian, as produced by `pack_longs`."""
+
+
+def pack_longs(values: Iterable[int], bits: int) -> LongArray:
+    """Pack unsigned values into longs, least significant bits first.
+
+    Values may span two longs, as in Litematica's block state arrays.
+    """
+    longs: list[int] = []
+    buffer = 0
+    filled = 0
+    for value in values:
+        buffer |= value << filled
+        filled += bits
+        if filled >= 64:
+            longs.append(buffer & _64_BITS)
+            buffer >>= 64
+            filled -= 64
+    if filled:
+        longs.append(buffer)
+    return LongArray(struct.pack(f">{len(longs)}Q", *longs))
+
+
+def pack_varints(values: Iterable[int]) -> ByteArray:
+    """Encode unsigned values as varints, as in Sponge schematics' block data."""
+    data = bytearray()
+    for value in values:
+        while value > 0x7F:
+            data.append(value & 0x7F | 0x80)
+            value >>= 7
+        data.append(value)
+    return ByteArray(data)
+
+
+def dumps(root: dict, name="") -> bytes:
+    data = bytearray([_Tag.COMPOUND])
+    _write_string(data, name)
+    _write_payload(data, _Tag.COMPOUND, root)
+    return bytes(data)
+
+
+def write(path: Path, root: dict, name=""):
+    """Write a gzipped NBT file, as structure files are stored."""
+    path.write_bytes(gzip.compress(dumps(root, name), compresslevel=6))
+
+
+def _tag_type(value) -> _Tag:
+    # subclasses before their bases
+    if isinstance(value, Byte):
+        return _Tag.BYTE
+    if isinstance(value, Short):
+        return _Tag.SHORT
+    if isinstance(value, Long):
+        return _Tag.LONG
+    if isinstance(value, int):
+        return _Tag.INT
+    if isinstance(value, float):
+        return _Tag.DOUBLE
+    if isinstance(value, str):
+        return _Tag.STRING
+    if isinstance(value, ByteArray):
+        return _Tag.BYTE_ARRAY
+    if isinstance(value, LongArray):
+        return _Tag.LONG_ARRAY
+    if isinstance(value, IntArray):
+        return _Tag.INT_ARRAY
+    if isinstance(value, list):
+        return _Tag.LIST
+    if isinstance(value, dict):
+        return _Tag.COMPOUND
+    raise TypeError(f"Unsupported NBT value: {value!r}")
+
+
+def _write_string(data: bytearray, value: str):
+    encoded = value.encode()
+    data += struct.pack(">H", len(encoded))
+    data += encoded
+
+
+def _write_payload(data: bytearray, tag_type: _Tag, value):
+    match tag_type:
+        case _Tag.BYTE:
+            data += struct.pack(">b", value)
+        case _Tag.SHORT:
+            data += struct.pack(">h", value)
+        case _Tag.INT:
+            data += struct.pack(">i", value)
+        case _Tag.LONG:
+            data += struct.pack(">q", value)
+        case _Tag.DOUBLE:
+            data += struct.pack(">d", value)
+        case _Tag.BYTE_ARRAY:
+            data += struct.pack(">i", len(value))
+            data += value
+        case _Tag.STRING:
+            _write_string(data, value)
+        case _Tag.LIST:
+            item_type = _tag_type(value[0]) if value else _Tag.END
+            data += struct.pack(">bi", item_type, len(value))
+            for item in value:
+                _write_payload(data, item_type, item)
+        case _Tag.COMPOUND:
+            for key, item in value.items():
+                item_type = _tag_type(item)
+                data.append(item_type)
+                _write_string(data, key)
+                _write_payload(data, item_type, item)
+            data.append(_Tag.END)
+        case _Tag.INT_ARRAY:
+            data += struct.pack(f">i{len(value)}i", len(value), *value)
+        case _Tag.LONG_ARRAY:
+            data += struct.pack(">i", len(value) // 8)
+            data += value
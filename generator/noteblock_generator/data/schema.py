@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 from typing import Literal
 
 from msgspec import Struct
@@ -9,20 +10,25 @@ StrCoord = str  # "{x} {y} {z}"
 ThemeBlock = Literal[0]
 BlockType = BlockState | ThemeBlock | None
 BlockMap = dict[StrCoord, BlockType]
+# decoded as a BlockMap, but may be packed into a CompactBlockMap
+Blocks = Mapping[StrCoord, BlockType]
 
 
-class Size(Struct, frozen=True):
+# None of these can be part of a reference cycle, so the GC needn't track them.
+
+
+class Size(Struct, frozen=True, gc=False):
     width: int
     height: int
     length: int
 
 
-class Building(Struct):
-    blocks: BlockMap
+class Building(Struct, gc=False):
+    blocks: Blocks
     size: Size
 
 
-class Payload(Struct):
+class Payload(Struct, gc=False):
     blocks: BlockMap | None = None
     size: Size | None = None
     error: str | None = None
@@ -12,6 +12,7 @@ from click import UsageError
 from msgspec import DecodeError, json
 
 from ..cli.console import Console
+from ..core.metrics import metrics
 from .loader import MAX_PIPE_SIZE
 from .schema import Building, Payload
 
@@ -116,6 +117,7 @@ _decoder = json.Decoder(Payload)
 
 def _decode(data: bytes | bytearray) -> Payload:
     try:
-        return _decoder.decode(data)
+        with metrics.phase("decode"):
+            return _decoder.decode(data)
     except DecodeError:
         raise UsageError("Input data does not match expected format.")
@@ -0,0 +1,251 @@
+"""Micro-benchmarks for each stage of the placement pipeline.
+
+Usage: python test/bench_placement.py [--out results.json] [--scale N]
+
+Each case builds a synthetic structure and times loading, coordinate
+translation, block resolution, chunk organization and a cached
+regeneration separately, reporting the best of several runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import platform
+import tempfile
+import time
+from itertools import product
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+from msgspec import Struct, json, structs
+from synthetic import THEMES, make_building, modify
+from test_generate import MockSession
+
+from noteblock_generator import __version__
+from noteblock_generator.cli.args import Align, Dimension, Facing, Tilt, Walkable
+from noteblock_generator.cli.console import Console
+from noteblock_generator.core import generator as generator_module
+from noteblock_generator.core.blocks import BlockMapper
+from noteblock_generator.core.chunks import organize_chunks
+from noteblock_generator.core.coordinates import CoordinateTranslator
+from noteblock_generator.core.direction import Direction
+from noteblock_generator.core.generator import Generator
+from noteblock_generator.core.placement import PlacementConfig
+from noteblock_generator.data import loader
+from noteblock_generator.data.schema import Size
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from noteblock_generator.core.session import GeneratingSession
+
+
+class Case(Struct, frozen=True):
+    name: str
+    size: Size
+    density: float = 0.5
+    themes: int = 1
+    preserve_terrain: bool = False
+    changed: float = 0.01  # fraction of blocks changed for the regeneration benchmark
+
+
+class Timing(Struct):
+    seconds: float
+    items: int
+    items_per_second: float
+
+
+class CaseResult(Struct):
+    case: Case
+    blocks: int
+    stages: dict[str, Timing]
+
+
+class Results(Struct):
+    version: str
+    python: str
+    platform: str
+    results: list[CaseResult]
+
+
+CASES = [
+    Case("small", Size(width=12, height=6, length=200)),
+    Case("sparse", Size(width=12, height=6, length=1000), density=0.1),
+    Case("dense", Size(width=12, height=6, length=1000), density=0.9),
+    Case("themed", Size(width=24, height=8, length=500), themes=4),
+    Case(
+        "preserve-terrain",
+        Size(width=12, height=6, length=1000),
+        preserve_terrain=True,
+    ),
+]
+
+
+def make_config(case: Case) -> PlacementConfig:
+    return PlacementConfig(
+        origin=(0, 63, 0),
+        direction=Direction.east,
+        tilt=Tilt.down,
+        align=Align.center,
+        theme=THEMES[: case.themes],
+        walkable=Walkable.partial,
+        preserve_terrain=case.preserve_terrain,
+    )
+
+
+def best_of(func: Callable[[], object], *, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def timing(seconds: float, items: int) -> Timing:
+    return Timing(
+        seconds=seconds,
+        items=items,
+        items_per_second=items / seconds if seconds else 0.0,
+    )
+
+
+def run_case(case: Case, *, repeat=3) -> CaseResult:
+    building = make_building(case.size, density=case.density)
+    config = make_config(case)
+    size = case.size
+    positions = list(product(range(size.length), range(size.height), range(size.width)))
+    stages: dict[str, Timing] = {}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_file = Path(temp_dir) / "data.json"
+        input_file.write_bytes(json.encode(building))
+        seconds = best_of(lambda: loader.load(input_file), repeat=repeat)
+        stages["load"] = timing(seconds, len(building.blocks))
+
+    translator = CoordinateTranslator(config)
+    translator.update_size(size)
+    seconds = best_of(lambda: [translator.get(p) for p in positions], repeat=repeat)
+    stages["translate"] = timing(seconds, len(positions))
+
+    def resolve():
+        mapper = BlockMapper(config)
+        mapper.update_size(size)
+        blocks = building.blocks
+        return [
+            mapper.resolve(blocks.get(f"{x} {y} {z}"), (x, y, z))
+            for x, y, z in positions
+        ]
+
+    seconds = best_of(resolve, repeat=repeat)
+    stages["resolve"] = timing(seconds, len(positions))
+
+    placements = list(zip(map(translator.get, positions), resolve()))
+
+    def organize():
+        generator = organize_chunks(placements)
+        try:
+            while True:
+                next(generator)
+        except StopIteration as e:
+            return e.value
+
+    seconds = best_of(organize, repeat=repeat)
+    stages["organize"] = timing(seconds, len(placements))
+
+    modified = modify(building, fraction=case.changed)
+
+    def regenerate():
+        generator = make_generator(case)
+        generator.generate(building, cached=True)
+        start = time.perf_counter()
+        generator.generate(modified, cached=True)
+        return time.perf_counter() - start
+
+    seconds = min(regenerate() for _ in range(repeat))
+    stages["regenerate"] = timing(seconds, len(modified.blocks))
+
+    return CaseResult(case=case, blocks=len(building.blocks), stages=stages)
+
+
+def make_generator(case: Case) -> Generator:
+    config = make_config(case)
+    return Generator(
+        session=cast("GeneratingSession", MockSession()),
+        coordinates=config.origin,
+        dimension=Dimension.overworld,
+        facing=Facing.east,
+        tilt=config.tilt,
+        align=config.align,
+        theme=config.theme,
+        walkable=config.walkable,
+        preserve_terrain=config.preserve_terrain,
+    )
+
+
+def scaled(case: Case, scale: float) -> Case:
+    size = Size(
+        width=case.size.width,
+        height=case.size.height,
+        length=max(1, round(case.size.length * scale)),
+    )
+    return structs.replace(case, size=size)
+
+
+class _NoProgressBar:
+    """Drain jobs without rendering or prompting, like the tests' mock."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        def track(jobs, *args, **kwargs):
+            try:
+                while True:
+                    next(jobs)
+            except StopIteration as e:
+                return e.value
+
+        return track
+
+    def __exit__(self, *args):
+        pass
+
+
+def quiet():
+    """Silence the console and progress bar for the whole process."""
+    for attr in dir(Console):
+        if not attr.startswith("_") and callable(getattr(Console, attr)):
+            setattr(Console, attr, staticmethod(lambda *a, **k: None))
+    generator_module.ProgressBar = _NoProgressBar  # pyright: ignore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale case lengths")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    quiet()
+    results: list[CaseResult] = []
+    for case in CASES:
+        result = run_case(scaled(case, args.scale), repeat=args.repeat)
+        results.append(result)
+        print(f"{case.name} ({result.blocks} blocks)")
+        for stage, t in result.stages.items():
+            milliseconds = t.seconds * 1000
+            print(f"  {stage:<10} {milliseconds:9.2f} ms {t.items_per_second:12,.0f}/s")
+
+    if args.out:
+        output = Results(
+            version=__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            results=results,
+        )
+        args.out.write_bytes(json.format(json.encode(output), indent=2))
+
+
+if __name__ == "__main__":
+    main()
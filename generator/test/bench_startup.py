@@ -0,0 +1,102 @@
+"""Benchmark of CLI startup time.
+
+Usage: python test/bench_startup.py [--out results.json] [--repeat N]
+
+Times fresh interpreter runs of commands that don't open a world,
+which must not pay for importing amulet.
+"""
+
+from __future__ import annotations
+
+import argparse
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from msgspec import Struct, json
+
+import noteblock_generator
+from noteblock_generator import __version__
+
+COMMANDS = {
+    "version": ["--version"],
+    "help": ["--help"],
+}
+
+# modules that only opening a world or watching input should import
+HEAVY_MODULES = ["amulet", "numpy", "PyMCTranslate", "watchfiles"]
+
+
+class Timing(Struct):
+    median: float
+    best: float
+
+
+class Results(Struct):
+    version: str
+    python: str
+    platform: str
+    commands: dict[str, Timing]
+
+
+def run(args: list[str], *, code="") -> subprocess.CompletedProcess[str]:
+    """Run the CLI in a fresh interpreter, then execute `code` before exiting."""
+    script = (
+        "import sys\n"
+        "from noteblock_generator.cli.app import app\n"
+        "try:\n"
+        f"    app({args!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"{code}\n"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(noteblock_generator.__file__).parent.parent,
+    )
+
+
+def imported_heavy_modules(args: list[str]) -> list[str]:
+    code = f"print(*(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return run(args, code=code).stdout.splitlines()[-1].split()
+
+
+def time_command(args: list[str], *, repeat: int) -> Timing:
+    times: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(args)
+        times.append(time.perf_counter() - start)
+    return Timing(median=statistics.median(times), best=min(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    timings: dict[str, Timing] = {}
+    for name, command in COMMANDS.items():
+        timings[name] = t = time_command(command, repeat=args.repeat)
+        median, best = t.median * 1000, t.best * 1000
+        print(f"{name:<10} median {median:7.1f} ms, best {best:7.1f} ms")
+
+    if args.out:
+        output = Results(
+            version=__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            commands=timings,
+        )
+        args.out.write_bytes(json.format(json.encode(output), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""End-to-end benchmark of full runs against synthetic Java worlds.
+
+Usage: python test/bench_world.py [--out results.json] [--regions 1 16 64] ...
+
+Builds worlds with a configurable number of region files, players and
+pre-populated chunks, then times `nbg` runs against fresh copies of them,
+with a warm and a cold page cache. Each run's own phase report (hashing,
+copying, loading, editing, committing, saving) is included in the results,
+to show how session overhead scales with world size versus structure size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import amulet
+import numpy as np
+from amulet.api.block import Block
+from amulet.level.formats.anvil_world.format import AnvilFormat
+from amulet_nbt import (
+    ByteArrayTag,
+    CompoundTag,
+    DoubleTag,
+    FloatTag,
+    ListTag,
+    NamedTag,
+    StringTag,
+)
+from msgspec import Struct, json
+from synthetic import make_building
+
+from noteblock_generator import __version__
+from noteblock_generator.core.metrics import PhaseReport, Report
+from noteblock_generator.data.schema import Size
+
+DIMENSION = "minecraft:overworld"
+GAME_VERSION = (1, 21, 1)
+WIDTH = 12
+HEIGHT = 6
+ORIGIN = (0, 63, 0)
+FILLER_BLOCKS = ["stone", "dirt", "granite", "andesite", "deepslate", "gravel"]
+
+
+class WorldSpec(Struct, frozen=True):
+    regions: int
+    players: int
+    chunks_per_region: int
+
+
+class Run(Struct):
+    world: WorldSpec
+    world_size: int
+    structure_length: int
+    cache: str
+    wall_time: float
+    phases: dict[str, PhaseReport]
+
+
+class Results(Struct):
+    version: str
+    python: str
+    platform: str
+    runs: list[Run]
+
+
+def make_world(path: Path, spec: WorldSpec, *, structure_length: int):
+    """Create a Java world holding the structure's chunks plus filler regions.
+
+    Structure chunks are real; filler regions are copies of one populated
+    region file, which is enough for the session's hashing and copying,
+    since the generator never reads chunks outside the structure.
+    """
+    shutil.rmtree(path, ignore_errors=True)
+    wrapper = AnvilFormat(str(path))
+    wrapper.create_and_open("java", GAME_VERSION, overwrite=True)
+    wrapper.close()
+
+    level = amulet.load_level(str(path))
+    structure_chunks = _structure_chunks(structure_length)
+    for cx, cz in structure_chunks:
+        _populate(level.create_chunk(cx, cz, DIMENSION), level)
+
+    # a template filler region far from the structure
+    template_region = (-1000, -1000)
+    rx, rz = template_region
+    for i in range(min(spec.chunks_per_region, 1024)):
+        cx, cz = (rx << 5) + (i % 32), (rz << 5) + (i // 32)
+        _populate(level.create_chunk(cx, cz, DIMENSION), level)
+    level.save()
+    level.close()
+
+    region_dir = path / "region"
+    template = region_dir / f"r.{rx}.{rz}.mca"
+    structure_regions = {(cx >> 5, cz >> 5) for cx, cz in structure_chunks}
+    fillers = spec.regions - len(structure_regions)
+    grid = math.ceil(math.sqrt(max(fillers, 1))) + 2
+    candidates = (
+        (x, z)
+        for x in range(-grid, grid)
+        for z in range(-grid, grid)
+        if (x, z) not in structure_regions
+    )
+    for _, (x, z) in zip(range(fillers), candidates):
+        shutil.copyfile(template, region_dir / f"r.{x}.{z}.mca")
+    template.unlink()
+
+    for i in range(spec.players):
+        _make_player(path, seed=i)
+
+
+def _structure_chunks(length: int) -> list[tuple[int, int]]:
+    x, _, z = ORIGIN
+    min_z, max_z = z - (WIDTH - 1) // 2, z + WIDTH // 2
+    return [
+        (cx, cz)
+        for cx in range(x >> 4, ((x + length - 1) >> 4) + 1)
+        for cz in range(min_z >> 4, (max_z >> 4) + 1)
+    ]
+
+
+def _populate(chunk, level):
+    rng = np.random.default_rng(abs(hash((chunk.cx, chunk.cz))))
+    palette = [
+        level.block_palette.get_add_block(Block("universal_minecraft", name))
+        for name in FILLER_BLOCKS
+    ]
+    for cy in range(-4, 4):
+        chunk.blocks.add_sub_chunk(
+            cy, rng.choice(palette, size=(16, 16, 16)).astype(np.uint32)
+        )
+    chunk.changed = True
+
+
+def _make_player(world: Path, *, seed: int):
+    player_dir = world / "playerdata"
+    player_dir.mkdir(exist_ok=True)
+    x, y, z = ORIGIN
+    tag = CompoundTag({
+        "Dimension": StringTag(DIMENSION),
+        "Pos": ListTag([DoubleTag(x), DoubleTag(y), DoubleTag(z)]),
+        "Rotation": ListTag([FloatTag(-90), FloatTag(30)]),
+        # stand-in for inventory, advancements, etc.
+        "Filler": ByteArrayTag(
+            np.random.default_rng(seed).integers(-128, 128, 16 * 1024, np.int8)
+        ),
+    })
+    NamedTag(tag).save_to(str(player_dir / f"{uuid.UUID(int=seed)}.dat"))
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def evict_page_cache(path: Path):
+    """Drop the directory's files from the page cache, where supported."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for file in path.rglob("*"):
+        if file.is_file():
+            fd = os.open(file, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def run_nbg(world: Path, input_file: Path, report_file: Path) -> float:
+    report_file.unlink(missing_ok=True)
+    x, y, z = ORIGIN
+    command = [
+        *(sys.executable, "-m", "noteblock_generator"),
+        *("--in", str(input_file), "--out", str(world)),
+        *("--at", str(x), str(y), str(z)),
+        *("--face", "+x", "--tilt", "down", "--dim", "overworld"),
+        *("--report-file", str(report_file)),
+    ]
+    start = time.perf_counter()
+    subprocess.run(
+        command,
+        check=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def benchmark(spec: WorldSpec, *, length: int, temp_dir: Path) -> list[Run]:
+    template = temp_dir / "template"
+    make_world(template, spec, structure_length=length)
+    world_size = directory_size(template)
+
+    building = make_building(Size(width=WIDTH, height=HEIGHT, length=length))
+    input_file = temp_dir / "input.json"
+    input_file.write_bytes(json.encode(building))
+    report_file = temp_dir / "report.jsonl"
+
+    runs: list[Run] = []
+    for cache in ("warm", "cold"):
+        world = temp_dir / "world"
+        shutil.rmtree(world, ignore_errors=True)
+        shutil.copytree(template, world)
+        if cache == "cold":
+            evict_page_cache(world)
+        else:
+            for file in world.rglob("*"):
+                if file.is_file():
+                    file.read_bytes()
+
+        wall_time = run_nbg(world, input_file, report_file)
+        report = json.decode(report_file.read_bytes().splitlines()[-1], type=Report)
+        runs.append(
+            Run(
+                world=spec,
+                world_size=world_size,
+                structure_length=length,
+                cache=cache,
+                wall_time=wall_time,
+                phases=report.phases,
+            )
+        )
+    shutil.rmtree(template)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, help="write results as JSON")
+    parser.add_argument("--regions", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--chunks-per-region", type=int, default=64)
+    args = parser.parse_args()
+
+    runs: list[Run] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for regions in args.regions:
+            spec = WorldSpec(regions, args.players, args.chunks_per_region)
+            for length in args.lengths:
+                for run in benchmark(spec, length=length, temp_dir=Path(temp_dir)):
+                    runs.append(run)
+                    session = sum(
+                        run.phases[name].wall_time
+                        for name in ("hash", "backup", "load_world", "move")
+                        if name in run.phases
+                    )
+                    print(
+                        f"{regions:>4} regions ({run.world_size / 2**20:7.1f} MB)"
+                        f" length {length:>6} {run.cache:>4}:"
+                        f" {run.wall_time:7.2f}s total, {session:6.2f}s session"
+                    )
+
+    if args.out:
+        output = Results(
+            version=__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            runs=runs,
+        )
+        args.out.write_bytes(json.format(json.encode(output), indent=2))
+
+
+if __name__ == "__main__":
+    main()
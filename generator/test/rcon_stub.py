@@ -0,0 +1,88 @@
+"""A local stand-in for a Minecraft server's RCON endpoint.
+
+Understands /fill and /setblock well enough to record the blocks placed,
+and can drop connections to exercise retries, or refuse commands to
+exercise failures.
+"""
+
+from __future__ import annotations
+
+import socketserver
+import struct
+from threading import Lock, Thread
+
+_HEADER = struct.Struct("<iii")
+
+
+class RconStub:
+    def __init__(self, password: str, *, drop_every: int | None = None):
+        self.password = password
+        self.drop_every = drop_every
+        self.blocks: dict[tuple[int, int, int], str] = {}
+        self.commands: list[str] = []
+        # commands containing this fail
+        self.failing: str | None = None
+        self._lock = Lock()
+
+        stub = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                stub._handle(self.request)
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address[:2]
+
+    def __enter__(self):
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, connection):
+        file = connection.makefile("rb")
+        authenticated = False
+        while header := file.read(_HEADER.size):
+            length, request_id, packet_type = _HEADER.unpack(header)
+            body = file.read(length - 8)[:-2].decode()
+            if packet_type == 3:
+                authenticated = body == self.password
+                _reply(connection, request_id if authenticated else -1, "")
+                continue
+            if not authenticated:
+                return
+            with self._lock:
+                self.commands.append(body)
+                dropped = self.drop_every and len(self.commands) % self.drop_every == 0
+                if not dropped:
+                    reply = self._execute(body)
+            if dropped:
+                return  # without running the command
+            _reply(connection, request_id, reply)
+
+    def _execute(self, command: str) -> str:
+        name, *args = command.split(" ")
+        if self.failing is not None and self.failing in command:
+            return "Unknown block type"
+        if name == "fill":
+            x1, y1, z1, x2, y2, z2 = map(int, args[:6])
+            count = 0
+            for x in range(x1, x2 + 1):
+                for y in range(y1, y2 + 1):
+                    for z in range(z1, z2 + 1):
+                        self.blocks[x, y, z] = args[6].removeprefix("minecraft:")
+                        count += 1
+            return f"Successfully filled {count} block(s)"
+        if name == "setblock":
+            x, y, z = map(int, args[:3])
+            self.blocks[x, y, z] = args[3].removeprefix("minecraft:")
+            return f"Changed the block at {x}, {y}, {z}"
+        return f"Unknown or incomplete command, see below for error: {command}"
+
+
+def _reply(connection, request_id: int, body: str):
+    payload = body.encode() + b"\0\0"
+    connection.sendall(_HEADER.pack(len(payload) + 8, request_id, 0) + payload)
@@ -0,0 +1,48 @@
+"""Synthetic buildings for benchmarks, shaped like the compiler's output."""
+
+from __future__ import annotations
+
+import random
+from itertools import product
+
+from noteblock_generator.data.schema import BlockMap, Building, Size
+
+THEMES = ["stone", "granite", "diorite", "andesite", "deepslate", "tuff"]
+
+_DIRECTIONS = ["north", "south", "east", "west"]
+
+
+def make_building(size: Size, *, density=0.5, seed=0) -> Building:
+    """A building where `density` of the positions hold a block.
+
+    Filled positions are a mix of theme blocks, note blocks, directional
+    redstone components and wires; the rest are left as empty space.
+    """
+    rng = random.Random(seed)
+    blocks: BlockMap = {}
+    for x, y, z in product(range(size.length), range(size.height), range(size.width)):
+        if rng.random() < density:
+            blocks[f"{x} {y} {z}"] = _random_block(rng)
+    return Building(blocks=blocks, size=size)
+
+
+def modify(building: Building, *, fraction: float, seed=0) -> Building:
+    """A copy of the building with `fraction` of its blocks replaced."""
+    rng = random.Random(seed)
+    blocks = dict(building.blocks)
+    for key in rng.sample(sorted(blocks), int(len(blocks) * fraction)):
+        blocks[key] = _random_block(rng)
+    return Building(blocks=blocks, size=building.size)
+
+
+def _random_block(rng: random.Random):
+    match rng.randrange(4):
+        case 0:
+            return 0  # theme block
+        case 1:
+            return f"note_block[note={rng.randrange(25)},instrument=harp]"
+        case 2:
+            facing = rng.choice(_DIRECTIONS)
+            return f"repeater[facing={facing},delay={rng.randrange(1, 5)}]"
+        case _:
+            return "redstone_wire[east=side,west=side]"
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from bench_world import WorldSpec, make_world
+
+from noteblock_generator import api
+from noteblock_generator.core.chunks import ChunkLoadError
+from noteblock_generator.core.world import World
+from noteblock_generator.data.file_utils import hash_files
+
+OPTIONS = {
+    "coordinates": (0, 63, 0),
+    "dimension": api.Dimension.overworld,
+    "facing": api.Facing.east,
+    "tilt": api.Tilt.down,
+}
+
+
+@pytest.fixture
+def world_path(tmp_path: Path) -> Path:
+    path = tmp_path / "world"
+    spec = WorldSpec(regions=2, players=1, chunks_per_region=1)
+    make_world(path, spec, structure_length=20)
+    return path
+
+
+def test_generate(world_path: Path):
+    blocks = [[["note_block[note=5]", 0]]] * 3  # length 3, height 1, width 2
+    progress: list[tuple[str, int, int | None]] = []
+
+    result = api.generate(
+        api.building_from_array(blocks),
+        world_path,
+        progress=lambda *args: progress.append(args),
+        **OPTIONS,
+    )
+
+    assert result.chunks == 1
+    assert result.bounds == (0, 2, 64, 64, 0, 1)
+    assert "place" in result.report.phases
+    assert progress
+    assert progress[-1][1] == progress[-1][2]
+
+    world = World.load(world_path)
+    try:
+        note_block = world.get_block(2, 64, 0, "minecraft:overworld")
+        theme_block = world.get_block(2, 64, 1, "minecraft:overworld")
+    finally:
+        world.close()
+    assert note_block.base_name == "note_block"
+    assert theme_block.base_name == "stone"
+
+
+def test_failure_leaves_world_untouched(world_path: Path):
+    before = hash_files(world_path)
+    building = api.Building(blocks={}, size=api.Size(width=3, height=3, length=200))
+
+    with pytest.raises(ChunkLoadError):
+        api.generate(building, world_path, **OPTIONS)
+
+    assert hash_files(world_path) == before
+
+
+def test_concurrent_calls_keep_their_own_reports(tmp_path: Path):
+    worlds = [tmp_path / "a", tmp_path / "b"]
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    for path in worlds:
+        make_world(path, spec, structure_length=3)
+    buildings = [
+        api.building_from_array([[["stone"] * width]] * 3) for width in (1, 2)
+    ]
+
+    with ThreadPoolExecutor(2) as executor:
+        results = list(
+            executor.map(
+                lambda path, building: api.generate(building, path, **OPTIONS),
+                worlds,
+                buildings,
+            )
+        )
+
+    assert [result.report.blocks for result in results] == [3, 6]
+
+
+def test_create_missing_chunks(world_path: Path):
+    building = api.Building(blocks={}, size=api.Size(width=3, height=3, length=200))
+
+    result = api.generate(building, world_path, create_missing=True, **OPTIONS)
+    assert result.chunks == 26
+
+    world = World.load(world_path)
+    try:
+        chunk = world.get_chunk(12, 0, "minecraft:overworld")
+        block = world.get_block(195, 62, 0, "minecraft:overworld")
+    finally:
+        world.close()
+    assert chunk.biomes.dimension == 3
+    assert block.base_name == "glass"
+
+
+def test_unchanged_chunks_are_not_rewritten(world_path: Path):
+    blocks = [[["note_block[note=5]", 0]]] * 20  # spans two chunks
+    building = api.building_from_array(blocks)
+
+    first = api.generate(building, world_path, **OPTIONS)
+    assert first.chunks == 2
+
+    second = api.generate(building, world_path, **OPTIONS)
+    assert second.chunks == 0
+    assert second.bytes_written == 0
+
+    blocks = [*blocks[:-1], [["note_block[note=6]", 0]]]
+    third = api.generate(api.building_from_array(blocks), world_path, **OPTIONS)
+    assert third.chunks == 1
+
+
+def test_unchanged_chunks_of_a_loaded_world(world_path: Path):
+    # as the server writes, without reloading the world in between
+    chunks = {
+        (cx, 0): {(x, 64, 0): "note_block[note=5]" for x in range(16)}
+        for cx in range(2)
+    }
+    world = World.load(world_path)
+    try:
+        summaries = []
+        for _ in range(2):
+            writing = world.write(chunks, api.Dimension.overworld)
+            try:
+                while True:
+                    next(writing)
+            except StopIteration as e:
+                summaries.append(e.value)
+    finally:
+        world.close()
+    assert summaries[0].chunks == 2
+    assert summaries[1].chunks == 0
+    assert summaries[1].unchanged == 2
+
+
+def test_relight(world_path: Path):
+    blocks = [[["glowstone", 0]]] * 3
+    api.generate(api.building_from_array(blocks), world_path, relight=True, **OPTIONS)
+
+    world = World.load(world_path)
+    try:
+        chunk = world.get_chunk(0, 0, "minecraft:overworld")
+    finally:
+        world.close()
+    assert chunk.misc["isLightOn"]
+    # heightmaps are indexed [z, x], light [y, z, x]
+    assert chunk.misc["height_mapC"]["WORLD_SURFACE"][0, 2] == 65
+    sky_light = chunk.misc["sky_light"][4]
+    block_light = chunk.misc["block_light"][4]
+    assert sky_light[1, 0, 2] == 15  # above the structure
+    assert block_light[0, 0, 2] == 15  # the glowstone
+    assert block_light[1, 0, 2] == 14  # next to it
+    assert block_light[1, 0, 6] == 10
+
+
+@pytest.mark.parametrize("glowstone", [14, 17])
+def test_relight_across_chunks(world_path: Path, glowstone: int):
+    blocks = [[["glass"]]] * 20
+    blocks[glowstone] = [["glowstone"]]
+    api.generate(api.building_from_array(blocks), world_path, relight=True, **OPTIONS)
+
+    world = World.load(world_path)
+    try:
+        chunks = [world.get_chunk(cx, 0, "minecraft:overworld") for cx in (0, 1)]
+    finally:
+        world.close()
+    # light is indexed [y, z, x]
+    light = [chunk.misc["block_light"][4][0, 0] for chunk in chunks]
+    row = list(light[0]) + list(light[1][:4])
+    # three blocks away, across the border from either side
+    other_side = 17 if glowstone == 14 else 14
+    assert row[glowstone] == 15
+    assert row[other_side] == 12
+
+
+def test_pipelined(world_path: Path):
+    blocks = [[["note_block[note=5]", "repeater[facing=north]"]]] * 20
+    result = api.generate(
+        api.building_from_array(blocks), world_path, pipelined=True, **OPTIONS
+    )
+    assert result.chunks == 2
+
+    world = World.load(world_path)
+    try:
+        for x in (0, 19):
+            note_block = world.get_block(x, 64, 0, "minecraft:overworld")
+            repeater = world.get_block(x, 64, 1, "minecraft:overworld")
+            assert note_block.base_name == "note_block"
+            assert repeater.base_name == "repeater"
+    finally:
+        world.close()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, cast
+
+from test_generate import MockSession
+
+from noteblock_generator.cli.args import Align, Dimension, Facing, Tilt, Walkable
+from noteblock_generator.core.batch import BatchGenerator
+from noteblock_generator.core.generator import Generator
+from noteblock_generator.data.schema import Building, Size
+
+if TYPE_CHECKING:
+    from noteblock_generator.core.session import GeneratingSession
+
+
+def make_generator(session: MockSession, **kwargs) -> Generator:
+    params = {
+        "coordinates": (0, 63, 0),
+        "dimension": Dimension.overworld,
+        "facing": Facing.east,
+        "tilt": Tilt.down,
+        "align": Align.right,
+        "theme": ["stone"],
+        "walkable": Walkable.no,
+        "preserve_terrain": False,
+    }
+    return Generator(session=cast("GeneratingSession", session), **(params | kwargs))
+
+
+def test_overlapping_structures_are_merged():
+    session = MockSession()
+    size = Size(width=1, height=1, length=2)
+    batch = BatchGenerator(
+        session=cast("GeneratingSession", session),
+        generators=[
+            make_generator(session),
+            make_generator(session, coordinates=(1, 63, 0), preserve_terrain=True),
+        ],
+    )
+    batch.generate([
+        Building(blocks={"0 0 0": "note_block", "1 0 0": "glass"}, size=size),
+        Building(blocks={"1 0 0": "redstone_wire"}, size=size),
+    ])
+
+    # written once, in one chunk; the second structure's empty space is preserved
+    assert session.world.chunks == {
+        (0, 0): {
+            (0, 64, 0): "note_block",
+            (1, 64, 0): "glass",
+            (2, 64, 0): "redstone_wire",
+        },
+    }
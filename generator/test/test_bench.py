@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from bench_placement import Case, run_case
+from bench_world import ORIGIN, WorldSpec, make_world
+from msgspec import json
+
+from noteblock_generator.core.world import World
+from noteblock_generator.data.schema import Size
+
+
+def test_benchmark_smoke():
+    case = Case("tiny", Size(width=5, height=4, length=10), themes=2)
+    result = run_case(case, repeat=1)
+
+    stages = {"load", "translate", "resolve", "organize", "regenerate"}
+    assert set(result.stages) == stages
+    assert result.stages["translate"].items == 5 * 4 * 10
+    assert json.decode(json.encode(result))["case"]["name"] == "tiny"
+
+
+def test_synthetic_world(tmp_path):
+    spec = WorldSpec(regions=6, players=2, chunks_per_region=4)
+    make_world(tmp_path, spec, structure_length=40)
+
+    assert len(list((tmp_path / "region").glob("*.mca"))) == 6
+    world = World.load(tmp_path)
+    try:
+        assert world.player_coordinates == ORIGIN
+        assert world.has_chunk(0, 0, "minecraft:overworld")
+    finally:
+        world.close()
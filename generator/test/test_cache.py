@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from noteblock_generator.cli.args import Align, Tilt, Walkable
+from noteblock_generator.core.direction import Direction
+from noteblock_generator.core.placement import PlacementConfig
+from noteblock_generator.data.cache import PlacementCache
+from noteblock_generator.data.schema import Size
+
+
+def make_config(**kwargs) -> PlacementConfig:
+    params = {
+        "origin": (0, 63, 0),
+        "direction": Direction.east,
+        "tilt": Tilt.down,
+        "align": Align.center,
+        "theme": ["stone"],
+        "walkable": Walkable.partial,
+        "preserve_terrain": False,
+    }
+    return PlacementConfig(**(params | kwargs))
+
+
+def test_round_trip(tmp_path: Path):
+    cache = PlacementCache(tmp_path, max_size=1024 * 1024)
+    key = cache.key("digest", make_config())
+    size = Size(width=3, height=2, length=1)
+    chunks = {
+        (0, 0): {(0, 63, 0): "stone", (15, -64, 15): None},
+        (-1, 2): {(3, 319, 4): "note_block[note=5]"},
+    }
+
+    assert cache.get(key) is None
+    cache.put(key, size, chunks)
+
+    cached = cache.get(key)
+    assert cached is not None
+    with cached:
+        assert cached.size == size
+        assert dict(cached.items()) == chunks
+    cached.close()  # closing twice is harmless
+
+
+def test_key_depends_on_config():
+    assert PlacementCache.key("digest", make_config()) != PlacementCache.key(
+        "digest", make_config(origin=(1, 63, 0))
+    )
+    assert PlacementCache.key("digest", make_config()) != PlacementCache.key(
+        "other", make_config()
+    )
+
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    cache = PlacementCache(tmp_path, max_size=1024 * 1024)
+    size = Size(width=1, height=1, length=1)
+    chunks = {(0, 0): {(0, 0, 0): "stone"}}
+
+    cache.put("old", size, chunks)
+    cache.put("new", size, chunks)
+    os.utime(tmp_path / "old" / "meta.json", (0, 0))
+    os.utime(tmp_path / "new" / "meta.json", (1, 1))
+    assert cache.get("old") is not None
+
+    entry_size = sum(f.stat().st_size for f in (tmp_path / "old").iterdir())
+    cache.max_size = 2 * entry_size
+    cache.put("newest", size, chunks)
+
+    assert cache.get("new") is None
+    assert cache.get("old") is not None
+    assert cache.get("newest") is not None
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from itertools import product
+
+from noteblock_generator.core.chunks import organize_chunks, stream_chunks
+
+
+def drain(generator):
+    try:
+        while True:
+            next(generator)
+    except StopIteration as e:
+        return e.value
+
+
+def test_stream_matches_organize():
+    # sweep towards negative X, as if the structure faces west
+    blocks = [
+        ((-x, y, z), f"block_{x}_{y}_{z}")
+        for x, y, z in product(range(40), range(3), range(-20, 20))
+    ]
+
+    expected = drain(organize_chunks(blocks))
+    batches = list(stream_chunks(blocks, axis=0))
+
+    assert len(batches) == 4  # x from 0 to -39 spans 4 rows of chunks
+    for batch in batches:
+        assert len({cx for cx, _ in batch}) == 1
+
+    streamed = {k: v for batch in batches for k, v in batch.items()}
+    assert streamed == expected
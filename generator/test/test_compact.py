@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from itertools import product
+
+from msgspec import json
+
+from noteblock_generator import api
+from noteblock_generator.data.compact import CompactBlockMap, block_lookup, diff_blocks
+from noteblock_generator.data.loader import decode
+from noteblock_generator.data.schema import Size
+
+SIZE = Size(width=3, height=2, length=4)
+
+
+def test_pack():
+    blocks = {
+        f"{x} {y} {z}": f"note_block[note={x}]" if z else 0
+        for x, y, z in product(range(SIZE.length), range(SIZE.height), range(2))
+    }
+    blocks["0 1 2"] = None
+    expected = dict(blocks)
+    # outside the size, or not a position at all
+    blocks["4 0 0"] = "stone"
+    blocks["origin"] = "stone"
+
+    packed = CompactBlockMap.pack(blocks, SIZE)
+
+    assert not blocks
+    assert dict(packed) == expected
+    assert "0 1 2" in packed and "3 1 2" not in packed
+    block_at = block_lookup(packed)
+    assert block_at(2, 1, 1) == "note_block[note=2]"
+    assert block_at(3, 1, 2) is None
+    # each state is stored once
+    states = [packed["1 0 1"], packed["1 1 1"]]
+    assert states[0] is states[1]
+
+
+def test_pack_many_states():
+    size = Size(width=1, height=1, length=70_000)
+    blocks = {f"{x} 0 0": f"state_{x}" for x in range(size.length)}
+    packed = CompactBlockMap.pack(dict(blocks), size)
+    assert dict(packed) == blocks
+
+
+def test_decode():
+    blocks = [[["note_block[note=5]", 0], [None, "stone"]]] * 3
+    building = api.building_from_array(blocks)
+    decoded = decode(json.encode(building))
+    assert isinstance(decoded.blocks, CompactBlockMap)
+    assert dict(decoded.blocks) == building.blocks
+
+
+def test_diff_blocks():
+    before = {
+        f"{x} {y} {z}": "stone" if x % 2 else None
+        for x, y, z in product(range(SIZE.length), range(SIZE.height), range(2))
+    }
+    after = dict(before) | {"0 0 0": "glass", "1 0 0": None, "3 1 2": "stone"}
+    del after["2 0 0"]
+    # what the block maps held before, diffed by key
+    changed = {k: v for k, v in after.items() if before.get(k) != v}
+
+    for size in (SIZE, Size(width=3, height=2, length=5)):
+        previous = CompactBlockMap.pack(dict(before), SIZE)
+        diff, merged = diff_blocks(previous, CompactBlockMap.pack(dict(after), size))
+        assert dict(diff) == changed
+        assert dict(merged) == before | after
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from pathlib import Path
+from zipfile import ZipFile
+
+import amulet_nbt
+import pytest
+from click import UsageError
+
+from noteblock_generator.api import Align, Building, Dimension, Facing, Size, Walkable
+from noteblock_generator.core.coordinates import Bounds
+from noteblock_generator.core.export import BlockGrid, Exporter, fill_commands
+from noteblock_generator.data import nbt
+
+# length 3, height 2, width 1
+BUILDING = Building(
+    blocks={"0 0 0": "repeater[facing=north]", "1 0 0": 0, "2 1 0": "note_block"},
+    size=Size(width=1, height=2, length=3),
+)
+
+
+def _exporter(path: Path, facing: Facing, preserve_terrain=False) -> Exporter:
+    return Exporter(
+        path,
+        facing=facing,
+        tilt=None,
+        align=Align.center,
+        theme=["stone"],
+        walkable=Walkable.no,
+        preserve_terrain=preserve_terrain,
+        progress=lambda *_: None,
+    )
+
+
+def _export(path: Path, facing: Facing, preserve_terrain=False):
+    return _exporter(path, facing, preserve_terrain).export(BUILDING)
+
+
+def _structure_blocks(path: Path) -> dict[tuple[int, ...], str]:
+    root = amulet_nbt.load(str(path)).compound
+    palette = [_state(entry) for entry in root["palette"]]
+    return {
+        tuple(pos.py_int for pos in block["pos"]): palette[block["state"].py_int]
+        for block in root["blocks"]
+    }
+
+
+def _state(entry) -> str:
+    name = entry["Name"].py_str.removeprefix("minecraft:")
+    if "Properties" not in entry:
+        return name
+    properties = ",".join(f"{k}={v.py_str}" for k, v in entry["Properties"].items())
+    return f"{name}[{properties}]"
+
+
+def _unpack_longs(longs, bits: int, count: int) -> list[int]:
+    packed = sum((int(value) % 2**64) << (64 * i) for i, value in enumerate(longs))
+    return [(packed >> (bits * i)) & ((1 << bits) - 1) for i in range(count)]
+
+
+def test_pack_longs_spans_longs():
+    values = [5, 1, 7] * 30  # 90 values of 3 bits
+    packed = nbt.pack_longs(values, 3)
+    longs = [int.from_bytes(packed[i : i + 8], "big") for i in range(0, 40, 8)]
+    assert len(packed) == 5 * 8
+    assert _unpack_longs(longs, 3, len(values)) == values
+
+
+def test_structure_file(tmp_path: Path):
+    path = tmp_path / "song.nbt"
+    summary = _export(path, Facing.east)
+
+    root = amulet_nbt.load(str(path)).compound
+    blocks = _structure_blocks(path)
+    assert [size.py_int for size in root["size"]] == [3, 2, 1]
+    assert blocks[0, 0, 0] == "repeater[facing=north]"
+    assert blocks[1, 0, 0] == "stone"
+    assert blocks[2, 1, 0] == "note_block"
+    assert blocks[0, 1, 0] == "air"
+    assert summary.blocks == 3
+
+
+def test_watched_changes_are_merged(tmp_path: Path):
+    path = tmp_path / "song.nbt"
+    exporter = _exporter(path, Facing.east)
+    exporter.export(BUILDING, cached=True)
+    # piped input only holds the blocks that changed
+    changes = Building(blocks={"2 1 0": "glass"}, size=BUILDING.size)
+    exporter.export(changes, cached=True)
+
+    blocks = _structure_blocks(path)
+    assert blocks[0, 0, 0] == "repeater[facing=north]"
+    assert blocks[1, 0, 0] == "stone"
+    assert blocks[2, 1, 0] == "glass"
+
+
+def test_rotation_and_formats_agree(tmp_path: Path):
+    _export(tmp_path / "song.schem", Facing.south)
+    _export(tmp_path / "song.litematic", Facing.south)
+
+    schematic = amulet_nbt.load(str(tmp_path / "song.schem"))
+    assert schematic.name == "Schematic"
+    schem = schematic.compound
+    size = (schem["Width"].py_int, schem["Height"].py_int, schem["Length"].py_int)
+    assert size == (1, 2, 3)  # length now runs along Z
+    schem_palette = {
+        i.py_int: state.removeprefix("minecraft:")
+        for state, i in schem["Palette"].items()
+    }
+    # all indices are below 128, so each varint is one byte
+    schem_blocks = [schem_palette[int(i)] for i in schem["BlockData"].py_data]
+
+    region = amulet_nbt.load(str(tmp_path / "song.litematic")).compound["Regions"]
+    region = region["main"]
+    palette = [_state(entry) for entry in region["BlockStatePalette"]]
+    assert palette[0] == "air"
+    bits = max(2, (len(palette) - 1).bit_length())
+    indices = _unpack_longs(region["BlockStates"].py_data, bits, 6)
+    litematic_blocks = [palette[i] for i in indices]
+
+    assert schem_blocks == litematic_blocks
+    # index = (y * size_z + z) * size_x + x
+    assert litematic_blocks[0] == "repeater[facing=east]"
+    assert litematic_blocks[5] == "note_block"
+
+
+def test_preserved_terrain_is_left_out(tmp_path: Path):
+    path = tmp_path / "song.nbt"
+    _export(path, Facing.east, preserve_terrain=True)
+    root = amulet_nbt.load(str(path)).compound
+    palette = [_state(entry) for entry in root["palette"]]
+    placed = [palette[block["state"].py_int] for block in root["blocks"]]
+    # the space above the first note is neither padding nor walkway
+    assert len(placed) == 5
+    assert "structure_void" not in placed
+
+
+def test_unsupported_format(tmp_path: Path):
+    with pytest.raises(UsageError):
+        _export(tmp_path / "song.txt", Facing.east)
+
+
+def test_datapack(tmp_path: Path):
+    path = tmp_path / "My Song.zip"
+    exporter = Exporter(
+        path,
+        coordinates=(100, 64, -20),
+        facing=Facing.east,
+        tilt=None,
+        align=Align.center,
+        theme=["stone"],
+        walkable=Walkable.no,
+        preserve_terrain=False,
+        tick_budget=2,
+        progress=lambda *_: None,
+    )
+    exporter.export(BUILDING)
+
+    with ZipFile(path) as datapack:
+        assert "pack.mcmeta" in datapack.namelist()
+        entry = datapack.read("data/nbg/function/my_song.mcfunction").decode()
+        assert entry.strip() == "function nbg:my_song/0"
+        count = sum(
+            name.startswith("data/nbg/function/my_song/")
+            for name in datapack.namelist()
+        )
+        parts = [
+            datapack.read(f"data/nbg/function/my_song/{i}.mcfunction").decode()
+            for i in range(count)
+        ]
+    assert count >= 3  # 6 blocks, 2 per tick
+
+    placed = {}
+    for i, part in enumerate(parts):
+        *fills, last = part.splitlines()
+        if i < count - 1:
+            assert last == f"schedule function nbg:my_song/{i + 1} 1t"
+        else:
+            fills.append(last)
+        volume = 0
+        for fill in fills:
+            _, *coords, state = fill.split(" ")
+            x1, y1, z1, x2, y2, z2 = map(int, coords)
+            for x in range(x1, x2 + 1):
+                for y in range(y1, y2 + 1):
+                    for z in range(z1, z2 + 1):
+                        placed[x, y, z] = state.removeprefix("minecraft:")
+                        volume += 1
+        assert volume <= 2
+
+    assert placed == {
+        (100, 64, -20): "repeater[facing=north]",
+        (101, 64, -20): "stone",
+        (102, 64, -20): "air",
+        (100, 65, -20): "air",
+        (101, 65, -20): "air",
+        (102, 65, -20): "note_block",
+    }
+
+
+@pytest.mark.parametrize(
+    ("dimension", "prefix"),
+    [
+        (Dimension.overworld, "fill"),
+        (Dimension.nether, "execute in minecraft:the_nether run fill"),
+        (Dimension.the_end, "execute in minecraft:the_end run fill"),
+    ],
+)
+def test_fill_commands_dimension(dimension: Dimension, prefix: str):
+    grid = BlockGrid(Bounds(0, 0, 64, 64, 0, 0))
+    grid.set((0, 64, 0), "stone")
+
+    [(_, command)] = fill_commands(grid, dimension=dimension)
+    assert command == f"{prefix} 0 64 0 0 64 0 minecraft:stone"
+
+
+def test_datapack_requires_coordinates(tmp_path: Path):
+    with pytest.raises(UsageError):
+        _export(tmp_path / "song.zip", Facing.east)
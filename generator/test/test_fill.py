@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import random
+from array import array
+
+from noteblock_generator.core.fill import merge_boxes
+
+
+def _cover(cells: array, size: tuple[int, int, int], **kwargs) -> dict:
+    size_x, _, size_z = size
+    covered = {}
+    for box in merge_boxes(cells, size, **kwargs):
+        assert box.volume <= kwargs.get("max_volume", 32768)
+        for dy in range(box.size_y):
+            for dz in range(box.size_z):
+                for dx in range(box.size_x):
+                    x, y, z = box.x + dx, box.y + dy, box.z + dz
+                    i = (y * size_z + z) * size_x + x
+                    assert i not in covered
+                    assert cells[i] == box.value
+                    covered[i] = box.value
+    return covered
+
+
+def test_covers_every_cell_once():
+    rng = random.Random(0)
+    size = (13, 5, 7)
+    cells = array("I", (rng.choice([0, 0, 0, 1, 2]) for _ in range(13 * 5 * 7)))
+    assert len(_cover(cells, size)) == len(cells)
+
+
+def test_merges_uniform_grid_into_one_box():
+    cells = array("I", [3]) * (10 * 4 * 6)
+    [box] = merge_boxes(cells, (10, 4, 6))
+    assert (box.size_x, box.size_y, box.size_z, box.value) == (10, 4, 6, 3)
+
+
+def test_max_volume():
+    cells = array("I", [0]) * (10 * 10 * 10)
+    boxes = list(merge_boxes(cells, (10, 10, 10), max_volume=64))
+    assert all(box.volume <= 64 for box in boxes)
+    assert sum(box.volume for box in boxes) == 1000
+
+
+def test_skip():
+    cells = array("I", [0, 1, 1, 0, 1, 1, 0, 0])
+    covered = _cover(cells, (4, 1, 2), skip=1)
+    assert sorted(covered) == [0, 3, 6, 7]
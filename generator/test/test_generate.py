@@ -28,6 +28,7 @@ class MockWorld:
 class MockSession:
     def __init__(self, *args, **kwargs):
         self.world = MockWorld()
+        self.checkpoint = None
 
     def __enter__(self):
         return self.world
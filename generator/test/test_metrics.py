@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from noteblock_generator.core.metrics import Metrics
+
+
+def make_metrics() -> Metrics:
+    metrics = Metrics()
+    metrics.enabled = True
+    return metrics
+
+
+def test_nested_phases_are_exclusive():
+    metrics = make_metrics()
+    with metrics.phase("outer"):
+        with metrics.phase("inner"):
+            time.sleep(0.05)
+
+    phases = metrics.report().phases
+    assert phases["inner"].wall_time >= 0.05
+    assert phases["outer"].wall_time < 0.05
+    assert phases["outer"].calls == phases["inner"].calls == 1
+
+
+def test_timed_counts_items_and_keeps_return_value():
+    metrics = make_metrics()
+
+    def produce():
+        yield from range(3)
+        return "done"
+
+    def consume():
+        return (yield from metrics.timed("produce", produce()))
+
+    generator = consume()
+    assert [next(generator) for _ in range(3)] == [0, 1, 2]
+    try:
+        next(generator)
+    except StopIteration as e:
+        assert e.value == "done"
+
+    phase = metrics.report().phases["produce"]
+    assert phase.items == 3
+    assert phase.calls == 4
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics()
+    with metrics.phase("phase"):
+        pass
+    generator = iter(range(3))
+    assert metrics.timed("phase", generator) is generator
+    assert metrics.report().phases == {}
+
+
+def test_throughput_counts_elapsed_write_time():
+    metrics = make_metrics()
+
+    def edit():
+        with metrics.phase("edit"):
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=edit) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.count("chunks", 10)
+
+    report = metrics.report()
+    assert report.phases["edit"].wall_time >= 0.2
+    assert report.chunks_per_second > 10 / 0.2
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from itertools import product
+from pathlib import Path
+
+import pytest
+from bench_world import WorldSpec, make_world
+
+from noteblock_generator import api
+from noteblock_generator.cli.args import Align, Tilt, Walkable
+from noteblock_generator.core.blocks import BlockMapper
+from noteblock_generator.core.chunks import organize_chunks
+from noteblock_generator.core.coordinates import CoordinateTranslator
+from noteblock_generator.core.direction import Direction
+from noteblock_generator.core import parallel
+from noteblock_generator.core.parallel import place_rows
+from noteblock_generator.core.placement import PlacementConfig
+from noteblock_generator.data.schema import Size
+
+from test_chunks import drain
+
+SIZE = Size(width=6, height=5, length=50)
+BLOCKS = {
+    f"{x} {y} {z}": 0 if (x + y) % 3 else "repeater[facing=north]"
+    for x, y, z in product(range(SIZE.length), range(SIZE.height), range(SIZE.width))
+    if (x + z) % 4
+}
+
+
+@pytest.mark.parametrize("direction", list(Direction))
+def test_place_rows_matches_one_thread(direction: Direction):
+    config = PlacementConfig(
+        origin=(7, 63, -9),
+        direction=direction,
+        tilt=Tilt.down,
+        align=Align.center,
+        # boundaries between themes fall exactly on a block, to alternate
+        theme=["stone", "dirt", "glass", "sand"],
+        walkable=Walkable.partial,
+        preserve_terrain=False,
+    )
+
+    def prepared():
+        translator, mapper = CoordinateTranslator(config), BlockMapper(config)
+        translator.update_size(SIZE)
+        mapper.update_size(SIZE)
+        return translator, mapper
+
+    translator, mapper = prepared()
+    assert mapper.theme_boundaries
+    expected = drain(
+        organize_chunks(
+            (
+                translator.get((x, y, z)),
+                mapper.resolve(BLOCKS.get(f"{x} {y} {z}"), (x, y, z)),
+            )
+            for x, y, z in product(
+                range(SIZE.length), range(SIZE.height), range(SIZE.width)
+            )
+        )
+    )
+
+    translator, mapper = prepared()
+    rows = list(place_rows(translator, mapper, SIZE, BLOCKS, threads=4))
+
+    axis = translator.length_axis
+    assert len(rows) == 4  # 50 blocks from an offset of 7 or 9 span 4 rows of chunks
+    for row in rows:
+        assert len({chunk[axis // 2] for chunk in row}) == 1
+    assert {k: v for row in rows for k, v in row.items()} == expected
+
+
+def test_generate_on_threads(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(parallel, "gil_enabled", lambda: False)
+    world_path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(world_path, spec, structure_length=40)
+    blocks = [[["note_block[note=5]", 0]]] * 40
+
+    result = api.generate(
+        api.building_from_array(blocks),
+        world_path,
+        coordinates=(0, 63, 0),
+        dimension=api.Dimension.overworld,
+        facing=api.Facing.east,
+        tilt=api.Tilt.down,
+        threads=3,
+    )
+
+    assert result.chunks == 3
+    assert result.report.blocks == 40 * 2
+    # rows are organized by the threads that place them
+    assert "organize" not in result.report.phases
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+from noteblock_generator.core.pipeline import Worker, background
+
+
+def test_background_preserves_order():
+    assert list(background(iter(range(100)), maxsize=2)) == list(range(100))
+
+
+def test_background_propagates_errors():
+    def failing():
+        yield 1
+        raise ValueError("boom")
+
+    iterator = background(failing(), maxsize=1)
+    assert next(iterator) == 1
+    with pytest.raises(ValueError, match="boom"):
+        next(iterator)
+
+
+def test_worker_processes_all_items():
+    processed: list[int] = []
+    with Worker(processed.append, maxsize=2) as worker:
+        for i in range(50):
+            worker.submit(i)
+        worker.join()
+        assert processed == list(range(50))
+
+
+def test_worker_propagates_errors():
+    def fail(_):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        with Worker(fail, maxsize=1) as worker:
+            worker.submit(0)
+            worker.join()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+import pytest
+from bench_world import WorldSpec, make_world
+from msgspec import json
+
+from noteblock_generator import api
+from noteblock_generator.core.generator import Generator
+from noteblock_generator.core.metrics import PhaseReport, Report
+from noteblock_generator.core.plan import CostModel
+from noteblock_generator.core.session import GeneratingSession
+from noteblock_generator.data.file_utils import hash_files
+from noteblock_generator.data.loader import Source
+
+# 38 chunks in two region files along X, of which the world has generated two
+BLOCKS = [[["note_block[note=5]", 0]]] * 600
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+
+
+def test_plan(tmp_path: Path):
+    world_path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(world_path, spec, structure_length=20)
+    world_hash = hash_files(world_path)
+    generator = Generator(
+        session=GeneratingSession(world_path, interactive=False),
+        coordinates=(0, 63, 0),
+        dimension=api.Dimension.overworld,
+        facing=api.Facing.east,
+        tilt=api.Tilt.down,
+        align=api.Align.center,
+        theme=["stone"],
+        walkable=api.Walkable.partial,
+        preserve_terrain=False,
+    )
+    plan = generator.plan(Source(json.encode(api.building_from_array(BLOCKS))))
+
+    size = api.building_from_array(BLOCKS).size
+    assert plan.blocks == size.length * size.height * size.width
+    assert plan.chunks == generator.bounds.chunks_count == 38
+    assert plan.regions == 2
+    assert plan.missing_chunks == 38 - 2
+    assert 0 < plan.rewrite_bytes < plan.copy_bytes
+    assert plan.wall_time > 0
+    assert not plan.calibrated
+    assert hash_files(world_path) == world_hash
+
+
+def test_plan_from_player(tmp_path: Path):
+    world_path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(world_path, spec, structure_length=20)
+    lock = world_path / "session.lock"
+    lock_stat = lock.stat()
+    world_hash = hash_files(world_path)
+    generator = Generator(
+        session=GeneratingSession(world_path, interactive=False),
+        coordinates=None,
+        dimension=None,
+        facing=None,
+        tilt=None,
+        align=api.Align.center,
+        theme=["stone"],
+        walkable=api.Walkable.partial,
+        preserve_terrain=False,
+    )
+    plan = generator.plan(Source(json.encode(api.building_from_array(BLOCKS))))
+
+    assert plan.chunks == generator.bounds.chunks_count
+    # the world isn't loaded, which would take its lock
+    assert hash_files(world_path) == world_hash
+    assert lock.stat().st_mtime_ns == lock_stat.st_mtime_ns
+
+
+def test_calibrate():
+    report = Report(
+        version="test",
+        timestamp=0,
+        wall_time=10,
+        cpu_time=10,
+        blocks=1000,
+        chunks=10,
+        bytes_written=0,
+        blocks_per_second=100,
+        chunks_per_second=1,
+        peak_rss=None,
+        phases={
+            "place": PhaseReport(calls=1, items=0, wall_time=2, cpu_time=2),
+            "edit": PhaseReport(calls=10, items=0, wall_time=3, cpu_time=3),
+        },
+    )
+    CostModel.load().calibrate(report).save()
+
+    model = CostModel.load()
+    assert model.calibrated
+    assert model.seconds_per_block == pytest.approx(2 / 1000)
+    assert model.seconds_per_chunk == pytest.approx(3 / 10)
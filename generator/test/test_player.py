@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import uuid
+from pathlib import Path
+
+import pytest
+from amulet_nbt import CompoundTag, DoubleTag, FloatTag, ListTag, NamedTag, StringTag
+from bench_world import WorldSpec, make_world
+from click import UsageError
+
+from noteblock_generator import api
+from noteblock_generator.core.world import PlayerFiles, World
+
+ALEX = uuid.UUID(int=2)
+
+
+@pytest.fixture
+def world_path(tmp_path: Path) -> Path:
+    path = tmp_path / "world"
+    make_world(
+        path, WorldSpec(regions=1, players=3, chunks_per_region=1), structure_length=1
+    )
+    tag = CompoundTag({
+        "Dimension": StringTag("minecraft:the_end"),
+        "Pos": ListTag([DoubleTag(100.5), DoubleTag(70), DoubleTag(-20.5)]),
+        "Rotation": ListTag([FloatTag(0), FloatTag(-30)]),
+    })
+    NamedTag(tag).save_to(str(path / "playerdata" / f"{ALEX}.dat"))
+    (tmp_path / "usercache.json").write_text(
+        f'[{{"name": "Alex", "uuid": "{ALEX}", "expiresOn": ""}}]'
+    )
+    return path
+
+
+def test_player_is_read_lazily(world_path: Path):
+    world = World.load(world_path)
+    try:
+        assert "player" not in world.__dict__
+        assert world.player is not None
+    finally:
+        world.close()
+
+
+@pytest.mark.parametrize("player", ["alex", str(ALEX), ALEX.hex])
+def test_use_player(world_path: Path, player: str):
+    world = World.load(world_path)
+    try:
+        world.use_player(player)
+        assert world.player_coordinates == (100, 70, -21)
+        assert world.player_dimension.value == "the_end"
+    finally:
+        world.close()
+
+
+@pytest.mark.parametrize("player", [None, "alex"])
+def test_player_files(world_path: Path, player: str | None):
+    files = PlayerFiles(world_path)
+    if player:
+        files.use_player(player)
+    assert files.player is not None
+    world = World.load(world_path)
+    try:
+        # without a chosen player, either may pick any one first
+        loaded = world.get_player(files.player.player_id)
+    finally:
+        world.close()
+    assert str(files.player) == str(loaded)
+
+
+def test_unknown_player(world_path: Path):
+    world = World.load(world_path)
+    try:
+        with pytest.raises(UsageError, match="Unknown player"):
+            world.use_player("Steve")
+        world.use_player(str(uuid.UUID(int=9)))
+        with pytest.raises(UsageError, match="not in this world"):
+            world.player
+    finally:
+        world.close()
+
+
+def test_generate_for_player(world_path: Path):
+    # the world is generated in a copy, away from the server's user cache
+    result = api.generate(
+        api.building_from_array([[["note_block"]]]),
+        world_path,
+        player="Alex",
+        coordinates=(0, 63, 0),
+        dimension=api.Dimension.overworld,
+    )
+    assert result.chunks == 1
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pstats
+import time
+from pathlib import Path
+
+from noteblock_generator.cli.args import ProfileMode
+from noteblock_generator.cli.profiler import Profiler
+from noteblock_generator.core.metrics import metrics
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_cprofile_numbered_per_run(tmp_path: Path):
+    profiler = Profiler(tmp_path / "out.prof", ProfileMode.cprofile, numbered=True)
+    for _ in range(2):
+        with profiler.run():
+            busy(0.01)
+
+    for n in (1, 2):
+        stats = pstats.Stats(str(tmp_path / f"out.{n}.prof"))
+        assert any(func == "busy" for _, _, func in stats.stats)
+
+
+def test_samples_are_labelled_with_phases(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    path = tmp_path / "out.txt"
+    with Profiler(path, ProfileMode.sample, numbered=False).run():
+        with metrics.phase("busy"):
+            busy(0.2)
+    metrics.reset()
+
+    lines = path.read_text().splitlines()
+    assert any(line.startswith("MainThread;[busy];") for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
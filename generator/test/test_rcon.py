@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from click import UsageError
+from rcon_stub import RconStub
+
+from noteblock_generator.api import Align, Building, Facing, Size, Walkable
+from noteblock_generator.cli.progress_bar import ProgressBar
+from noteblock_generator.core import rcon
+from noteblock_generator.core.rcon import RconGenerator, RconPool, parse_address
+
+PASSWORD = "hunter2"
+
+
+def _building(note: int) -> Building:
+    blocks = {f"{x} 0 1": f"note_block[note={note}]" for x in range(0, 8, 2)}
+    blocks["3 0 1"] = "repeater[facing=north]"
+    return Building(blocks=blocks, size=Size(width=3, height=4, length=8))
+
+
+def _generator(pool: RconPool, *, interactive=False) -> RconGenerator:
+    return RconGenerator(
+        pool,
+        coordinates=(10, 64, 10),
+        dimension=None,
+        facing=Facing.east,
+        tilt=None,
+        align=Align.center,
+        theme=["stone"],
+        walkable=Walkable.partial,
+        preserve_terrain=False,
+        progress=None if interactive else lambda *_: None,
+    )
+
+
+def _expected(building: Building) -> dict:
+    generator = _generator(RconPool(("", 0), "", commands_per_tick=1))
+    grid = generator.resolve(building)
+    states = list(grid.palette)
+    return {
+        (grid.min_x + x, grid.min_y + y, grid.min_z + z): states[index]
+        for (x, y, z), index in zip(grid.positions(), grid.indices)
+    }
+
+
+def test_generate_and_regenerate():
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=1000
+    ) as pool:
+        generator = _generator(pool)
+
+        summary = generator.generate(_building(1))
+        assert server.blocks == _expected(_building(1))
+        assert summary.failed == 0
+        assert summary.commands < len(server.blocks)
+
+        server.commands.clear()
+        summary = generator.generate(_building(2))
+        assert server.blocks == _expected(_building(2))
+        # only the four note blocks changed
+        assert summary.blocks == 4
+        assert len(server.commands) == summary.commands
+
+
+def test_watched_changes_are_merged():
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=1000
+    ) as pool:
+        generator = _generator(pool)
+        generator.generate(_building(1), cached=True)
+
+        server.commands.clear()
+        # piped input only holds the blocks that changed
+        changes = Building(
+            blocks={"0 0 1": "note_block[note=2]"}, size=_building(1).size
+        )
+        summary = generator.generate(changes, cached=True)
+        merged = _building(1)
+        merged.blocks |= changes.blocks
+        assert server.blocks == _expected(merged)
+        assert summary.blocks == 1
+        assert not any(command.endswith("minecraft:air") for command in server.commands)
+
+
+def test_failed_commands_are_resent():
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=1000
+    ) as pool:
+        generator = _generator(pool)
+
+        server.failing = "note_block"
+        summary = generator.generate(_building(1))
+        assert summary.failed > 0
+
+        server.failing = None
+        generator.generate(_building(1))
+        assert server.blocks == _expected(_building(1))
+
+
+def test_first_generation_is_confirmed(monkeypatch: pytest.MonkeyPatch):
+    bars: list[bool] = []
+
+    class RecordingProgressBar(ProgressBar):
+        def __init__(self, *, cancellable: bool):
+            super().__init__(cancellable=False)
+            bars.append(cancellable)
+
+    monkeypatch.setattr(rcon, "ProgressBar", RecordingProgressBar)
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=1000
+    ) as pool:
+        generator = _generator(pool, interactive=True)
+        generator.generate(_building(1))
+        generator.generate(_building(2))
+    # prompted while resolving the first, never again
+    assert bars == [True, False]
+
+
+def test_retries_dropped_connections():
+    with RconStub(PASSWORD, drop_every=5) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=1000
+    ) as pool:
+        _generator(pool).generate(_building(1))
+        assert server.blocks == _expected(_building(1))
+
+
+def test_throttle():
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, PASSWORD, commands_per_tick=4
+    ) as pool:
+        start = time.perf_counter()
+        summary = _generator(pool).generate(_building(1))
+        elapsed = time.perf_counter() - start
+    ticks = -(-summary.commands // 4)
+    assert elapsed >= (ticks - 1) * 0.05
+
+
+def test_wrong_password():
+    with RconStub(PASSWORD) as server, RconPool(
+        server.address, "wrong", commands_per_tick=1000
+    ) as pool:
+        with pytest.raises(UsageError, match="authentication"):
+            _generator(pool).generate(_building(1))
+
+
+def test_parse_address():
+    assert parse_address("example.com") == ("example.com", 25575)
+    assert parse_address("127.0.0.1:25580") == ("127.0.0.1", 25580)
+    with pytest.raises(UsageError):
+        parse_address("host:port")
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import pytest
+from bench_world import WorldSpec, make_world
+from click import UsageError
+from msgspec import json
+
+from noteblock_generator import api
+from noteblock_generator.core import session
+from noteblock_generator.core.generator import Generator
+from noteblock_generator.core.lighting import Lighting
+from noteblock_generator.core.session import GeneratingSession
+from noteblock_generator.core.world import World
+from noteblock_generator.data.file_utils import resume_path
+from noteblock_generator.data.loader import Source
+
+# spans two region files along X
+BLOCKS = [[["note_block[note=5]", 0]]] * 600
+
+
+class Interrupted(Exception): ...
+
+
+@pytest.fixture
+def world_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(path, spec, structure_length=20)
+    return path
+
+
+def _generate(
+    world_path: Path,
+    source: Source,
+    *,
+    interrupt_after: int | None = None,
+    relight=False,
+):
+    def progress(description: str, done: int, total: int | None):
+        # only writing reports a total, one per chunk
+        if total is not None and done == interrupt_after:
+            raise Interrupted
+
+    generator = Generator(
+        session=GeneratingSession(world_path, interactive=False, resume=True),
+        coordinates=(0, 63, 0),
+        dimension=api.Dimension.overworld,
+        facing=api.Facing.east,
+        tilt=api.Tilt.down,
+        align=api.Align.center,
+        theme=["stone"],
+        walkable=api.Walkable.partial,
+        preserve_terrain=False,
+        relight=relight,
+        create_missing=True,
+        progress=progress,
+    )
+    return generator.generate(source)
+
+
+def test_resume(world_path: Path):
+    source = Source(json.encode(api.building_from_array(BLOCKS)))
+    working_path = resume_path(world_path)
+
+    # 38 chunks, of which the first region file holds 32
+    with pytest.raises(Interrupted):
+        _generate(world_path, source, interrupt_after=33)
+    assert working_path.is_dir()
+    assert not (world_path / "region" / "r.1.0.mca").exists()
+
+    summary = _generate(world_path, source)
+    assert summary is not None
+    assert summary.chunks == 38 - 32
+    assert not working_path.exists()
+
+    world = World.load(world_path)
+    try:
+        for x in (0, 598):
+            assert world.get_block(x, 64, 0, "minecraft:overworld").base_name == (
+                "note_block"
+            )
+    finally:
+        world.close()
+
+
+def test_resume_with_different_input(world_path: Path):
+    source = Source(json.encode(api.building_from_array(BLOCKS)))
+    with pytest.raises(Interrupted):
+        _generate(world_path, source, interrupt_after=33)
+
+    other = Source(json.encode(api.building_from_array(BLOCKS[:-1])))
+    with pytest.raises(UsageError, match="different input"):
+        _generate(world_path, other)
+
+
+def test_resume_with_different_options(world_path: Path):
+    source = Source(json.encode(api.building_from_array(BLOCKS)))
+    with pytest.raises(Interrupted):
+        _generate(world_path, source, interrupt_after=33)
+
+    with pytest.raises(UsageError, match="different input or options"):
+        _generate(world_path, source, relight=True)
+
+
+def test_resume_lighting(
+    world_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # lit from the second region file, back into the first
+    blocks = [*BLOCKS[:513], [["glowstone", 0]], *BLOCKS[514:]]
+    source = Source(json.encode(api.building_from_array(blocks)))
+    expected_path = tmp_path / "expected"
+    shutil.copytree(world_path, expected_path)
+    _generate(expected_path, source, relight=True)
+
+    def interrupted(self):
+        raise Interrupted
+        yield
+
+    # after every region file is written, before the light settles
+    with monkeypatch.context() as patch, pytest.raises(Interrupted):
+        patch.setattr(Lighting, "unsettled", interrupted)
+        _generate(world_path, source, relight=True)
+    _generate(world_path, source, relight=True)
+
+    light = []
+    for path in (world_path, expected_path):
+        world = World.load(path)
+        try:
+            light.append(world.get_chunk(31, 0, "minecraft:overworld").misc)
+        finally:
+            world.close()
+    [resumed, expected] = [misc["block_light"] for misc in light]
+    assert resumed.keys() == expected.keys()
+    assert all(np.array_equal(resumed[cy], expected[cy]) for cy in expected)
+
+
+def test_unhashed_world_is_not_kept(
+    world_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # as if the world were too large to hash in time
+    monkeypatch.setattr(session, "hash_files", lambda *_, **__: None)
+    source = Source(json.encode(api.building_from_array(BLOCKS)))
+
+    with pytest.raises(Interrupted):
+        _generate(world_path, source, interrupt_after=33)
+    assert not resume_path(world_path).exists()
+    assert not any((tmp_path / "tmp").glob("*/*"))
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import socket
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Thread
+
+import pytest
+from bench_world import WorldSpec, make_world
+from click import UsageError
+from msgspec import json
+
+from noteblock_generator.cli.args import Align, Dimension, Facing, Tilt, Walkable
+from noteblock_generator.core.generator import Generator
+from noteblock_generator.core.server import Response, Server
+from noteblock_generator.core.session import ServingSession
+from noteblock_generator.data.file_utils import hash_files
+from noteblock_generator.data.schema import Building, Size
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="requires Unix domain sockets"
+)
+
+
+def _building(note: int) -> dict:
+    blocks = {f"{x} 0 0": f"note_block[note={note}]" for x in range(3)}
+    return json.decode(json.encode(Building(blocks, Size(width=1, height=1, length=3))))
+
+
+def _too_long() -> dict:
+    # reaches into chunks the world doesn't have
+    size = Size(width=1, height=1, length=200)
+    return json.decode(json.encode(Building({"0 0 0": "stone"}, size)))
+
+
+@pytest.fixture
+def world_path(tmp_path: Path) -> Path:
+    path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(path, spec, structure_length=20)
+    return path
+
+
+@pytest.fixture
+def server(world_path: Path, tmp_path: Path):
+    with _serving(world_path, tmp_path / "nbg.sock") as server:
+        yield server
+
+
+@contextmanager
+def _serving(world_path: Path, socket_path: Path):
+    session = ServingSession(world_path)
+    generator = Generator(
+        session=session,
+        coordinates=(0, 63, 0),
+        dimension=Dimension.overworld,
+        facing=Facing.east,
+        tilt=Tilt.down,
+        align=Align.center,
+        theme=["stone"],
+        walkable=Walkable.partial,
+        preserve_terrain=False,
+        progress=lambda *_: None,
+    )
+    server = Server(socket_path, generator=generator, session=session)
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def _send(server: Server, *requests: dict) -> list[Response]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(server.socket_path))
+        client.sendall(b"".join(json.encode(r) + b"\n" for r in requests))
+        client.shutdown(socket.SHUT_WR)
+        lines = client.makefile("rb").read().splitlines()
+    responses = [json.decode(line, type=Response) for line in lines]
+    return sorted(responses, key=lambda r: str(r.id))
+
+
+def test_generate_and_undo(server: Server, world_path: Path):
+    original = hash_files(world_path)
+
+    [first] = _send(server, {"op": "generate", "id": 1, "building": _building(1)})
+    assert first.ok, first.error
+    assert first.chunks == 1
+    assert first.report is not None
+    generated = hash_files(world_path)
+    assert generated != original
+
+    [second] = _send(server, {"op": "regenerate", "id": 2, "building": _building(2)})
+    assert second.ok, second.error
+    assert hash_files(world_path) != generated
+
+    [undo] = _send(server, {"op": "undo"})
+    assert undo.ok
+    assert hash_files(world_path) == generated
+    [undo] = _send(server, {"op": "undo"})
+    assert undo.ok
+    assert hash_files(world_path) == original
+
+    [undo] = _send(server, {"op": "undo"})
+    assert not undo.ok
+    assert undo.error == "Nothing to undo."
+
+
+def test_world_stays_loaded(server: Server, world_path: Path):
+    original = hash_files(world_path)
+    [first] = _send(server, {"op": "generate", "building": _building(1)})
+    [second] = _send(server, {"op": "regenerate", "building": _building(2)})
+    [failed] = _send(server, {"op": "regenerate", "building": _too_long()})
+    [third] = _send(server, {"op": "regenerate", "building": _building(3)})
+    assert first.ok and second.ok and third.ok
+    assert not failed.ok
+
+    assert first.report is not None and "load_world" in first.report.phases
+    assert second.report is not None and "load_world" not in second.report.phases
+
+    [undo] = _send(server, {"op": "undo"})
+    [undo] = _send(server, {"op": "undo"})
+    [undo] = _send(server, {"op": "undo"})
+    assert undo.ok
+    assert hash_files(world_path) == original
+
+
+def test_stale_socket(world_path: Path, tmp_path: Path):
+    socket_path = tmp_path / "nbg.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as crashed:
+        crashed.bind(str(socket_path))
+    assert socket_path.exists()
+
+    with _serving(world_path, socket_path) as server:
+        [response] = _send(server, {"op": "undo"})
+        assert not response.ok
+
+        with pytest.raises(UsageError, match="already listening"):
+            Server(socket_path, generator=server.generator, session=server.session)
+
+
+def test_errors(server: Server):
+    responses = _send(
+        server,
+        {"op": "fly", "id": "a"},
+        {"op": "generate", "id": "b"},
+    )
+    assert [r.ok for r in responses] == [False, False]
+    assert responses[-1].error == "generate requires either 'building' or 'in'."
+
+
+def test_coalesce(server: Server):
+    requests = [
+        {"op": "regenerate", "id": i, "building": _building(i)} for i in range(5)
+    ]
+    responses = _send(server, *requests)
+    assert [r.id for r in responses] == list(range(5))
+    assert all(r.ok for r in responses)
+    assert not responses[-1].coalesced
+    # the first may run alone, before the rest are queued
+    assert sum(r.coalesced for r in responses) >= 3
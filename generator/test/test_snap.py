@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from bench_world import WorldSpec, make_world
+
+from noteblock_generator import api
+from noteblock_generator.core.coordinates import Bounds
+
+
+def test_snap_offset():
+    # 31 blocks across the region border: three chunks in two regions
+    bounds = Bounds(min_x=500, max_x=530, min_y=0, max_y=0, min_z=0, max_z=0)
+    assert (bounds.chunks_count, bounds.regions_count) == (3, 2)
+
+    dx, dz = bounds.snap_offset(20)
+    assert (dx, dz) == (12, 0)
+    snapped = bounds._replace(min_x=500 + dx, max_x=530 + dx)
+    assert (snapped.chunks_count, snapped.regions_count) == (2, 1)
+
+    assert bounds.snap_offset(0) == (0, 0)
+
+
+def test_generate_snapped(tmp_path: Path):
+    world_path = tmp_path / "world"
+    spec = WorldSpec(regions=1, players=1, chunks_per_region=1)
+    make_world(world_path, spec, structure_length=20)
+    blocks = [[["note_block[note=5]", 0]]] * 16
+
+    result = api.generate(
+        api.building_from_array(blocks),
+        world_path,
+        coordinates=(3, 63, 0),
+        dimension=api.Dimension.overworld,
+        facing=api.Facing.east,
+        tilt=api.Tilt.down,
+        snap=4,
+    )
+
+    assert result.chunks == 1
+    assert (result.bounds.min_x, result.bounds.max_x) == (0, 15)
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+import pytest
+from bench_startup import COMMANDS, imported_heavy_modules
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_no_heavy_imports(command: str):
+    assert imported_heavy_modules(COMMANDS[command]) == []